@@ -7,6 +7,7 @@ from .views import (
     student_dashboard,
     manager_dashboard,
     admin_dashboard,
+    admin_dashboard_headcount,
     )
 from . import views
 
@@ -50,4 +51,9 @@ urlpatterns = [
     path("student-dashboard/", student_dashboard, name="student_dashboard"),
     path("manager-dashboard/", manager_dashboard, name="manager_dashboard"),
     path("admin-dashboard/", admin_dashboard, name="admin_dashboard"),
+    path(
+        "admin-dashboard/headcount/",
+        admin_dashboard_headcount,
+        name="admin_dashboard_headcount",
+    ),
 ]
@@ -1,11 +1,11 @@
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.views import LoginView
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils.decorators import method_decorator
-from django.utils.timezone import now
+from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth import login
 from django.utils.http import http_date
@@ -13,10 +13,9 @@ from datetime import datetime, timedelta
 
 from meal_system import settings
 from managers.models import SpecialMealRequest
-from students.models import Student, DailyMealStatus
+from students.utils import headcount_snapshot
 from .forms import EmailOrUsernameAuthenticationForm
 from .decorators import student_required, manager_required, admin_required
-from .models import CustomUser
 from notices.utils import get_unread_notice_count
 import logging
 
@@ -109,35 +108,24 @@ def is_admin(user):
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard(request):
-    today = now().date()
-
-    total_students = Student.objects.count()
-
-    # Staff count
-    if hasattr(CustomUser, "role"):
-        total_staff = CustomUser.objects.filter(
-            role__in=["manager"]
-        ).count()
-    else:
-        total_staff = CustomUser.objects.filter(is_staff=True).count()
-
-    # Today meal ON counts
-    breakfast_on = DailyMealStatus.objects.filter(date=today, breakfast_on=True).count()
-    lunch_on = DailyMealStatus.objects.filter(date=today, lunch_on=True).count()
-    dinner_on = DailyMealStatus.objects.filter(date=today, dinner_on=True).count()
+    today = timezone.localdate()
 
     context = {
         "page_title": "Admin Dashboard",
-        "total_students": total_students,
-        "total_staff": total_staff,
-        "breakfast_on": breakfast_on,
-        "lunch_on": lunch_on,
-        "dinner_on": dinner_on,
+        **headcount_snapshot(today),
         "today": today,
     }
     return render(request, "accounts/admin_dashboard.html", context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def admin_dashboard_headcount(request):
+    """Dashboard figures as JSON so the page can poll without re-rendering."""
+    today = timezone.localdate()
+    return JsonResponse({"date": today.isoformat(), **headcount_snapshot(today)})
+
+
 from django.contrib.auth.views import PasswordResetView
 
 
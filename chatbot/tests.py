@@ -1,3 +1,53 @@
-from django.test import TestCase
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import CustomUser
+from students.models import DailyMealStatus, Student, WeeklyMenu
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def student_client(client):
+    user = CustomUser.objects.create_user(username="chatter", password="testtest456", role="student")
+    student = Student.objects.create(user=user, name="Chatter", room_number="101")
+    WeeklyMenu.objects.create(
+        day_of_week=date.today().strftime("%A"),
+        breakfast_main="Paratha",
+        breakfast_cost=Decimal("20.00"),
+        lunch_main="Rice",
+        lunch_cost=Decimal("60.00"),
+        dinner_main="Dal",
+        dinner_cost=Decimal("50.00"),
+    )
+    DailyMealStatus.objects.create(student=student, date=date.today(), lunch_on=False)
+    client.login(username="chatter", password="testtest456")
+    return client
+
+
+def test_keyword_replies_read_the_services_directly(student_client):
+    url = reverse("chatbot:chat_api")
+    reply = student_client.get(url, {"message": "show my meal status"}).json()["reply"]
+    assert "Lunch: OFF" in reply and "Dinner: ON" in reply
+    assert "Rice" in student_client.get(url, {"message": "menu please"}).json()["reply"]
+    assert "Chatter" in student_client.get(url, {"message": "my profile"}).json()["reply"]
+
+
+def test_ai_fallback_context_is_loaded_in_one_batch(student_client, monkeypatch):
+    prompts = []
+    monkeypatch.setattr(
+        "chatbot.views.gemini_generate", lambda prompt, **kwargs: prompts.append(prompt) or "ok"
+    )
+    url = reverse("chatbot:chat_api")
+    with CaptureQueriesContext(connection) as baseline:
+        student_client.get(url, {"message": "any new notices"})
+    with CaptureQueriesContext(connection) as fallback:
+        assert student_client.get(url, {"message": "what should I eat"}).json()["reply"] == "ok"
+
+    assert "'meal_status'" in prompts[0] and "'today_menu'" in prompts[0]
+    # Four prefetches, the profile details and the menu cache warm-up
+    assert len(fallback) - len(baseline) <= 6
@@ -1,35 +1,30 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
-from rest_framework.test import APIRequestFactory, force_authenticate
-from meal_system import settings
+from datetime import date
 import logging
 
 from .ai_utils import gemini_generate
 
-
-from students.models import (
-    Student,
-    DailyMealStatus,
-    DailyMealCost,
-    MonthlyMealSummary,
-    WeeklyMenu,
-)
-
-# API Views (for live data)
-from students.api_views import (
-    today_menu,
-    today_meal_status,
-    today_meal_cost,
-    monthly_summary,
-    student_profile,
-    my_complaints,
-    today_notices,
+from students.services import (
+    TODAY_NOTICES,
+    complaints_data,
+    load_student,
+    menu_data,
+    overview_data,
 )
-from notices.models import Notice
 
 logger = logging.getLogger(__name__)
 
+# Prompt keys for each overview section handed to the AI fallback
+AI_CONTEXT_KEYS = {
+    "menu": "today_menu",
+    "status": "meal_status",
+    "cost": "today_cost",
+    "summary": "monthly_summary",
+    "profile": "student_profile",
+}
+
 
 #  Chatbot Page View
 # -----------------------------
@@ -46,10 +41,17 @@ def chat_page(request):
 def chat_api(request):
     user_message = request.GET.get("message", "").strip().lower()
     user = request.user
-    student_name = getattr(getattr(user, "student", None), "name", user.username)
+    today = date.today()
+    # Later sections are loaded onto this instance in one batch each
+    student = load_student(user, sections=())
+    student_name = student.name if student else user.username
+
+    def section(name):
+        if student is None:
+            return None
+        return overview_data(student, (name,), today)[name]
 
     reply = None
-    factory = APIRequestFactory()
 
     try:
         # --- Basic greetings ---
@@ -73,11 +75,8 @@ def chat_api(request):
 
         # --- Menu ---
         elif "menu" in user_message:
-            api_req = factory.get("/api/menu/today/")
-            force_authenticate(api_req, user=user)
-            response = today_menu(api_req)
-            if response.status_code == 200 and isinstance(response.data, dict):
-                data = response.data
+            data = menu_data(today)
+            if data:
                 reply = (
                     f"🍽️ Today's Menu ({data.get('day_of_week', 'N/A')}):<br>"
                     f"Breakfast: {data.get('breakfast_main', 'N/A')}<br>"
@@ -89,11 +88,8 @@ def chat_api(request):
 
         # --- Meal status ---
         elif "status" in user_message:
-            api_req = factory.get("/api/meal-status/today/")
-            force_authenticate(api_req, user=user)
-            response = today_meal_status(api_req)
-            if response.status_code == 200:
-                data = response.data
+            data = section("status")
+            if data:
                 reply = (
                     f"📅 Meal Status for {data['date']}:<br>"
                     f"Breakfast: {'ON' if data['breakfast_on'] else 'OFF'}<br>"
@@ -105,22 +101,16 @@ def chat_api(request):
 
         # --- Today's cost ---
         elif "cost" in user_message and "today" in user_message:
-            api_req = factory.get("/api/meal-cost/today/")
-            force_authenticate(api_req, user=user)
-            response = today_meal_cost(api_req)
-            if response.status_code == 200:
-                data = response.data
+            data = section("cost")
+            if data:
                 reply = f"💰 Today's total meal cost is {data['total_cost']} Taka."
             else:
                 reply = "⚠️ No meal cost record found for today."
 
         # --- Monthly summary ---
         elif any(k in user_message for k in ["cost", "spend", "summary"]):
-            api_req = factory.get("/api/monthly-summary/")
-            force_authenticate(api_req, user=user)
-            response = monthly_summary(api_req)
-            if response.status_code == 200:
-                data = response.data
+            data = section("summary")
+            if data:
                 reply = (
                     f"📊 Monthly Summary ({data['month']}):<br>"
                     f"Total ON Days: {data['total_on_days']}<br>"
@@ -131,17 +121,14 @@ def chat_api(request):
 
         # --- Student profile ---
         elif "profile" in user_message:
-            api_req = factory.get("/api/student/profile/")
-            force_authenticate(api_req, user=user)
-            response = student_profile(api_req)
-            if response.status_code == 200:
-                data = response.data
-                student = data["student"]
+            data = section("profile")
+            if data:
+                profile = data["student"]
                 details = data["details"]
                 reply = (
                     f"👤 Profile Info:<br>"
-                    f"Name: {student['name']}<br>"
-                    f"Room: {student['room_number']}<br>"
+                    f"Name: {profile['name']}<br>"
+                    f"Room: {profile['room_number']}<br>"
                     f"Department: {details.get('department', 'N/A')}<br>"
                     f"Phone: {details.get('phone_number', 'N/A')}"
                 )
@@ -150,11 +137,9 @@ def chat_api(request):
 
         # --- Complaints ---
         elif "complaint" in user_message:
-            api_req = factory.get("/api/complaints/my/")
-            force_authenticate(api_req, user=user)
-            response = my_complaints(api_req)
-            if response.status_code == 200 and response.data:
-                data = response.data[0]
+            complaints = complaints_data(student) if student else []
+            if complaints:
+                data = complaints[0]
                 reply = (
                     f"🛠️ Your latest complaint:<br>"
                     f"{data['description']}<br>"
@@ -165,31 +150,18 @@ def chat_api(request):
 
         # --- Notices ---
         elif "notice" in user_message:
-            api_req = factory.get("/api/notices/today/")
-            force_authenticate(api_req, user=user)
-            response = today_notices(api_req)
-            if response.status_code == 200 and response.data.get("notices"):
-                notices = "<br>".join([f"📢 {n}" for n in response.data["notices"]])
-                reply = notices
+            if TODAY_NOTICES:
+                reply = "<br>".join([f"📢 {n}" for n in TODAY_NOTICES])
             else:
                 reply = "📢 No new notices today."
 
 ## ---------------- AI fallback using Gemini ----------------------
         if not reply:
-            # Collect live context for AI
-            context_data = {}
-            for view_func, key in [
-                (today_menu, "today_menu"),
-                (today_meal_status, "meal_status"),
-                (today_meal_cost, "today_cost"),
-                (monthly_summary, "monthly_summary"),
-                (student_profile, "student_profile"),
-            ]:
-                api_req = factory.get("/dummy/")
-                force_authenticate(api_req, user=user)
-                resp = view_func(api_req)
-                if resp.status_code == 200:
-                    context_data[key] = resp.data
+            # Collect live context for AI in one batch of queries
+            overview = overview_data(student, day=today) if student else {"menu": menu_data(today)}
+            context_data = {
+                AI_CONTEXT_KEYS[name]: data for name, data in overview.items() if data
+            }
 
             # AI prompt
             ai_prompt = (
@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Tests roll back the database, so cached data must not outlive a test."""
+    from django.core.cache import cache
+    from students.utils import invalidate_weekly_menu_cache
+
+    cache.clear()
+    invalidate_weekly_menu_cache()
+    yield
+    cache.clear()
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from jobs.utils import claim_next_job, requeue_stale_jobs, run_job, worker_name
+import time
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (summary regeneration, exports, token issuance)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls of an empty queue (default 2)",
+        )
+
+    def handle(self, *args, **kwargs):
+        name = worker_name()
+        self.stdout.write(f"Job worker {name} started.")
+        processed = 0
+
+        try:
+            while True:
+                requeued = requeue_stale_jobs()
+                if requeued:
+                    self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+                job = claim_next_job(name)
+                if job is None:
+                    if kwargs["once"]:
+                        break
+                    time.sleep(kwargs["sleep"])
+                    continue
+
+                self.stdout.write(f"Running job #{job.pk} ({job.kind})...")
+                started = time.monotonic()
+                run_job(job)
+                elapsed = time.monotonic() - started
+                processed += 1
+                if job.status == "succeeded":
+                    self.stdout.write(self.style.SUCCESS(f"Job #{job.pk} finished in {elapsed:.2f}s."))
+                else:
+                    self.stderr.write(self.style.ERROR(f"Job #{job.pk} failed: {job.error}"))
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Job worker stopped after {processed} jobs."))
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    A unit of background work, claimed by `manage.py run_job_worker` with
+    SELECT ... FOR UPDATE SKIP LOCKED so several workers never pick the same
+    row. ``params`` holds the task's keyword arguments as JSON.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    KIND_CHOICES = [
+        ("regenerate_monthly_summary", "Regenerate monthly summary"),
+        ("export_monthly_summary", "Export monthly summary"),
+        ("export_token_summary", "Export token summary"),
+        ("issue_tokens", "Issue meal tokens"),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+
+    # Progress as "done of total" steps, reported by the task while it runs
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+
+    result_file = models.FileField(upload_to="jobs/%Y/%m/", blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Workers only ever scan the queued rows, oldest first
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status="queued"),
+                name="job_queued_created_idx",
+            ),
+            models.Index(fields=["created_by", "-created_at"], name="job_owner_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("succeeded", "failed")
+
+    @property
+    def percent(self):
+        if self.status == "succeeded":
+            return 100
+        if not self.total:
+            return 0
+        return min(100, self.progress * 100 // self.total)
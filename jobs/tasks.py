@@ -0,0 +1,137 @@
+"""
+Task functions run by the job worker, keyed by Job.kind.
+
+Each task takes the Job and its params as keyword arguments, reports
+progress through report_progress and may attach a result file.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import datetime
+
+from django.core.files import File
+
+from managers.utils import (
+    EXPORT_CHUNK_SIZE,
+    SUMMARY_EXPORT_HEADERS,
+    TOKEN_EXPORT_HEADERS,
+    issue_tokens_for_date,
+    summary_export_rows,
+    summary_export_widths,
+    token_export_rows,
+    token_export_widths,
+    write_xlsx,
+)
+from managers.models import MealToken
+from students.models import MonthlyMealSummary, Student
+from students.utils import bulk_save_monthly_summaries, ensure_month_not_archived
+
+from .utils import report_progress
+
+SUMMARY_CHUNK_SIZE = 500
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def regenerate_monthly_summary(job, month):
+    year, month_number = map(int, month.split("-"))
+    ensure_month_not_archived(year, month_number)
+    student_ids = list(Student.objects.order_by("id").values_list("id", flat=True))
+    report_progress(job, 0, len(student_ids), f"Regenerating {month}")
+
+    for start in range(0, len(student_ids), SUMMARY_CHUNK_SIZE):
+        chunk = student_ids[start : start + SUMMARY_CHUNK_SIZE]
+        bulk_save_monthly_summaries(year, month_number, student_ids=chunk)
+        report_progress(job, start + len(chunk))
+
+    report_progress(job, len(student_ids), message=f"Summary regenerated for {month}")
+
+
+def _counted(job, rows):
+    """Pass rows through, reporting progress every export chunk."""
+    for count, row in enumerate(rows, start=1):
+        yield row
+        if count % EXPORT_CHUNK_SIZE == 0:
+            report_progress(job, count)
+
+
+def _save_export(job, filename, title, headers, widths, rows, file_format):
+    with tempfile.TemporaryFile() as tmp:
+        if file_format == "csv":
+            text = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(headers)
+            writer.writerows(rows)
+            text.flush()
+            text.detach()
+            filename += ".csv"
+        else:
+            write_xlsx(tmp, title, headers, widths, rows)
+            filename += ".xlsx"
+        tmp.seek(0)
+        job.result_file.save(filename, File(tmp), save=False)
+
+
+def export_monthly_summary(job, month, file_format="xlsx"):
+    total = MonthlyMealSummary.objects.filter(month=month).count()
+    report_progress(job, 0, total, f"Exporting {total} summaries")
+    _save_export(
+        job,
+        f"Meal_Summary_{month}",
+        f"Summary_{month}",
+        SUMMARY_EXPORT_HEADERS,
+        summary_export_widths(),
+        _counted(job, summary_export_rows(month)),
+        file_format,
+    )
+    report_progress(job, total, message=f"Summary for {month} is ready")
+
+
+def export_token_summary(job, start, end, file_format="xlsx"):
+    start_date, end_date = _parse_date(start), _parse_date(end)
+    label = str(start_date) if start_date == end_date else f"{start_date}_to_{end_date}"
+    total = MealToken.objects.filter(date__range=(start_date, end_date)).count()
+    report_progress(job, 0, total, f"Exporting {total} tokens")
+    _save_export(
+        job,
+        f"daily_token_summary_{label}",
+        f"Tokens_{label}"[:31],
+        TOKEN_EXPORT_HEADERS,
+        token_export_widths(),
+        _counted(job, token_export_rows(start_date, end_date)),
+        file_format,
+    )
+    report_progress(job, total, message=f"Tokens for {label} are ready")
+
+
+def issue_tokens(job, dates):
+    """
+    Issue tokens for each date in turn, on behalf of whoever queued the job.
+    A date without a menu is skipped and named in the final message.
+    """
+    days = sorted(_parse_date(value) for value in dates)
+    report_progress(job, 0, len(days))
+
+    issued, skipped = 0, []
+    for done, day in enumerate(days, start=1):
+        try:
+            issued += issue_tokens_for_date(day, issued_by=job.created_by)
+        except ValueError:
+            skipped.append(str(day))
+        report_progress(job, done, message=f"{issued} tokens issued")
+
+    message = f"{issued} tokens issued"
+    if skipped:
+        message += f"; no menu for {', '.join(skipped)}"
+    report_progress(job, len(days), message=message)
+
+
+TASKS = {
+    "regenerate_monthly_summary": regenerate_monthly_summary,
+    "export_monthly_summary": export_monthly_summary,
+    "export_token_summary": export_token_summary,
+    "issue_tokens": issue_tokens,
+}
@@ -0,0 +1,76 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from students.models import MonthlyMealSummary, Student
+from .models import Job
+from .utils import claim_next_job, enqueue_job, requeue_stale_jobs, run_job
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def manager_client(client):
+    CustomUser.objects.create_user(username="manager", password="testtest456", role="manager")
+    client.login(username="manager", password="testtest456")
+    return client
+
+
+def test_regeneration_is_queued_and_run_by_the_worker(manager_client):
+    user = CustomUser.objects.create_user(username="queued", password="x", role="student")
+    student = Student.objects.create(user=user, name="queued", room_number="101")
+
+    response = manager_client.post(reverse("managers:regenerate_monthly_summary", args=["2025-03"]))
+    job = Job.objects.get()
+    assert response.url == reverse("jobs:job_detail", args=[job.pk])
+    assert job.status == "queued"
+    assert not MonthlyMealSummary.objects.exists()
+
+    status = manager_client.get(reverse("jobs:job_status", args=[job.pk])).json()
+    assert (status["status"], status["finished"]) == ("queued", False)
+
+    call_command("run_job_worker", once=True)
+    job.refresh_from_db()
+    assert (job.status, job.progress, job.total, job.attempts) == ("succeeded", 1, 1, 1)
+    assert MonthlyMealSummary.objects.filter(student=student, month="2025-03").exists()
+    assert manager_client.get(reverse("jobs:job_status", args=[job.pk])).json()["percent"] == 100
+
+    # A GET never queues anything
+    manager_client.get(reverse("managers:regenerate_monthly_summary", args=["2025-03"]))
+    assert Job.objects.count() == 1
+
+
+def test_background_export_attaches_a_downloadable_file(manager_client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    response = manager_client.post(
+        reverse("managers:export_monthly_summary"), {"month": "2025-03", "format": "csv"}
+    )
+    job = Job.objects.get(pk=response.url.rstrip("/").rsplit("/", 1)[-1])
+
+    run_job(claim_next_job("test"))
+    job.refresh_from_db()
+    assert job.status == "succeeded"
+    download = manager_client.get(reverse("jobs:job_download", args=[job.pk]))
+    assert b"".join(download.streaming_content).decode().startswith("Room Number,")
+
+    # Other users cannot see someone else's job
+    CustomUser.objects.create_user(username="other", password="testtest456", role="manager")
+    manager_client.login(username="other", password="testtest456")
+    assert manager_client.get(reverse("jobs:job_detail", args=[job.pk])).status_code == 404
+
+
+def test_failed_and_stale_jobs():
+    job = enqueue_job("regenerate_monthly_summary", {"month": "not-a-month"})
+    run_job(claim_next_job("test"))
+    job.refresh_from_db()
+    assert job.status == "failed" and job.error.startswith("ValueError")
+    assert claim_next_job("test") is None
+
+    stale = enqueue_job("issue_tokens", {"dates": []})
+    claim_next_job("dead-worker")
+    Job.objects.filter(pk=stale.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+    assert requeue_stale_jobs() == 1
+    assert claim_next_job("test").pk == stale.pk
@@ -0,0 +1,117 @@
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# A running job that has not reported progress for this long is assumed
+# to belong to a dead worker and is queued again
+STALE_JOB_TIMEOUT = timedelta(minutes=15)
+MAX_ATTEMPTS = 3
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_job(kind, params=None, user=None):
+    """Queue a job for the worker and return it."""
+    if kind not in dict(Job.KIND_CHOICES):
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, params=params or {}, created_by=user)
+
+
+def claim_next_job(worker=None):
+    """
+    Mark the oldest queued job as running and return it, or None when the
+    queue is empty. SKIP LOCKED lets concurrent workers pass over a row
+    another worker is claiming instead of waiting on it.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status="queued")
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        now = timezone.now()
+        job.status = "running"
+        job.worker = worker or worker_name()
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=["status", "worker", "attempts", "started_at", "heartbeat_at"])
+    return job
+
+
+def report_progress(job, progress, total=None, message=None):
+    """
+    Record how far a running job has got. Writes straight to the row, so
+    the status page sees it even while the task holds no transaction.
+    """
+    job.progress = progress
+    fields = {"progress": progress, "heartbeat_at": timezone.now()}
+    if total is not None:
+        job.total = fields["total"] = total
+    if message is not None:
+        job.message = fields["message"] = message[:255]
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def run_job(job):
+    """Run a claimed job's task and record the outcome. Returns the job."""
+    from .tasks import TASKS
+
+    try:
+        TASKS[job.kind](job, **job.params)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        job.status = "failed"
+        job.error = f"{type(exc).__name__}: {exc}"
+    else:
+        job.status = "succeeded"
+        job.progress = max(job.progress, job.total)
+
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=[
+            "status",
+            "error",
+            "progress",
+            "total",
+            "message",
+            "result_file",
+            "finished_at",
+        ]
+    )
+    return job
+
+
+def requeue_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """
+    Return running jobs whose worker stopped reporting to the queue, or
+    fail them once they have used up their attempts. Returns how many jobs
+    were requeued.
+    """
+    stale = Job.objects.filter(status="running", heartbeat_at__lt=timezone.now() - timeout)
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status="failed",
+        error="Worker stopped responding",
+        finished_at=timezone.now(),
+    )
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+        status="queued", worker="", progress=0, started_at=None
+    )
+
+
+def can_view_job(user, job):
+    return job.created_by_id == user.id or user.is_admin
@@ -0,0 +1,68 @@
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render
+
+from .models import Job
+from .utils import can_view_job
+
+
+def _get_job(request, pk):
+    job = get_object_or_404(Job.objects.select_related("created_by"), pk=pk)
+    if not can_view_job(request.user, job):
+        raise Http404("No such job.")
+    return job
+
+
+def _job_payload(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "percent": job.percent,
+        "message": job.message,
+        "error": job.error,
+        "finished": job.is_finished,
+        "has_file": bool(job.result_file),
+    }
+
+
+@login_required
+def job_list(request):
+    jobs = Job.objects.select_related("created_by")
+    if not request.user.is_admin:
+        jobs = jobs.filter(created_by=request.user)
+    return render(
+        request,
+        "jobs/job_list.html",
+        {"jobs": jobs[:50], "page_title": "Background Jobs"},
+    )
+
+
+@login_required
+def job_detail(request, pk):
+    job = _get_job(request, pk)
+    return render(
+        request,
+        "jobs/job_detail.html",
+        {"job": job, "page_title": job.get_kind_display()},
+    )
+
+
+@login_required
+def job_status(request, pk):
+    """Progress as JSON for the status page to poll."""
+    return JsonResponse(_job_payload(_get_job(request, pk)))
+
+
+@login_required
+def job_download(request, pk):
+    job = _get_job(request, pk)
+    if job.status != "succeeded" or not job.result_file:
+        raise Http404("This job has no file to download.")
+    return FileResponse(
+        job.result_file.open("rb"),
+        as_attachment=True,
+        filename=job.result_file.name.rsplit("/", 1)[-1],
+    )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from managers.utils import issue_tokens_for_date
+from datetime import datetime
+import time
+
+
+class Command(BaseCommand):
+    help = "Issue meal tokens in bulk for every student whose meals are ON for a date"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Date as YYYY-MM-DD (defaults to today)")
+
+    def handle(self, *args, **kwargs):
+        if kwargs.get("date"):
+            try:
+                day = datetime.strptime(kwargs["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            day = timezone.localdate()
+
+        self.stdout.write(f"Issuing meal tokens for {day}...")
+        started = time.monotonic()
+        try:
+            count = issue_tokens_for_date(day)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"{count} tokens issued in {elapsed:.2f}s.")
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("managers", "0012_alter_mealtoken_barcode"),
+        ("students", "0013_hot_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="mealtoken",
+            index=models.Index(
+                fields=["date", "meal_type", "token_type"],
+                name="token_date_meal_type_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+# Tokens are issued day by day, so date follows insertion order and a BRIN
+# index serves export ranges and the retention purge cheaply. PostgreSQL only.
+BRIN_INDEX = "token_date_brin"
+
+
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {BRIN_INDEX} ON managers_mealtoken USING brin (date)"
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {BRIN_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("managers", "0013_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
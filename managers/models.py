@@ -1,10 +1,13 @@
 from django.db import models
-from datetime import date, timedelta
+from django.core.cache import cache
+from datetime import date, datetime, time, timedelta
 from meal_system import settings
 from django.utils import timezone
+import hashlib
+import os
 import uuid
 import qrcode
-import base64
+import qrcode.image.svg
 from io import BytesIO
 
 from students.models import Student
@@ -149,6 +152,61 @@ class SpecialMealRequest(models.Model):
         )
 
 
+# Tokens stop being accepted at these local times on their day
+MEAL_EXPIRY_TIMES = {
+    "breakfast": time(10, 0),
+    "lunch": time(15, 15),
+    "dinner": time(21, 0),
+}
+
+BARCODE_LENGTH = 16
+
+
+def generate_barcodes(count):
+    """
+    Return ``count`` random hex barcodes from a single call to the OS random
+    source, so bulk issuance does not pay per-token UUID overhead.
+    """
+    raw = os.urandom(count * BARCODE_LENGTH // 2).hex()
+    return [
+        raw[i : i + BARCODE_LENGTH] for i in range(0, count * BARCODE_LENGTH, BARCODE_LENGTH)
+    ]
+
+
+# Rendered QR images are immutable for a given payload. Tokens are only valid
+# on the day they are issued, so two days of caching covers their lifetime.
+QR_CACHE_TIMEOUT = 60 * 60 * 24 * 2
+
+QR_CONTENT_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+
+
+def render_qr_image(payload, fmt="png"):
+    """
+    Render a QR code for ``payload`` as SVG or as a compact 1-bit PNG.
+    Returns the image bytes.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10 if fmt == "svg" else 6,
+        border=4,
+        image_factory=qrcode.image.svg.SvgPathImage if fmt == "svg" else None,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    if fmt == "svg":
+        img.save(buffer)
+    else:
+        img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
 class MealToken(models.Model):
     MEAL_CHOICES = [
         ("breakfast", "Breakfast"),
@@ -189,12 +247,17 @@ class MealToken(models.Model):
                 name="unique_token_per_meal_per_day",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["date", "meal_type", "token_type"],
+                name="token_date_meal_type_idx",
+            ),
+        ]
         ordering = ["-issued_at"]
 
 
-    def generate_qr(self):
+    def qr_payload(self):
         """
-        Return QR Code as base64 encoded PNG.
         The encoded payload is a compact, human-readable text with fields:
         STUDENT|MEAL_SLOT|TOKEN_TYPE|DATE|BARCODE
         Example: "Mahfuz Hossain|lunch|main|2025-11-21|A1B2C3D4"
@@ -209,46 +272,43 @@ class MealToken(models.Model):
         barcode = self.barcode or ""
 
         # Compose a compact payload (pipe-separated). Simple and parseable.
-        payload = f"{student_name}|{meal_slot}|{token_type}|{date_str}|{barcode}"
-
-        # Create QR
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(payload)
-        qr.make(fit=True)
+        return f"{student_name}|{meal_slot}|{token_type}|{date_str}|{barcode}"
 
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        img_bytes = buffer.getvalue()
+    def qr_etag(self, fmt="png"):
+        """Stable validator for the rendered QR; changes only with the payload."""
+        return hashlib.sha1(f"{fmt}:{self.qr_payload()}".encode("utf-8")).hexdigest()
 
-        # Convert to base64 string for embedding in <img src="data:...">
-        base64_str = base64.b64encode(img_bytes).decode("utf-8")
-        return base64_str
+    def render_qr(self, fmt="png"):
+        """
+        Return the QR image bytes ("png" or "svg"), rendering it at most once
+        per payload and serving repeat requests from the cache.
+        """
+        cache_key = f"meal_token_qr:{self.qr_etag(fmt)}"
+        image = cache.get(cache_key)
+        if image is None:
+            image = render_qr_image(self.qr_payload(), fmt)
+            cache.set(cache_key, image, QR_CACHE_TIMEOUT)
+        return image
 
-    def save(self, *args, **kwargs):
-        from django.utils import timezone
-        import uuid
+    @staticmethod
+    def expiry_for(meal_type, day):
+        """Aware datetime at which a token for ``meal_type`` on ``day`` expires."""
+        expiry = MEAL_EXPIRY_TIMES.get(meal_type)
+        if expiry is None:
+            return None
+        return timezone.make_aware(datetime.combine(day, expiry))
 
+    def save(self, *args, **kwargs):
         # Generate barcode only once
         if not self.barcode:
-            self.barcode = str(uuid.uuid4())[:12]
+            self.barcode = generate_barcodes(1)[0]
 
         # Auto-set expiry based on meal type
         if not self.expiry_time:
             now = timezone.localtime(
                 self.issued_at if self.issued_at else timezone.now()
             )
-            if self.meal_type == "breakfast":
-                self.expiry_time = now.replace(hour=10, minute=0, second=0)
-            elif self.meal_type == "lunch":
-                self.expiry_time = now.replace(hour=15, minute=15, second=0)
-            elif self.meal_type == "dinner":
-                self.expiry_time = now.replace(hour=21, minute=0, second=0)
+            self.expiry_time = self.expiry_for(self.meal_type, now.date())
 
         super().save(*args, **kwargs)
     
@@ -1,3 +1,261 @@
 from django.test import TestCase
 
+import pytest
+from datetime import date, timedelta
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from students.models import DailyMealStatus, Student, StudentMealPreference, WeeklyMenu
+from .models import MealToken
+from .utils import issue_tokens_for_date
+
 # Create your tests here.
+
+
+def _make_student(username, room_number="101", **kwargs):
+    user = CustomUser.objects.create_user(
+        username=username, password="testtest456", role="student"
+    )
+    return Student.objects.create(
+        user=user, name=username, room_number=room_number, **kwargs
+    )
+
+
+@pytest.fixture
+def manager_client(client):
+    CustomUser.objects.create_user(
+        username="manager", password="testtest456", role="manager"
+    )
+    client.login(username="manager", password="testtest456")
+    return client
+
+
+def _search(client, **params):
+    return client.get(reverse("managers:search_students_by_room"), params)
+
+
+@pytest.mark.django_db
+def test_room_search_runs_fixed_number_of_queries(
+    manager_client, django_assert_max_num_queries
+):
+    today = timezone.localdate()
+    for i in range(6):
+        student = _make_student(f"student{i}", default_prefers_beef=i % 2 == 0)
+        DailyMealStatus.objects.create(student=student, date=today, lunch_on=i != 0)
+        if i == 1:
+            MealToken.objects.create(
+                student=student, date=today, meal_type="breakfast", token_type="main"
+            )
+            StudentMealPreference.objects.create(
+                student=student, month=today.strftime("%Y-%m"), prefers_fish=False
+            )
+
+    # Session, user, students, statuses and preferences, whatever the occupancy
+    with django_assert_max_num_queries(6):
+        response = _search(manager_client, q="101")
+
+    students = {s.name: s for s in response.context["students"]}
+    assert len(students) == 6
+    assert students["student1"].issued_meals == {"breakfast"}
+    assert students["student1"].current_pref == {"prefers_beef": True, "prefers_fish": False}
+    assert students["student0"].current_pref == {"prefers_beef": True, "prefers_fish": True}
+    assert students["student0"].today_status.lunch_on is False
+
+
+@pytest.mark.django_db
+def test_student_search_by_floor_and_name(manager_client):
+    _make_student("Rahim", room_number="203")
+    _make_student("Karim", room_number="305")
+
+    by_floor = _search(manager_client, by="floor", q="2")
+    assert [s.name for s in by_floor.context["students"]] == ["Rahim"]
+
+    by_name = _search(manager_client, by="name", q="kar")
+    assert [s.name for s in by_name.context["students"]] == ["Karim"]
+
+
+def _verify(client, body):
+    return client.post(
+        reverse("managers:verify_token"), body, content_type="application/json"
+    ).json()
+
+
+def _payload(token):
+    return f"{token.student.name}|{token.meal_type}|{token.token_type}|{token.date.isoformat()}|{token.barcode}"
+
+
+@pytest.mark.django_db
+def test_verify_token_redeems_only_once(manager_client):
+    student = _make_student("scanner")
+    token = MealToken.objects.create(
+        student=student,
+        date=timezone.localdate(),
+        meal_type="lunch",
+        token_type="main",
+        expiry_time=timezone.now() + timedelta(hours=1),
+    )
+
+    assert _verify(manager_client, {"payload": _payload(token)})["status"] == "success"
+    second = _verify(manager_client, {"payload": _payload(token)})
+    assert second == {"status": "error", "message": "Token already used!"}
+
+    token.refresh_from_db()
+    assert token.used and token.collected
+
+
+@pytest.mark.django_db
+def test_verify_token_batch_returns_per_payload_results(manager_client):
+    student = _make_student("batchscan")
+    now = timezone.now()
+    fresh = MealToken.objects.create(
+        student=student,
+        date=timezone.localdate(),
+        meal_type="dinner",
+        token_type="main",
+        expiry_time=now + timedelta(hours=1),
+    )
+    expired = MealToken.objects.create(
+        student=student,
+        date=timezone.localdate(),
+        meal_type="lunch",
+        token_type="alternate",
+        expiry_time=now - timedelta(minutes=5),
+    )
+    buffered = MealToken.objects.create(
+        student=student,
+        date=timezone.localdate(),
+        meal_type="breakfast",
+        token_type="main",
+        expiry_time=now - timedelta(minutes=5),
+    )
+
+    data = _verify(
+        manager_client,
+        {
+            "payloads": [
+                _payload(fresh),
+                _payload(expired),
+                {
+                    "payload": _payload(buffered),
+                    "scanned_at": (now - timedelta(minutes=10)).isoformat(),
+                },
+                "not-a-token",
+            ]
+        },
+    )
+
+    assert data["accepted"] == 2
+    assert [r["message"] for r in data["results"]] == [
+        "Token verified & accepted!",
+        "Token expired!",
+        "Token verified & accepted!",
+        "QR format invalid!",
+    ]
+
+
+@pytest.mark.django_db
+def test_verify_token_ignores_untrusted_scan_times(client, manager_client):
+    student = _make_student("backdated")
+    now = timezone.now()
+    tokens = [
+        MealToken.objects.create(
+            student=student,
+            date=timezone.localdate(),
+            meal_type=meal_type,
+            token_type="main",
+            expiry_time=now - timedelta(minutes=5),
+        )
+        for meal_type in ("breakfast", "lunch")
+    ]
+    recent = (now - timedelta(minutes=10)).isoformat()
+    stale = (now - timedelta(hours=3)).isoformat()
+
+    # Far outside the skew window, even from a manager
+    data = _verify(manager_client, {"payloads": [{"payload": _payload(tokens[0]), "scanned_at": stale}]})
+    assert data["results"][0]["message"] == "Token expired!"
+
+    # Anonymous scanners never choose their own scan time
+    client.logout()
+    data = _verify(client, {"payloads": [{"payload": _payload(tokens[1]), "scanned_at": recent}]})
+    assert data["results"][0]["message"] == "Token expired!"
+
+
+@pytest.mark.django_db
+def test_bulk_issue_tokens_for_date(django_assert_max_num_queries):
+    day = date(2025, 3, 3)  # Monday
+    WeeklyMenu.objects.create(
+        day_of_week="Monday", lunch_contains_beef=True, dinner_contains_fish=True
+    )
+    beef = _make_student("beefy")
+    no_beef = _make_student("nobeef", default_prefers_beef=False)
+    off = _make_student("off")
+    DailyMealStatus.objects.create(student=beef, date=day)
+    DailyMealStatus.objects.create(student=no_beef, date=day, breakfast_on=False)
+    DailyMealStatus.objects.create(
+        student=off, date=day, breakfast_on=False, lunch_on=False, dinner_on=False
+    )
+    MealToken.objects.create(student=beef, date=day, meal_type="dinner", token_type="main")
+
+    with django_assert_max_num_queries(8):
+        issued = issue_tokens_for_date(day)
+
+    assert issued == 4
+    tokens = {
+        (t.student.name, t.meal_type): t
+        for t in MealToken.objects.filter(date=day).select_related("student")
+    }
+    assert set(tokens) == {
+        ("beefy", "breakfast"),
+        ("beefy", "lunch"),
+        ("beefy", "dinner"),
+        ("nobeef", "lunch"),
+        ("nobeef", "dinner"),
+    }
+    assert tokens[("nobeef", "lunch")].token_type == "alternate"
+    assert tokens[("nobeef", "dinner")].token_type == "main"
+    assert tokens[("beefy", "lunch")].expiry_time == MealToken.expiry_for("lunch", day)
+    assert len({t.barcode for t in tokens.values()}) == 5
+
+    # Running again issues nothing new
+    assert issue_tokens_for_date(day) == 0
+
+
+@pytest.mark.django_db
+def test_issued_count_leaves_out_skipped_conflicts(monkeypatch):
+    day = date(2025, 3, 3)  # Monday
+    WeeklyMenu.objects.create(day_of_week="Monday")
+    student = _make_student("conflicted")
+    DailyMealStatus.objects.create(student=student, date=day)
+    MealToken.objects.create(
+        student=student, date=day - timedelta(days=1), meal_type="lunch", token_type="main", barcode="taken"
+    )
+    # One fresh barcode collides with an existing token, so its row is skipped
+    monkeypatch.setattr(
+        "managers.utils.generate_barcodes", lambda count: ["taken"] + [f"free{i}" for i in range(1, count)]
+    )
+
+    assert issue_tokens_for_date(day) == 2
+    assert MealToken.objects.filter(date=day).count() == 2
+
+
+@pytest.mark.django_db
+def test_monthly_summary_export_streams_xlsx_and_csv(manager_client):
+    from io import BytesIO
+    from openpyxl import load_workbook
+    from students.models import MonthlyMealSummary
+
+    student = _make_student("exported", default_prefers_fish=False)
+    MonthlyMealSummary.objects.create(
+        student=student, month="2025-03", total_cost="1234.50", total_on_days=20
+    )
+    url = reverse("managers:export_monthly_summary")
+
+    xlsx = manager_client.get(url, {"month": "2025-03"})
+    sheet = load_workbook(BytesIO(b"".join(xlsx.streaming_content))).active
+    rows = list(sheet.values)
+    assert rows[1] == ("101", "exported", 20, "Yes", "No", "Beef + Egg", 1234.5)
+
+    csv_response = manager_client.get(url, {"month": "2025-03", "format": "csv"})
+    lines = b"".join(csv_response.streaming_content).decode().splitlines()
+    assert lines[1] == "101,exported,20,Yes,No,Beef + Egg,1234.5"
@@ -52,6 +52,8 @@ urlpatterns = [
         views.export_daily_token_summary,
         name="export_daily_token_summary",
     ),
+    path("issue-tokens/", views.issue_tokens_bulk, name="issue_tokens_bulk"),
+    path("kitchen-headcount/", views.kitchen_headcount, name="kitchen_headcount"),
     path("scan-token/", views.scan_token_page, name="scan_token_page"),
     path("verify-token/", views.verify_token, name="verify_token"),
 ]
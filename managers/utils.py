@@ -0,0 +1,235 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from students.models import DailyMealStatus, MonthlyMealSummary, Student
+from students.utils import (
+    MEALS,
+    PreferenceResolver,
+    get_menu_for_date,
+    resolve_preferences,
+    token_type_for,
+)
+
+from .models import MealToken, generate_barcodes
+
+TOKEN_BATCH_SIZE = 1000
+
+
+def issue_tokens_for_date(day, issued_by=None):
+    """
+    Issue a token for every meal that is ON in the day's DailyMealStatus
+    rows, skipping meals that already have one.
+
+    Menus and preferences are resolved in memory and every token is written
+    with a single bulk_create, so a full hall takes a handful of queries.
+    Returns the number of tokens issued. Raises ValueError when no menu is
+    set for the day.
+    """
+    menu = get_menu_for_date(day)
+    if menu is None:
+        raise ValueError(f"No menu is set for {day.strftime('%A')}.")
+
+    statuses = list(
+        DailyMealStatus.objects.filter(date=day)
+        .filter(Q(breakfast_on=True) | Q(lunch_on=True) | Q(dinner_on=True))
+        .select_related("student")
+        .order_by()
+    )
+    already_issued = set(
+        MealToken.objects.filter(date=day).values_list("student_id", "meal_type")
+    )
+    prefs = resolve_preferences([s.student for s in statuses], day.strftime("%Y-%m"))
+
+    pending = [
+        (status.student_id, meal)
+        for status in statuses
+        for meal in MEALS
+        if getattr(status, f"{meal}_on")
+        and (status.student_id, meal) not in already_issued
+    ]
+    barcodes = generate_barcodes(len(pending))
+    expiries = {meal: MealToken.expiry_for(meal, day) for meal in MEALS}
+
+    tokens = [
+        MealToken(
+            student_id=student_id,
+            date=day,
+            meal_type=meal,
+            token_type=token_type_for(meal, menu, *prefs[student_id]),
+            issued_by=issued_by,
+            barcode=barcode,
+            expiry_time=expiries[meal],
+        )
+        for (student_id, meal), barcode in zip(pending, barcodes)
+    ]
+
+    with transaction.atomic():
+        # A manager may issue the odd token by hand while this runs
+        MealToken.objects.bulk_create(
+            tokens, batch_size=TOKEN_BATCH_SIZE, ignore_conflicts=True
+        )
+        # Skipped conflicts are not reported, so count the rows that landed
+        # with the barcode we gave them; a barcode already held by another
+        # token does not count
+        wanted = {(t.barcode, t.student_id, t.meal_type) for t in tokens}
+        barcodes = [token.barcode for token in tokens]
+        issued = sum(
+            row in wanted
+            for start in range(0, len(barcodes), TOKEN_BATCH_SIZE)
+            for row in MealToken.objects.filter(
+                barcode__in=barcodes[start : start + TOKEN_BATCH_SIZE]
+            ).values_list("barcode", "student_id", "meal_type")
+        )
+
+    return issued
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Cap for free-text columns such as usernames
+MAX_COLUMN_WIDTH = 40
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _column_widths(headers, value_lengths):
+    """
+    Widths from the header and the longest value a column can hold.
+    Write-only worksheets need widths before the first row, so they cannot
+    be measured from the data without a second pass.
+    """
+    return [
+        min(max(len(header), length), MAX_COLUMN_WIDTH) + 2
+        for header, length in zip(headers, value_lengths)
+    ]
+
+
+def write_xlsx(fileobj, title, headers, widths, rows):
+    """
+    Stream rows into an openpyxl write-only workbook, which spools each row
+    to disk instead of keeping every cell in memory.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    for index, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+
+    wb.save(fileobj)
+
+
+def _meal_type_label(prefers_beef, prefers_fish):
+    if prefers_beef and prefers_fish:
+        return "Beef + Fish"
+    if not prefers_beef and prefers_fish:
+        return "Mutton + Fish"
+    if prefers_beef and not prefers_fish:
+        return "Beef + Egg"
+    return "Mutton + Egg"
+
+
+SUMMARY_EXPORT_HEADERS = [
+    "Room Number",
+    "Student Name",
+    "Total ON Days",
+    "Prefers Beef",
+    "Prefers Fish",
+    "Meal Type",
+    "Total Cost (৳)",
+]
+
+
+def summary_export_rows(month):
+    """Yield one export row per MonthlyMealSummary, loading them in chunks."""
+    summaries = (
+        MonthlyMealSummary.objects.filter(month=month)
+        .select_related("student")
+        .order_by("student__room_number")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    resolver = PreferenceResolver()
+
+    for chunk in _chunked(summaries, EXPORT_CHUNK_SIZE):
+        prefs = resolver.resolve([s.student for s in chunk], month)
+        for s in chunk:
+            prefers_beef, prefers_fish = prefs[s.student_id]
+            yield [
+                s.student.room_number,
+                s.student.name,
+                s.total_on_days,
+                "Yes" if prefers_beef else "No",
+                "Yes" if prefers_fish else "No",
+                _meal_type_label(prefers_beef, prefers_fish),
+                float(s.total_cost),
+            ]
+
+
+def summary_export_widths():
+    return _column_widths(
+        SUMMARY_EXPORT_HEADERS,
+        [
+            Student._meta.get_field("room_number").max_length,
+            Student._meta.get_field("name").max_length,
+            3,
+            3,
+            3,
+            len("Mutton + Fish"),
+            12,
+        ],
+    )
+
+
+TOKEN_EXPORT_HEADERS = ["Student", "Room", "Meal", "Token Type", "Issued At", "Issued By"]
+
+
+def token_export_rows(start_date, end_date):
+    """Yield one export row per MealToken issued between the two dates."""
+    tokens = (
+        MealToken.objects.filter(date__range=(start_date, end_date))
+        .select_related("student", "issued_by")
+        .order_by("date", "issued_at")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for token in tokens:
+        yield [
+            token.student.name,
+            token.student.room_number,
+            token.meal_type.capitalize(),
+            token.token_type.capitalize(),
+            timezone.localtime(token.issued_at).strftime("%Y-%m-%d %H:%M:%S"),
+            token.issued_by.username if token.issued_by else "N/A",
+        ]
+
+
+def token_export_widths():
+    return _column_widths(
+        TOKEN_EXPORT_HEADERS,
+        [
+            Student._meta.get_field("name").max_length,
+            Student._meta.get_field("room_number").max_length,
+            len("Breakfast"),
+            len("Alternate"),
+            len("YYYY-MM-DD HH:MM:SS"),
+            MAX_COLUMN_WIDTH,
+        ],
+    )
@@ -1,23 +1,37 @@
-import csv, json
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import render
+import csv, json, tempfile
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
-from openpyxl import Workbook
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 
-from students.utils import generate_monthly_summary_for_all
-from students.models import Complaint, DailyMealStatus, MonthlyMealSummary, Student, StudentMealPreference
+from jobs.utils import enqueue_job
+from students.utils import (
+    get_daily_headcount,
+    get_menu_for_date,
+    get_preference_resolver,
+    is_month_archived,
+)
+from students.models import Complaint, DailyMealStatus, MonthlyMealSummary, Student, WEEKDAY_CHOICES
 from .models import ManagerProfile, MealToken, WeeklyMenuProposal
-from students.models import MonthlyMealSummary, WeeklyMenu, WEEKDAY_CHOICES
 from .forms import WeeklyMenuProposalForm
+from .utils import (
+    SUMMARY_EXPORT_HEADERS,
+    TOKEN_EXPORT_HEADERS,
+    summary_export_rows,
+    summary_export_widths,
+    token_export_rows,
+    token_export_widths,
+    token_type_for,
+    write_xlsx,
+)
 from accounts.decorators import manager_required, admin_required
 from datetime import date, datetime, timedelta
 
 
-from .models import SpecialMealRequest, MealToken
+from .models import SpecialMealRequest
 from .forms import SpecialMealRequestForm
 
 def is_manager(user):
@@ -120,12 +134,7 @@ def propose_weekly_menu(request):
     )
 
 
-from django.shortcuts import render
-from django.db.models import Q
-from datetime import date
-from students.models import MonthlyMealSummary, StudentMealPreference, Student
-from students.utils import generate_monthly_summary_for_all
-from django.contrib.auth.decorators import user_passes_test
+from django.db.models import Exists, OuterRef, Prefetch, Q
 
 
 @user_passes_test(is_admin_or_manager)
@@ -151,15 +160,9 @@ def monthly_summary_view(request):
     sort_by = request.GET.get("sort")  # 'room', 'days', 'cost'
 
     # ----------------------------
-    # Step 3: Ensure monthly summary exists
-    # ----------------------------
-    if not MonthlyMealSummary.objects.filter(month=selected_month).exists():
-        year, month = map(int, selected_month.split("-"))
-        generate_monthly_summary_for_all(year, month)
-
-    # ----------------------------
-    # Step 4: Fetch summaries and preferences
+    # Step 3: Fetch summaries and preferences
     # ----------------------------
+    # Summaries are kept current as statuses change; this view only reads
     summaries = list(
         MonthlyMealSummary.objects.filter(month=selected_month).select_related(
             "student"
@@ -167,18 +170,15 @@ def monthly_summary_view(request):
     )
 
     # Attach meal preferences
-    prefs = {
-        p.student_id: p
-        for p in StudentMealPreference.objects.filter(month=selected_month)
-    }
+    prefs = get_preference_resolver(request).resolve(
+        [s.student for s in summaries], selected_month
+    )
 
     for s in summaries:
-        pref = prefs.get(s.student.id)
-        s.prefers_beef = pref.prefers_beef if pref else True
-        s.prefers_fish = pref.prefers_fish if pref else True
+        s.prefers_beef, s.prefers_fish = prefs[s.student_id]
 
     # ----------------------------
-    # Step 5: Apply filters
+    # Step 4: Apply filters
     # ----------------------------
     if filter_type == "beef_fish":
         summaries = [s for s in summaries if s.prefers_beef and s.prefers_fish]
@@ -186,7 +186,7 @@ def monthly_summary_view(request):
         summaries = [s for s in summaries if not s.prefers_beef or not s.prefers_fish]
 
     # ----------------------------
-    # Step 6: Compute statistics
+    # Step 5: Compute statistics
     # ----------------------------
     beef_count = sum(1 for s in summaries if s.prefers_beef)
     no_beef_count = sum(1 for s in summaries if not s.prefers_beef)
@@ -195,7 +195,7 @@ def monthly_summary_view(request):
     total_cost = sum(float(s.total_cost) for s in summaries)
 
     # ----------------------------
-    # Step 7: Apply sorting
+    # Step 6: Apply sorting
     # ----------------------------
     if sort_by == "room":
         summaries.sort(key=lambda s: s.student.room_number or "")
@@ -205,7 +205,7 @@ def monthly_summary_view(request):
         summaries.sort(key=lambda s: float(s.total_cost), reverse=True)
 
     # ----------------------------
-    # Step 8: Render template
+    # Step 7: Render template
     # ----------------------------
     return render(
         request,
@@ -226,110 +226,92 @@ def monthly_summary_view(request):
     )
 
 
-def _get_summaries_and_prefs(month):
-    summaries = (
-        MonthlyMealSummary.objects.filter(month=month)
-        .select_related("student")
-        .order_by("student__room_number")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class _Echo:
+    """File-like object that hands each written CSV line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _xlsx_response(filename, title, headers, widths, rows):
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(tmp, title, headers, widths, rows)
+    tmp.seek(0)
+    return FileResponse(
+        tmp, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE
     )
-    prefs = {p.student_id: p for p in StudentMealPreference.objects.filter(month=month)}
-    return summaries, prefs
-
-
-def _determine_pref_values(s, prefs):
-    pref = prefs.get(s.student.id)
-    prefers_beef = pref.prefers_beef if pref else getattr(s.student, "default_prefers_beef", True)
-    prefers_fish = pref.prefers_fish if pref else getattr(s.student, "default_prefers_fish", True)
-    return prefers_beef, prefers_fish
-
-
-def _meal_type_label(prefers_beef, prefers_fish):
-    if prefers_beef and prefers_fish:
-        return "Beef + Fish"
-    if not prefers_beef and prefers_fish:
-        return "Mutton + Fish"
-    if prefers_beef and not prefers_fish:
-        return "Beef + Egg"
-    return "Mutton + Egg"
-
-
-def _build_workbook(summaries, prefs, month):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Summary_{month}"
-
-    headers = [
-        "Room Number",
-        "Student Name",
-        "Total ON Days",
-        "Prefers Beef",
-        "Prefers Fish",
-        "Meal Type",
-        "Total Cost (৳)",
-    ]
-    ws.append(headers)
 
-    for s in summaries:
-        prefers_beef, prefers_fish = _determine_pref_values(s, prefs)
-        meal_type = _meal_type_label(prefers_beef, prefers_fish)
-
-        ws.append(
-            [
-                s.student.room_number,
-                s.student.name,
-                s.total_on_days,
-                "Yes" if prefers_beef else "No",
-                "Yes" if prefers_fish else "No",
-                meal_type,
-                float(s.total_cost),
-            ]
-        )
 
-    # Style header row
-    for cell in ws[1]:
-        cell.font = cell.font.copy(bold=True)
+def _csv_response(filename, headers, rows):
+    writer = csv.writer(_Echo())
 
-    # Adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                max_length = max(max_length, len(str(cell.value)))
-            except Exception:
-                pass
-        ws.column_dimensions[column].width = max_length + 2
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
-    return wb
+
+def _valid_month(value):
+    try:
+        datetime.strptime(value or "", "%Y-%m")
+    except ValueError:
+        return False
+    return True
 
 
 @user_passes_test(is_admin_or_manager)
 def export_monthly_summary(request):
+    """GET streams the export; POST builds it on the job worker instead."""
+    if request.method == "POST":
+        month = request.POST.get("month")
+        if not _valid_month(month):
+            return HttpResponse("Month parameter missing.", status=400)
+        job = enqueue_job(
+            "export_monthly_summary",
+            {"month": month, "file_format": request.POST.get("format", "xlsx")},
+            user=request.user,
+        )
+        return redirect("jobs:job_detail", pk=job.pk)
+
     month = request.GET.get("month")
     if not month:
         return HttpResponse("Month parameter missing.", status=400)
 
-    summaries, prefs = _get_summaries_and_prefs(month)
-    wb = _build_workbook(summaries, prefs, month)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M")
+    rows = summary_export_rows(month)
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    filename = f"Meal_Summary_{month}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if request.GET.get("format") == "csv":
+        return _csv_response(f"Meal_Summary_{month}_{stamp}.csv", SUMMARY_EXPORT_HEADERS, rows)
 
-    wb.save(response)
-    return response
+    return _xlsx_response(
+        f"Meal_Summary_{month}_{stamp}.xlsx",
+        f"Summary_{month}",
+        SUMMARY_EXPORT_HEADERS,
+        summary_export_widths(),
+        rows,
+    )
 
 
 @user_passes_test(is_admin_or_manager)
 def regenerate_monthly_summary(request, month):
-    from students.utils import generate_monthly_summary_for_all
+    if request.method != "POST" or not _valid_month(month):
+        return redirect("managers:monthly_summary")
 
-    y, m = map(int, month.split("-"))
-    generate_monthly_summary_for_all(y, m)
-    messages.success(request, f"Monthly summary regenerated for {month}")
-    return redirect("managers:monthly_summary")
+    year, month_number = map(int, month.split("-"))
+    if is_month_archived(year, month_number):
+        messages.error(request, f"{month} is archived; its summaries are final.")
+        return redirect("managers:monthly_summary")
+
+    job = enqueue_job("regenerate_monthly_summary", {"month": month}, user=request.user)
+    messages.success(request, f"Monthly summary regeneration queued for {month}")
+    return redirect("jobs:job_detail", pk=job.pk)
 
 
 @user_passes_test(is_admin_or_manager)
@@ -417,36 +399,87 @@ def manager_profile_view(request):
     return render(request, "managers/profile.html", context)
 
 
+STUDENT_SEARCH_FIELDS = [
+    ("room", "Room number"),
+    ("floor", "Floor"),
+    ("name", "Name"),
+    ("university_id", "University ID"),
+]
+
+# Name and floor searches can match a lot of students
+STUDENT_SEARCH_LIMIT = 100
+
+
+def _student_search_filter(search_by, query):
+    if search_by == "floor":
+        return Q(room_number__startswith=query)
+    if search_by == "name":
+        return Q(name__istartswith=query)
+    if search_by == "university_id":
+        return Q(studentdetails__university_id=query)
+    return Q(room_number=query)
+
+
 @login_required
 @user_passes_test(manager_required)
 def search_students_by_room(request):
     students = []
-    room_number = request.GET.get("room_number")
+    search_by = request.GET.get("by", "room")
+    if search_by not in dict(STUDENT_SEARCH_FIELDS):
+        search_by = "room"
+    # "room_number" is kept so existing links keep working
+    query = (request.GET.get("q") or request.GET.get("room_number") or "").strip()
     today = timezone.localdate()
+    meals = ["breakfast", "lunch", "dinner"]
+
+    if query:
+        issued_tokens = MealToken.objects.filter(student=OuterRef("pk"), date=today)
+        students = list(
+            Student.objects.filter(_student_search_filter(search_by, query))
+            .annotate(
+                **{
+                    f"{meal}_issued": Exists(issued_tokens.filter(meal_type=meal))
+                    for meal in meals
+                }
+            )
+            .prefetch_related(
+                Prefetch(
+                    "dailymealstatus_set",
+                    queryset=DailyMealStatus.objects.filter(date=today),
+                    to_attr="today_statuses",
+                )
+            )
+            .order_by("room_number", "name")[:STUDENT_SEARCH_LIMIT]
+        )
 
-    if room_number:
-        students = Student.objects.filter(room_number=room_number)
+        prefs = get_preference_resolver(request).resolve(
+            students, today.strftime("%Y-%m")
+        )
         for student in students:
             # Today's status
-            student.today_status = DailyMealStatus.objects.filter(
-                student=student, date=today
-            ).first()
+            student.today_status = (
+                student.today_statuses[0] if student.today_statuses else None
+            )
 
-            # Current month's preference
-            student.current_pref = StudentMealPreference.objects.filter(
-                student=student, month=today.strftime("%Y-%m")
-            ).first()
+            # Current month's effective preference
+            prefers_beef, prefers_fish = prefs[student.id]
+            student.current_pref = {
+                "prefers_beef": prefers_beef,
+                "prefers_fish": prefers_fish,
+            }
 
             # Tokens already issued today
-            tokens = MealToken.objects.filter(student=student, date=today)
-            student.issued_meals = {token.meal_type for token in tokens}
-
-    meals = ["breakfast", "lunch", "dinner"]
+            student.issued_meals = {
+                meal for meal in meals if getattr(student, f"{meal}_issued")
+            }
 
     context = {
         "page_title": "Issue Daily Token",
         "students": students,
-        "room_number": room_number,
+        "query": query,
+        "search_by": search_by,
+        "search_fields": STUDENT_SEARCH_FIELDS,
+        "room_number": query if search_by == "room" else "",
         "today": today,
         "meals": meals,
     }
@@ -469,38 +502,18 @@ def issue_token(request, student_id, meal_type):
         return redirect(request.META.get('HTTP_REFERER', '/'))
 
     # Get student meal preference for current month
-    pref = StudentMealPreference.objects.filter(
-        student=student, month=today.strftime("%Y-%m")
-    ).first()
+    prefers_beef, prefers_fish = get_preference_resolver(request).get(
+        student, today.strftime("%Y-%m")
+    )
 
     # Get today's menu
-    weekly_menu = WeeklyMenu.objects.get(day_of_week=today.strftime("%A"))
+    weekly_menu = get_menu_for_date(today)
+    if weekly_menu is None:
+        messages.error(request, "No menu is set for today, so tokens cannot be issued.")
+        return redirect(request.META.get("HTTP_REFERER", "/"))
 
     # Determine token type
-    token_type = "main"
-    if (
-        (
-            meal_type == "lunch"
-            and weekly_menu.lunch_contains_beef
-            and not pref.prefers_beef
-        )
-        or (
-            meal_type == "lunch"
-            and weekly_menu.lunch_contains_fish
-            and not pref.prefers_fish
-        )
-        or (
-            meal_type == "dinner"
-            and weekly_menu.dinner_contains_beef
-            and not pref.prefers_beef
-        )
-        or (
-            meal_type == "dinner"
-            and weekly_menu.dinner_contains_fish
-            and not pref.prefers_fish
-        )
-    ):
-        token_type = "alternate"
+    token_type = token_type_for(meal_type, weekly_menu, prefers_beef, prefers_fish)
 
     # Create token
     MealToken.objects.create(
@@ -552,52 +565,83 @@ def daily_token_summary(request):
 
 @login_required
 @user_passes_test(manager_required)
-def export_daily_token_summary(request):
-    # Get date from query params or use today
-    date_str = request.GET.get("date")
-    if date_str:
-        from datetime import datetime
-
+def kitchen_headcount(request):
+    """Main and alternate portions per meal, tomorrow by default."""
+    day = timezone.localdate() + timedelta(days=1)
+    if request.GET.get("date"):
         try:
-            date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            day = datetime.strptime(request.GET["date"], "%Y-%m-%d").date()
         except ValueError:
-            date = timezone.localdate()
-    else:
-        date = timezone.localdate()
-
-    tokens = MealToken.objects.filter(date=date)
-
-    # Create Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Tokens_{date}"
-
-    # Header row
-    headers = ["Student", "Room", "Meal", "Token Type", "Issued At", "Issued By"]
-    ws.append(headers)
-
-    # Data rows
-    for token in tokens:
-        ws.append(
-            [
-                token.student.name,
-                token.student.room_number,
-                token.meal_type.capitalize(),
-                token.token_type.capitalize(),
-                token.issued_at.strftime("%Y-%m-%d %H:%M:%S"),
-                token.issued_by.username if token.issued_by else "N/A",
-            ]
-        )
+            messages.error(request, "Invalid date. Showing tomorrow instead.")
 
-    # Response
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    headcount = get_daily_headcount(day)
+    return render(
+        request,
+        "managers/kitchen_headcount.html",
+        {
+            "headcount": headcount,
+            "day": day,
+            "page_title": "Kitchen Headcount",
+        },
     )
-    response["Content-Disposition"] = (
-        f'attachment; filename="daily_token_summary_{date}.xlsx"'
+
+
+@login_required
+@user_passes_test(manager_required)
+def issue_tokens_bulk(request):
+    """Queue token issuance for every student whose meals are ON for a date."""
+    if request.method != "POST":
+        return redirect("managers:daily_token_summary")
+
+    day = _parse_export_date(request.POST.get("date"), timezone.localdate())
+    job = enqueue_job("issue_tokens", {"dates": [day.isoformat()]}, user=request.user)
+    messages.success(request, f"Token issuance queued for {day}")
+    return redirect("jobs:job_detail", pk=job.pk)
+
+
+def _parse_export_date(value, default):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return default
+
+
+@login_required
+@user_passes_test(manager_required)
+def export_daily_token_summary(request):
+    # Get date from query params or use today; ?start=&end= exports a range
+    today = timezone.localdate()
+    params = request.POST if request.method == "POST" else request.GET
+    day = _parse_export_date(params.get("date"), today)
+    start_date = _parse_export_date(params.get("start"), day)
+    end_date = _parse_export_date(params.get("end"), start_date)
+
+    if request.method == "POST":
+        # Long ranges are built on the job worker rather than in the request
+        job = enqueue_job(
+            "export_token_summary",
+            {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+                "file_format": params.get("format", "xlsx"),
+            },
+            user=request.user,
+        )
+        return redirect("jobs:job_detail", pk=job.pk)
+
+    label = str(start_date) if start_date == end_date else f"{start_date}_to_{end_date}"
+    rows = token_export_rows(start_date, end_date)
+
+    if request.GET.get("format") == "csv":
+        return _csv_response(f"daily_token_summary_{label}.csv", TOKEN_EXPORT_HEADERS, rows)
+
+    return _xlsx_response(
+        f"daily_token_summary_{label}.xlsx",
+        f"Tokens_{label}"[:31],
+        TOKEN_EXPORT_HEADERS,
+        token_export_widths(),
+        rows,
     )
-    wb.save(response)
-    return response
 
 
 def get_today_stats():
@@ -622,39 +666,122 @@ def scan_token_page(request):
     )
 
 
-@csrf_exempt
-def verify_token(request):
-    if request.method != "POST":
-        return JsonResponse({"status": "error", "message": "Invalid request method"})
+# Upper bound on payloads an offline scanner may upload in one request
+VERIFY_BATCH_LIMIT = 500
+
+# How far back a manager's scanner may date a buffered scan
+SCAN_TIME_MAX_SKEW = timedelta(minutes=15)
+
+
+def _verify_result(status, message):
+    return {"status": status, "message": message}
 
-    data = json.loads(request.body)
-    payload = data.get("payload", "")
 
+def _redeem_token(payload, scanned_by, scanned_at):
+    """
+    Mark the token in a QR payload as used with a single conditional UPDATE.
+    Only one concurrent scan can match "used = false", so a token can never
+    be redeemed twice. The row is only read again to explain a failure.
+    """
     try:
         student_name, meal_slot, token_type, date_str, barcode = payload.split("|")
-    except:
-        return JsonResponse({"status": "error", "message": "QR format invalid!"})
-
-    # Find the token
-    token = MealToken.objects.filter(
-        barcode=barcode, date=date_str, meal_type=meal_slot
-    ).first()
+        token_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (AttributeError, ValueError):
+        return _verify_result("error", "QR format invalid!")
 
+    token_filter = MealToken.objects.filter(
+        barcode=barcode, date=token_date, meal_type=meal_slot
+    )
+    updates = {"used": True, "collected": True}
+    if scanned_by is not None:
+        updates["issued_by"] = scanned_by
+
+    redeemed = token_filter.filter(
+        Q(expiry_time__isnull=True) | Q(expiry_time__gte=scanned_at),
+        used=False,
+    ).update(**updates)
+    if redeemed:
+        return _verify_result("success", "Token verified & accepted!")
+
+    token = token_filter.values("used", "expiry_time").first()
     if not token:
-        return JsonResponse({"status": "error", "message": "Token not found!"})
+        return _verify_result("error", "Token not found!")
+    if token["used"]:
+        return _verify_result("error", "Token already used!")
+    return _verify_result("error", "Token expired!")
+
+
+def _trusted_scanner(user):
+    return user is not None and (user.is_manager or user.is_admin)
+
+
+def _scan_time(item, now, trusted):
+    """
+    Offline scanners send the time each code was scanned so tokens are
+    judged against their expiry at scan time. Only a logged-in manager's
+    scanner is believed, and only within SCAN_TIME_MAX_SKEW of now;
+    anything else is judged at now.
+    """
+    scanned_at = item.get("scanned_at") if isinstance(item, dict) else None
+    if not trusted or not scanned_at:
+        return now
+    parsed = parse_datetime(str(scanned_at))
+    if parsed is None:
+        return now
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    if not now - SCAN_TIME_MAX_SKEW <= parsed <= now:
+        return now
+    return parsed
 
-    # Check expiration
-    if timezone.now() > token.expiry_time:
-        return JsonResponse({"status": "error", "message": "Token expired!"})
 
-    # Check if already used
-    if token.used:
-        return JsonResponse({"status": "error", "message": "Token already used!"})
+@csrf_exempt
+def verify_token(request):
+    """
+    Redeem scanned meal tokens.
+
+    Accepts {"payload": "<qr text>"} for a single scan, or
+    {"payloads": ["<qr text>" | {"payload": ..., "scanned_at": ...}, ...]}
+    from buffered scanners, which gets one result per payload. scanned_at
+    is only honoured for manager scanners (see _scan_time).
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request method"})
 
-    # Mark as used
-    token.used = True
-    token.collected = True
-    token.issued_by = request.user
-    token.save()
+    try:
+        data = json.loads(request.body)
+    except (TypeError, ValueError):
+        return JsonResponse({"status": "error", "message": "Invalid JSON body"})
+    if not isinstance(data, dict):
+        return JsonResponse({"status": "error", "message": "Invalid JSON body"})
+
+    scanned_by = request.user if request.user.is_authenticated else None
+    now = timezone.now()
+
+    if "payloads" not in data:
+        return JsonResponse(_redeem_token(data.get("payload", ""), scanned_by, now))
+
+    items = data["payloads"]
+    if not isinstance(items, list) or len(items) > VERIFY_BATCH_LIMIT:
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": f"payloads must be a list of at most {VERIFY_BATCH_LIMIT} scans",
+            }
+        )
+
+    trusted = _trusted_scanner(scanned_by)
+    results = []
+    for item in items:
+        payload = item.get("payload", "") if isinstance(item, dict) else item
+        result = _redeem_token(payload, scanned_by, _scan_time(item, now, trusted))
+        result["payload"] = payload
+        results.append(result)
 
-    return JsonResponse({"status": "success", "message": "Token verified & accepted!"})
+    return JsonResponse(
+        {
+            "status": "success",
+            "accepted": sum(1 for r in results if r["status"] == "success"),
+            "results": results,
+        }
+    )
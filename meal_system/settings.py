@@ -60,6 +60,7 @@ INSTALLED_APPS = [
     "managers.apps.ManagersConfig",
     "votes.apps.VotesConfig",
     "chatbot.apps.ChatbotConfig",
+    "jobs.apps.JobsConfig",
     # add
     "django_recaptcha",
     "widget_tweaks",
@@ -126,6 +127,32 @@ DATABASES = {
 }
 
 
+# Cache
+# Invalidation relies on version stamps stored without expiry, so the cache
+# must not evict them. Deployments use the shared Redis from
+# docker-compose.yml (CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://redis:6379/1), which never evicts under its default
+# policy. The file-based fallback is for single-host development: it lists
+# its directory on every set and culls random entries once full, so it gets
+# a limit far above what menus, histories, QR codes and dashboards need.
+
+CACHE_BACKEND = env.str(
+    "CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": env.str("CACHE_LOCATION", default=str(BASE_DIR / ".cache")),
+    }
+}
+if CACHE_BACKEND.endswith("FileBasedCache"):
+    CACHES["default"]["OPTIONS"] = {
+        "MAX_ENTRIES": env.int("CACHE_MAX_ENTRIES", default=100_000),
+        # Drop a tenth of the entries when full instead of a third
+        "CULL_FREQUENCY": env.int("CACHE_CULL_FREQUENCY", default=10),
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -170,6 +197,9 @@ STATICFILES_DIRS = [
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+# Compressed per-month fixtures written by `manage.py archive_meal_records`
+MEAL_ARCHIVE_ROOT = env.path("MEAL_ARCHIVE_ROOT", default=BASE_DIR / "archive")
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -38,6 +38,7 @@ urlpatterns = [
     path("notices/", include("notices.urls")),
     path("votes/", include("votes.urls")),
     path("chatbot/", include("chatbot.urls")),
+    path("jobs/", include("jobs.urls", namespace="jobs")),
 ]
 
 if settings.DEBUG:
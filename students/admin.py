@@ -1,11 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from jobs.utils import enqueue_job
 from .models import (
     Student,
     StudentDetails,
     StudentMealPreference,
     WeeklyMenu,
+    WeeklyMenuVersion,
     DailyMealStatus,
     DailyMealCost,
+    DailyHeadcount,
     MonthlyMealSummary,
     Complaint
 )
@@ -73,11 +76,31 @@ class WeeklyMenuAdmin(admin.ModelAdmin):
     dinner_display.short_description = "Dinner"
 
 
+@admin.register(WeeklyMenuVersion)
+class WeeklyMenuVersionAdmin(admin.ModelAdmin):
+    list_display = ("day_of_week", "valid_from", "valid_to", "breakfast_cost", "lunch_cost", "dinner_cost")
+    list_filter = ("day_of_week",)
+    date_hierarchy = "valid_from"
+
+
 @admin.register(DailyMealStatus)
 class DailyMealStatusAdmin(admin.ModelAdmin):
     list_display = ("student", "date", "breakfast_on", "lunch_on", "dinner_on")
     list_filter = ("date", "breakfast_on", "lunch_on", "dinner_on")
     search_fields = ("student__name",)
+    actions = ["issue_tokens_for_dates"]
+
+    @admin.action(description="Issue meal tokens for all students on the selected dates")
+    def issue_tokens_for_dates(self, request, queryset):
+        days = sorted(set(queryset.values_list("date", flat=True)))
+        job = enqueue_job(
+            "issue_tokens", {"dates": [day.isoformat() for day in days]}, user=request.user
+        )
+        self.message_user(
+            request,
+            f"Token issuance for {len(days)} dates queued as job #{job.pk}.",
+            messages.SUCCESS,
+        )
 
 
 @admin.register(DailyMealCost)
@@ -87,6 +110,12 @@ class DailyMealCostAdmin(admin.ModelAdmin):
     search_fields = ("student__name",)
 
 
+@admin.register(DailyHeadcount)
+class DailyHeadcountAdmin(admin.ModelAdmin):
+    list_display = ("date", "meal", "token_type", "count", "frozen", "updated_at")
+    list_filter = ("date", "meal", "frozen")
+
+
 @admin.register(MonthlyMealSummary)
 class MonthlyMealSummaryAdmin(admin.ModelAdmin):
     list_display = ("student", "month", "total_on_days", "total_cost")
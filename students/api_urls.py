@@ -6,6 +6,12 @@ urlpatterns = [
     path(
         "meal-status/today/", api_views.today_meal_status, name="api_today_meal_status"
     ),
+    path(
+        "meal-status/batch/", api_views.meal_status_batch, name="api_meal_status_batch"
+    ),
+    path("meal-status/", api_views.meal_status_range, name="api_meal_status_range"),
+    path("meal-cost/", api_views.meal_cost_range, name="api_meal_cost_range"),
+    path("headcount/", api_views.daily_headcount, name="api_daily_headcount"),
     path("meal-cost/today/", api_views.today_meal_cost, name="api_today_meal_cost"),
     path("monthly-summary/", api_views.monthly_summary, name="api_monthly_summary"),
     path(
@@ -13,5 +19,8 @@ urlpatterns = [
     ),
     path("complaints/my/", api_views.my_complaints, name="api_my_complaints"),
     path("student/profile/", api_views.student_profile, name="api_student_profile"),
+    path(
+        "student/dashboard/", api_views.student_dashboard, name="api_student_dashboard"
+    ),
     path("notices/today/", api_views.today_notices, name="api_today_notices"),
 ]
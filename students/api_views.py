@@ -1,67 +1,325 @@
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from datetime import date
-from .models import Complaint, DailyMealStatus, DailyMealCost, MonthlyMealSummary, StudentDetails, StudentMealPreference, WeeklyMenu, WeeklyMenuReview
+from datetime import date, datetime, timedelta
+from functools import wraps
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.timezone import localtime, now
+from .models import DailyMealStatus, DailyMealCost, MonthlyMealSummary, WeeklyMenuReview
 from .serializers import (
-    ComplaintSerializer,
     DailyMealStatusSerializer,
     DailyMealCostSerializer,
-    MonthlyMealSummarySerializer,
-    StudentDetailsSerializer,
-    StudentMealPreferenceSerializer,
-    StudentSerializer,
+    MealStatusBatchSerializer,
     WeeklyMenuReviewSerializer,
-    WeeklyMenuSerializer,
+)
+from .utils import (
+    CLOSED_MONTH_MAX_AGE,
+    DASHBOARD_CACHE_TIMEOUT,
+    MEAL_HISTORY_CACHE_TIMEOUT,
+    bulk_upsert_meal_statuses,
+    first_editable_meal_date,
+    get_daily_headcount,
+    is_closed_range,
+    meal_history_etag,
+    meal_range_cache_key,
+    menu_validator,
+    student_dashboard_cache_key,
+)
+from .services import (
+    OVERVIEW_SECTIONS,
+    TODAY_NOTICES,
+    complaints_data,
+    load_student,
+    menu_data,
+    overview_data,
+    profile_data,
 )
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+def conditional_get(validators, max_age=0):
+    """
+    Answer GET/HEAD with 304 Not Modified before the view queries or
+    serializes anything when the client already holds the current payload.
+
+    ``validators(request, *args, **kwargs)`` returns (etag, last_modified),
+    either of which may be None; last_modified is a POSIX timestamp. They
+    should come from version stamps or a single indexed column, never from
+    the payload itself. Responses get a private Cache-Control with
+    ``max_age`` (or ``max_age(request)`` when it is callable); 0 makes
+    clients revalidate on every poll. Apply it below @api_view so
+    authentication and permissions run first.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = validators(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag else None
+            if last_modified is not None:
+                last_modified = int(last_modified)
+
+            response = None
+            if etag or last_modified is not None:
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    if etag:
+                        response["ETag"] = etag
+                    if last_modified is not None:
+                        response["Last-Modified"] = http_date(last_modified)
+
+            seconds = max_age(request) if callable(max_age) else max_age
+            if seconds:
+                patch_cache_control(response, private=True, max_age=seconds)
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapped
+
+    return decorator
+
+
+def _menu_validators(request):
+    return menu_validator(date.today()), None
+
+
+def _meal_status_validators(request):
+    row = (
+        DailyMealStatus.objects.filter(student=request.user.student, date=date.today())
+        .values_list("pk", "updated_at")
+        .first()
+    )
+    if row is None:
+        return None, None
+    pk, updated_at = row
+    return f"status-{pk}-{updated_at.timestamp()}", updated_at.timestamp()
+
+
+def _meal_cost_validators(request):
+    student = request.user.student
+    cost = (
+        DailyMealCost.objects.filter(student=student, date=date.today())
+        .values_list("total_cost", flat=True)
+        .first()
+    )
+    if cost is None:
+        return None, None
+    return f"cost-{student.pk}-{date.today().isoformat()}-{cost}", None
+
+
+def _monthly_summary_validators(request):
+    student = request.user.student
+    row = (
+        MonthlyMealSummary.objects.filter(student=student)
+        .order_by("-month")
+        .values_list("pk", "updated_at")
+        .first()
+    )
+    if row is None:
+        return None, None
+    pk, updated_at = row
+    return f"summary-{pk}-{updated_at.timestamp()}", updated_at.timestamp()
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional_get(_menu_validators, max_age=300)
 def today_menu(request):
-    today_weekday = date.today().strftime("%A")
-    menu = WeeklyMenu.objects.filter(day_of_week=today_weekday).first()
-    if menu:
-        serializer = WeeklyMenuSerializer(menu)
-        return Response(serializer.data)
+    data = menu_data(date.today())
+    if data:
+        return Response(data)
     return Response({"detail": "No menu set for today."}, status=404)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional_get(_meal_status_validators)
 def today_meal_status(request):
-    student = request.user.student
-    status = DailyMealStatus.objects.filter(student=student, date=date.today()).first()
-    if status:
-        serializer = DailyMealStatusSerializer(status)
-        return Response(serializer.data)
+    data = overview_data(request.user.student, ("status",), date.today())["status"]
+    if data:
+        return Response(data)
     return Response({"detail": "No meal status for today."}, status=404)
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def meal_status_batch(request):
+    """
+    Set meal status for many future days in one request.
+    Body: {"statuses": [{"date": "YYYY-MM-DD", "breakfast_on": true,
+    "lunch_on": true, "dinner_on": false}, ...]}
+    """
+    student = request.user.student
+    serializer = MealStatusBatchSerializer(
+        data=request.data,
+        context={"first_editable": first_editable_meal_date(localtime(now()))},
+    )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    statuses = {
+        item["date"]: (item["breakfast_on"], item["lunch_on"], item["dinner_on"])
+        for item in serializer.validated_data["statuses"]
+    }
+    updated = bulk_upsert_meal_statuses(student, statuses)
+    saved = DailyMealStatus.objects.filter(student=student, date__in=statuses).order_by("date")
+
+    return Response(
+        {
+            "updated": updated,
+            "statuses": DailyMealStatusSerializer(saved, many=True).data,
+        }
+    )
+
+
+# Calendar clients ask for at most a year, a page covering two months
+MAX_RANGE_DAYS = 366
+
+
+class MealRangePagination(CursorPagination):
+    """Pages of a student's days in date order; (student, date) is unique."""
+
+    ordering = "date"
+    page_size = 62
+
+
+def _parse_date_range(params):
+    """(start, end) from ?start=&end= (inclusive). Raises ValueError."""
+    try:
+        start = datetime.strptime(params["start"], "%Y-%m-%d").date()
+        end = datetime.strptime(params["end"], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        raise ValueError("start and end are required in YYYY-MM-DD format.")
+    if start > end:
+        raise ValueError("start must not be after end.")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"A range may cover at most {MAX_RANGE_DAYS} days.")
+    return start, end
+
+
+def _closed_range_cache_key(request, kind):
+    """Cache key for the requested page when it only covers closed months."""
+    try:
+        start, end = _parse_date_range(request.GET)
+    except ValueError:
+        return None
+    if not is_closed_range(end):
+        return None
+    return meal_range_cache_key(
+        kind, request.user.student.pk, start, end, request.GET.get("cursor", "")
+    )
+
+
+def _range_validators(kind):
+    def validators(request):
+        key = _closed_range_cache_key(request, kind)
+        return (meal_history_etag(key), None) if key else (None, None)
+
+    return validators
+
+
+def _range_max_age(request):
+    # Closed months only change through corrections such as a repriced
+    # menu, which move the ETag; keep max-age short so clients revalidate
+    try:
+        closed = is_closed_range(_parse_date_range(request.GET)[1])
+    except ValueError:
+        closed = False
+    return CLOSED_MONTH_MAX_AGE if closed else 0
+
+
+def _meal_range_response(request, kind, model, serializer_class):
+    """
+    One cursor page of the student's rows between ?start= and ?end= from a
+    single query on the (student, date) index. Pages of closed months are
+    kept in the cache.
+    """
+    try:
+        start, end = _parse_date_range(request.GET)
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=400)
+
+    cache_key = _closed_range_cache_key(request, kind)
+    data = cache.get(cache_key) if cache_key else None
+    if data is None:
+        paginator = MealRangePagination()
+        page = paginator.paginate_queryset(
+            model.objects.filter(student=request.user.student, date__range=(start, end)),
+            request,
+        )
+        data = paginator.get_paginated_response(serializer_class(page, many=True).data).data
+        if cache_key:
+            cache.set(cache_key, data, MEAL_HISTORY_CACHE_TIMEOUT)
+    return Response(data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@conditional_get(_range_validators("status"), max_age=_range_max_age)
+def meal_status_range(request):
+    """Meal status for each day with a row between ?start= and ?end=."""
+    return _meal_range_response(request, "status", DailyMealStatus, DailyMealStatusSerializer)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@conditional_get(_range_validators("cost"), max_age=_range_max_age)
+def meal_cost_range(request):
+    """Stored daily cost for each day between ?start= and ?end=."""
+    return _meal_range_response(request, "cost", DailyMealCost, DailyMealCostSerializer)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def daily_headcount(request):
+    """
+    Main and alternate portions per meal for ?date=YYYY-MM-DD (defaults to
+    tomorrow). Managers and admins only.
+    """
+    if not (request.user.is_manager or request.user.is_admin or request.user.is_superuser):
+        return Response({"detail": "Only managers can view headcounts."}, status=403)
+
+    if request.GET.get("date"):
+        try:
+            day = datetime.strptime(request.GET["date"], "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"detail": "date must be in YYYY-MM-DD format."}, status=400)
+    else:
+        day = localtime(now()).date() + timedelta(days=1)
+
+    return Response(get_daily_headcount(day))
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional_get(_meal_cost_validators)
 def today_meal_cost(request):
-    student = request.user.student
-    cost = DailyMealCost.objects.filter(student=student, date=date.today()).first()
-    if cost:
-        serializer = DailyMealCostSerializer(cost)
-        return Response(serializer.data)
+    data = overview_data(request.user.student, ("cost",), date.today())["cost"]
+    if data:
+        return Response(data)
     return Response({"detail": "No meal cost for today."}, status=404)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional_get(_monthly_summary_validators, max_age=60)
 def monthly_summary(request):
-    student = request.user.student
-    summary = (
-        MonthlyMealSummary.objects.filter(student=student).order_by("-month").first()
-    )
-    if summary:
-        serializer = MonthlyMealSummarySerializer(summary)
-        return Response(serializer.data)
+    data = overview_data(request.user.student, ("summary",))["summary"]
+    if data:
+        return Response(data)
     return Response({"detail": "No monthly summary available."}, status=404)
 
 
@@ -89,34 +347,81 @@ def today_meal_review(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def my_complaints(request):
-    student = request.user.student
-    complaints = Complaint.objects.filter(student=student).order_by("-created_at")
-    serializer = ComplaintSerializer(complaints, many=True)
-    return Response(serializer.data)
+    return Response(complaints_data(request.user.student))
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def student_profile(request):
-    student = request.user.student
-    student_data = StudentSerializer(student).data
-    details = StudentDetails.objects.filter(student=student).first()
-    details_data = StudentDetailsSerializer(details).data if details else {}
-    pref = (
-        StudentMealPreference.objects.filter(student=student).order_by("-month").first()
+    student = load_student(request.user, ("profile",), date.today())
+    return Response(profile_data(student))
+
+
+def _parse_dashboard_fields(value):
+    """
+    {section: set of fields, or None for all of them} from a ?fields= value
+    such as "menu,status.lunch_on,status.dinner_on". No value selects every
+    section in full. Raises ValueError on an unknown section.
+    """
+    if not value:
+        return dict.fromkeys(OVERVIEW_SECTIONS)
+    selection = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        section, _, field = item.partition(".")
+        if section not in OVERVIEW_SECTIONS:
+            raise ValueError(f"Unknown dashboard section: {section}")
+        if not field:
+            selection[section] = None
+        elif selection.get(section, set()) is not None:
+            selection.setdefault(section, set()).add(field)
+    return selection
+
+
+def _selection_signature(selection):
+    return ";".join(
+        f"{section}:{','.join(sorted(selection[section]))}" if selection[section] else section
+        for section in OVERVIEW_SECTIONS
+        if section in selection
     )
-    pref_data = StudentMealPreferenceSerializer(pref).data if pref else {}
 
-    return Response(
-        {
-            "student": student_data,
-            "details": details_data,
-            "meal_preference": pref_data,
+
+def _only(data, fields):
+    if data is None or fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def student_dashboard(request):
+    """
+    Menu, today's status and cost, latest monthly summary and profile in
+    one response. ?fields= picks sections and, with "section.field",
+    fields within them. Payloads are cached per user for a short while and
+    dropped when the student's costs are recomputed.
+    """
+    try:
+        selection = _parse_dashboard_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=400)
+
+    cache_key = student_dashboard_cache_key(request.user.pk, _selection_signature(selection))
+    payload = cache.get(cache_key)
+    if payload is None:
+        today = date.today()
+        student = load_student(request.user, selection, today)
+        if student is None:
+            return Response({"detail": "No student profile."}, status=404)
+        payload = {
+            section: _only(data, selection[section])
+            for section, data in overview_data(student, selection, today).items()
         }
-    )
+        cache.set(cache_key, payload, DASHBOARD_CACHE_TIMEOUT)
+    return Response(payload)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional_get(lambda request: ("notices-static", None), max_age=3600)
 def today_notices(request):
-    return Response({"notices": ["No new notices today. Enjoy your meal!"]})
+    return Response({"notices": TODAY_NOTICES})
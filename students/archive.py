@@ -0,0 +1,117 @@
+"""
+Month-by-month archival of the tables that grow with students x days.
+
+A closed month of DailyMealStatus, DailyMealCost and MealToken rows is
+written to gzipped JSON Lines fixtures under MEAL_ARCHIVE_ROOT/YYYY-MM/ and
+then deleted, so the live tables (and the indexes every daily query walks)
+only hold the recent window. An archived month can be brought back with
+
+    python manage.py loaddata archive/2024-01/*.jsonl.gz
+
+MonthlyMealSummary rows are the billing record and are never archived;
+each month's summaries are recomputed one last time before its rows go.
+"""
+
+import gzip
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.utils import timezone
+
+from .utils import bulk_save_monthly_summaries, is_month_archived, month_bounds
+
+# Tokens first: nothing references these rows, so order only matters for
+# keeping a half-finished run easy to reason about
+ARCHIVED_MODELS = (
+    "managers.MealToken",
+    "students.DailyMealCost",
+    "students.DailyMealStatus",
+)
+
+SERIALIZE_CHUNK_SIZE = 2000
+
+# Tokens only matter until they are scanned or expire
+TOKEN_RETENTION_DAYS = 90
+
+
+def archive_root():
+    return Path(settings.MEAL_ARCHIVE_ROOT)
+
+
+def archive_path(year, month, label):
+    return archive_root() / f"{year}-{month:02d}" / f"{label.lower()}.jsonl.gz"
+
+
+def archivable_months(keep_months, today=None):
+    """
+    (year, month) pairs holding live rows that are older than the last
+    ``keep_months`` months, oldest first.
+    """
+    today = today or timezone.localdate()
+    cutoff_index = today.year * 12 + today.month - 1 - keep_months
+
+    DailyMealStatus = apps.get_model("students", "DailyMealStatus")
+    oldest = DailyMealStatus.objects.order_by("date").values_list("date", flat=True).first()
+    if oldest is None:
+        return []
+    return [
+        (index // 12, index % 12 + 1)
+        for index in range(oldest.year * 12 + oldest.month - 1, cutoff_index)
+    ]
+
+
+def _write_fixture(path, queryset):
+    """Serialize the queryset to ``path`` via a temp file, so a crash never leaves half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    with gzip.open(partial, "wt", encoding="utf-8") as fixture:
+        serializers.serialize(
+            "jsonl", queryset.order_by("pk").iterator(chunk_size=SERIALIZE_CHUNK_SIZE), stream=fixture
+        )
+    os.replace(partial, path)
+
+
+def archive_month(year, month, dry_run=False):
+    """
+    Archive and delete one month of live rows. Returns {label: row count}.
+    Models with no rows left for the month are skipped, so a rerun never
+    overwrites an earlier archive with an empty file.
+    """
+    first_day, last_day = month_bounds(year, month)
+    counts = {}
+
+    DailyMealStatus = apps.get_model("students", "DailyMealStatus")
+    has_statuses = DailyMealStatus.objects.filter(date__range=(first_day, last_day)).exists()
+    # A rerun finds the statuses gone; recomputing then would zero the bills
+    if not dry_run and has_statuses and not is_month_archived(year, month):
+        bulk_save_monthly_summaries(year, month)
+
+    for label in ARCHIVED_MODELS:
+        model = apps.get_model(label)
+        rows = model.objects.filter(date__range=(first_day, last_day))
+        counts[label] = rows.count()
+        if dry_run or not counts[label]:
+            continue
+
+        _write_fixture(archive_path(year, month, label), rows)
+        with transaction.atomic():
+            # No signals or cascades hang off these models, so this is a
+            # single DELETE rather than a fetch-then-delete
+            rows.delete()
+
+    return counts
+
+
+def purge_expired_tokens(retention_days=TOKEN_RETENTION_DAYS, today=None, dry_run=False):
+    """Delete MealToken rows older than the retention window. Returns the count."""
+    today = today or timezone.localdate()
+    MealToken = apps.get_model("managers", "MealToken")
+    expired = MealToken.objects.filter(date__lt=today - timedelta(days=retention_days))
+    if dry_run:
+        return expired.count()
+    return expired.delete()[0]
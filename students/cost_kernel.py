@@ -0,0 +1,87 @@
+"""
+Vectorized meal cost rule.
+
+Costs are computed in integer paisa over whole arrays of (student, day)
+rows, so a hall-month is priced in one call instead of one Python
+iteration per day. Every cost path in students.utils goes through
+price_meals; money only becomes Decimal again at the edges.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+
+MEAL_FIELDS = ("breakfast", "lunch", "dinner")
+
+
+def to_paisa(amount):
+    """Decimal taka (or anything Decimal accepts) to integer paisa."""
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def from_paisa(paisa):
+    """Integer paisa back to a two-place Decimal taka amount."""
+    return Decimal(int(paisa)).scaleb(-2)
+
+
+class MenuTable:
+    """
+    Cost vectors for the kernel, built from a {row: menu or None} map such
+    as {weekday_index: WeeklyMenu} or one row per menu version. Each array
+    has one row per menu and one column per meal. Rows without a menu cost
+    nothing, and breakfast never has an alternate, so its flags stay False.
+    """
+
+    def __init__(self, menus):
+        rows = max(menus, default=-1) + 1
+        self.cost = np.zeros((rows, 3), dtype=np.int64)
+        self.alternate = np.zeros((rows, 3), dtype=np.int64)
+        self.contains_beef = np.zeros((rows, 3), dtype=bool)
+        self.contains_fish = np.zeros((rows, 3), dtype=bool)
+
+        for row, menu in menus.items():
+            if menu is None:
+                continue
+            self.cost[row] = [
+                to_paisa(menu.breakfast_cost),
+                to_paisa(menu.lunch_cost),
+                to_paisa(menu.dinner_cost),
+            ]
+            self.alternate[row] = [
+                to_paisa(menu.breakfast_cost),
+                to_paisa(menu.lunch_cost_alternate),
+                to_paisa(menu.dinner_cost_alternate),
+            ]
+            self.contains_beef[row, 1:] = [
+                menu.lunch_contains_beef,
+                menu.dinner_contains_beef,
+            ]
+            self.contains_fish[row, 1:] = [
+                menu.lunch_contains_fish,
+                menu.dinner_contains_fish,
+            ]
+
+
+def price_meals(meals_on, menu_rows, prefers_beef, prefers_fish, table):
+    """
+    Cost in paisa of every row of ``meals_on``.
+
+    ``meals_on`` is a bool array whose last axis is (breakfast, lunch,
+    dinner). ``menu_rows`` picks each day's row of ``table`` (the weekday,
+    0 = Monday, for a weekly table). It and the preference masks broadcast
+    against the remaining axes, so flat (rows, 3) input takes one menu row
+    and preference per row, while a (students, days, 3) grid takes menu
+    rows of shape (days,) and preferences of shape (students, 1). A meal is
+    priced at its alternate cost when it contains beef or fish that the
+    student skips. Returns an int64 array shaped like ``meals_on[..., 0]``.
+    """
+    meals_on = np.asarray(meals_on, dtype=bool)
+    menu_rows = np.asarray(menu_rows, dtype=np.intp)
+    skips_beef = ~np.asarray(prefers_beef, dtype=bool)[..., None]
+    skips_fish = ~np.asarray(prefers_fish, dtype=bool)[..., None]
+
+    alternate = (table.contains_beef[menu_rows] & skips_beef) | (
+        table.contains_fish[menu_rows] & skips_fish
+    )
+    prices = np.where(alternate, table.alternate[menu_rows], table.cost[menu_rows])
+    return (prices * meals_on).sum(axis=-1)
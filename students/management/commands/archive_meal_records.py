@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.archive import (
+    TOKEN_RETENTION_DAYS,
+    archivable_months,
+    archive_month,
+    archive_root,
+    purge_expired_tokens,
+)
+from datetime import date
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive closed months of meal statuses, daily costs and tokens to compressed "
+        "fixtures and purge expired tokens"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=12,
+            help="Months of rows to keep live before the current one (default 12)",
+        )
+        parser.add_argument("--month", help="Archive only this month, as YYYY-MM")
+        parser.add_argument(
+            "--token-retention-days",
+            type=int,
+            default=TOKEN_RETENTION_DAYS,
+            help=f"Delete meal tokens older than this many days (default {TOKEN_RETENTION_DAYS})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be archived or purged",
+        )
+
+    def handle(self, *args, **kwargs):
+        today = date.today()
+        if kwargs.get("month"):
+            try:
+                year, month = map(int, kwargs["month"].split("-"))
+                date(year, month, 1)
+            except ValueError:
+                raise CommandError("--month must be in YYYY-MM format")
+            if (year, month) >= (today.year, today.month):
+                raise CommandError("Only months that have already ended can be archived")
+            months = [(year, month)]
+        else:
+            months = archivable_months(kwargs["keep_months"], today)
+
+        dry_run = kwargs["dry_run"]
+        verb = "Would archive" if dry_run else "Archived"
+        started = time.monotonic()
+
+        for year, month in months:
+            counts = archive_month(year, month, dry_run=dry_run)
+            details = ", ".join(f"{count} {label.split('.')[1]}" for label, count in counts.items())
+            self.stdout.write(f"{verb} {year}-{month:02d}: {details}")
+
+        purged = purge_expired_tokens(kwargs["token_retention_days"], today, dry_run=dry_run)
+        elapsed = time.monotonic() - started
+        if dry_run:
+            summary = f"{len(months)} months to archive, {purged} expired tokens to purge"
+        else:
+            summary = f"{len(months)} months archived to {archive_root()}, {purged} expired tokens purged"
+        self.stdout.write(self.style.SUCCESS(f"{summary} in {elapsed:.2f}s."))
@@ -0,0 +1,200 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from students.cost_kernel import from_paisa, price_meals
+from students.models import (
+    DailyMealStatus,
+    Student,
+    WeeklyMenu,
+    WeeklyMenuVersion,
+    WEEKDAY_CHOICES,
+)
+from students.utils import (
+    compute_daily_cost,
+    compute_monthly_totals,
+    get_menu_timeline,
+    invalidate_weekly_menu_cache,
+    price_status_rows,
+    resolve_preferences,
+)
+from accounts.models import CustomUser
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+import random
+import time
+import uuid
+
+# Synthetic rows live in a month nobody has real data for, inside a
+# transaction that is always rolled back
+BENCH_YEAR, BENCH_MONTH = 2000, 1
+
+
+def query_daily_cost(student, day):
+    """
+    One row priced the way the per-day path did before the kernel: the
+    status, the menu version in effect and the month's preference each come
+    from their own query.
+    """
+    try:
+        status = DailyMealStatus.objects.get(student=student, date=day)
+    except DailyMealStatus.DoesNotExist:
+        return Decimal("0.00")
+    menu = (
+        WeeklyMenuVersion.objects.filter(day_of_week=day.strftime("%A"))
+        .filter(Q(valid_from__isnull=True) | Q(valid_from__lte=day))
+        .filter(Q(valid_to__isnull=True) | Q(valid_to__gte=day))
+        .order_by(F("valid_from").desc(nulls_last=True))
+        .first()
+    )
+    if menu is None:
+        return Decimal("0.00")
+    prefers_beef, prefers_fish = resolve_preferences([student], day.strftime("%Y-%m"))[student.id]
+    return compute_daily_cost(
+        menu, status.breakfast_on, status.lunch_on, status.dinner_on, prefers_beef, prefers_fish
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare the vectorized cost kernel with the per-day ORM path on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=1000, help="Synthetic students (default 1000)")
+        parser.add_argument("--days", type=int, default=30, help="Days of statuses per student (max 31)")
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=300,
+            help="Per-day ORM calls to time; the full-hall figure is extrapolated",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs["seed"])
+        days = max(1, min(kwargs["days"], 31))
+
+        try:
+            with transaction.atomic():
+                self._run(rng, kwargs["students"], days, kwargs["sample"])
+                transaction.set_rollback(True)
+        finally:
+            # Synthetic menus may have been loaded into this process's cache
+            invalidate_weekly_menu_cache()
+
+    def _seed(self, rng, student_count, days):
+        for index, (day_name, _) in enumerate(WEEKDAY_CHOICES):
+            WeeklyMenu.objects.get_or_create(
+                day_of_week=day_name,
+                defaults={
+                    "breakfast_cost": Decimal("20.00"),
+                    "lunch_cost": Decimal("60.00"),
+                    "lunch_cost_alternate": Decimal("50.00"),
+                    "lunch_contains_beef": index % 2 == 0,
+                    "dinner_cost": Decimal("55.00"),
+                    "dinner_cost_alternate": Decimal("40.00"),
+                    "dinner_contains_fish": index % 3 == 0,
+                },
+            )
+        invalidate_weekly_menu_cache()
+
+        prefix = uuid.uuid4().hex[:8]
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"bench-{prefix}-{i}", password="!", role="student")
+            for i in range(student_count)
+        )
+        if users[0].pk is None:
+            users = list(CustomUser.objects.filter(username__startswith=f"bench-{prefix}-"))
+        students = Student.objects.bulk_create(
+            Student(
+                user=user,
+                name=user.username,
+                room_number="000",
+                default_prefers_beef=rng.random() > 0.2,
+                default_prefers_fish=rng.random() > 0.1,
+            )
+            for user in users
+        )
+        if students[0].pk is None:
+            students = list(Student.objects.filter(user__in=users))
+
+        first_day = date(BENCH_YEAR, BENCH_MONTH, 1)
+        DailyMealStatus.objects.bulk_create(
+            (
+                DailyMealStatus(
+                    student=student,
+                    date=first_day + timedelta(days=offset),
+                    breakfast_on=rng.random() > 0.3,
+                    lunch_on=rng.random() > 0.2,
+                    dinner_on=rng.random() > 0.2,
+                )
+                for student in students
+                for offset in range(days)
+            ),
+            batch_size=1000,
+        )
+        return students
+
+    def _run(self, rng, student_count, days, sample_size):
+        self.stdout.write(f"Seeding {student_count} students x {days} days (rolled back afterwards)...")
+        students = self._seed(rng, student_count, days)
+        by_id = {student.id: student for student in students}
+        rows = list(
+            DailyMealStatus.objects.filter(student__in=students)
+            .order_by()
+            .values_list("student_id", "date", "breakfast_on", "lunch_on", "dinner_on")
+        )
+
+        # Per-day ORM path: a few queries for every sampled row
+        sample = rng.sample(rows, min(sample_size, len(rows)))
+        started = time.perf_counter()
+        orm_costs = [query_daily_cost(by_id[row[0]], row[1]) for row in sample]
+        orm_per_row = (time.perf_counter() - started) / len(sample)
+        orm_full = orm_per_row * len(rows)
+
+        # Same rows through the kernel must agree to the paisa
+        kernel_sample = price_status_rows(
+            [row[1] for row in sample],
+            [row[2:] for row in sample],
+            [(by_id[row[0]].default_prefers_beef, by_id[row[0]].default_prefers_fish) for row in sample],
+        )
+        mismatches = sum(
+            1 for orm, paisa in zip(orm_costs, kernel_sample) if orm != from_paisa(paisa)
+        )
+
+        # Whole hall-month through the production summary path (queries included)
+        started = time.perf_counter()
+        compute_monthly_totals(BENCH_YEAR, BENCH_MONTH, student_ids=list(by_id))
+        summary_elapsed = time.perf_counter() - started
+
+        # Kernel alone on a (students, days, 3) grid already in memory
+        meals_on = np.zeros((len(students), days, 3), dtype=bool)
+        position = {student_id: i for i, student_id in enumerate(by_id)}
+        first_day = date(BENCH_YEAR, BENCH_MONTH, 1)
+        for student_id, day, *flags in rows:
+            meals_on[position[student_id], (day - first_day).days] = flags
+        # Menu rows come from the same version timeline the other paths price with
+        timeline = get_menu_timeline()
+        menu_rows = np.array([timeline.row_for(first_day + timedelta(days=d)) for d in range(days)])
+        prefers_beef = np.array([[s.default_prefers_beef] for s in by_id.values()])
+        prefers_fish = np.array([[s.default_prefers_fish] for s in by_id.values()])
+        started = time.perf_counter()
+        price_meals(meals_on, menu_rows, prefers_beef, prefers_fish, timeline.table)
+        kernel_elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Rows priced:                 {len(rows)}")
+        self.stdout.write(
+            f"Per-day ORM path:            {orm_per_row * 1000:.3f} ms/row, "
+            f"~{orm_full:.2f}s for the hall-month (from {len(sample)} samples)"
+        )
+        self.stdout.write(
+            f"compute_monthly_totals:      {summary_elapsed:.3f}s "
+            f"({orm_full / summary_elapsed:,.0f}x faster)"
+        )
+        self.stdout.write(
+            f"Kernel only (in memory):     {kernel_elapsed * 1000:.3f} ms "
+            f"({orm_full / kernel_elapsed:,.0f}x faster)"
+        )
+        if mismatches:
+            self.stderr.write(self.style.ERROR(f"{mismatches} sampled rows disagree with the ORM path"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Kernel matches the ORM path on every sampled row."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from students.utils import freeze_daily_headcounts
+from datetime import datetime, timedelta
+
+
+class Command(BaseCommand):
+    help = "Take the final kitchen headcount for a date once its 8 PM cutoff has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Date as YYYY-MM-DD (defaults to tomorrow)")
+
+    def handle(self, *args, **kwargs):
+        if kwargs.get("date"):
+            try:
+                day = datetime.strptime(kwargs["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            day = timezone.localdate() + timedelta(days=1)
+
+        if freeze_daily_headcounts(day):
+            self.stdout.write(self.style.SUCCESS(f"Headcount for {day} frozen."))
+        else:
+            self.stdout.write(f"Headcount for {day} was already frozen.")
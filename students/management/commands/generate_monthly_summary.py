@@ -1,18 +1,63 @@
-from django.core.management.base import BaseCommand
-from students.utils import generate_monthly_summary_for_all
+from django.core.management.base import BaseCommand, CommandError
+from students.utils import find_monthly_summary_drift, generate_monthly_summary_for_all
 from datetime import date
+import time
 
 
 class Command(BaseCommand):
-    help = "Generate monthly meal summary for all students"
+    help = "Generate monthly meal summary for all students, or check the stored summaries for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month",
+            help="Month to summarise as YYYY-MM (defaults to the previous month)",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report students whose stored summary differs from a full recompute",
+        )
 
     def handle(self, *args, **kwargs):
-        today = date.today()
-        year = today.year
-        month = today.month - 1 if today.month > 1 else 12
-        if today.month == 1:
-            year -= 1  # Adjust for January
+        if kwargs.get("month"):
+            try:
+                year, month = map(int, kwargs["month"].split("-"))
+                date(year, month, 1)
+            except ValueError:
+                raise CommandError("--month must be in YYYY-MM format")
+        else:
+            today = date.today()
+            year = today.year
+            month = today.month - 1 if today.month > 1 else 12
+            if today.month == 1:
+                year -= 1  # Adjust for January
+
+        if kwargs["check"]:
+            try:
+                drift = find_monthly_summary_drift(year, month)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            for student_id, stored, expected in drift:
+                self.stdout.write(f"student={student_id} stored={stored} expected={expected}")
+            if drift:
+                raise CommandError(
+                    f"{len(drift)} monthly summaries have drifted for {year}-{str(month).zfill(2)}"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(f"Monthly summaries are consistent for {year}-{str(month).zfill(2)}.")
+            )
+            return
 
         self.stdout.write(f"Generating summary for {year}-{str(month).zfill(2)}...")
-        generate_monthly_summary_for_all(year, month)
-        self.stdout.write(self.style.SUCCESS("Monthly summary generated successfully!"))
+        started = time.monotonic()
+        try:
+            count = generate_monthly_summary_for_all(year, month)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Monthly summary generated successfully! "
+                f"({count} students in {elapsed:.2f}s)"
+            )
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.utils import backfill_daily_costs, find_daily_cost_mismatches, month_bounds
+from datetime import date, datetime
+
+
+class Command(BaseCommand):
+    help = "Backfill DailyMealCost from meal statuses or check stored costs for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First date as YYYY-MM-DD (defaults to start of this month)")
+        parser.add_argument("--end", help="Last date as YYYY-MM-DD (defaults to end of this month)")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report rows whose stored cost differs from the computed cost",
+        )
+
+    def _parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"--{option} must be in YYYY-MM-DD format")
+
+    def handle(self, *args, **kwargs):
+        today = date.today()
+        first_day, last_day = month_bounds(today.year, today.month)
+        start = self._parse_date(kwargs["start"], "start") if kwargs.get("start") else first_day
+        end = self._parse_date(kwargs["end"], "end") if kwargs.get("end") else last_day
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        if kwargs["check"]:
+            mismatches = find_daily_cost_mismatches(start, end)
+            for student_id, day, stored, expected in mismatches:
+                self.stdout.write(
+                    f"student={student_id} date={day} stored={stored} expected={expected}"
+                )
+            if mismatches:
+                raise CommandError(
+                    f"{len(mismatches)} daily cost rows are out of date between {start} and {end}"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Daily costs are consistent for {start} to {end}."))
+            return
+
+        self.stdout.write(f"Recomputing daily costs for {start} to {end}...")
+        count = backfill_daily_costs(start, end)
+        self.stdout.write(self.style.SUCCESS(f"{count} daily cost rows written."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from students.utils import find_headcount_drift, rebuild_daily_headcounts
+from datetime import datetime, timedelta
+
+
+class Command(BaseCommand):
+    help = "Recount DailyHeadcount from meal statuses or check the stored counts for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First date as YYYY-MM-DD (defaults to today)")
+        parser.add_argument("--end", help="Last date as YYYY-MM-DD (defaults to a week after --start)")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report counts that differ from a full recount",
+        )
+
+    def _parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"--{option} must be in YYYY-MM-DD format")
+
+    def handle(self, *args, **kwargs):
+        start = self._parse_date(kwargs["start"], "start") if kwargs.get("start") else timezone.localdate()
+        end = self._parse_date(kwargs["end"], "end") if kwargs.get("end") else start + timedelta(days=7)
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+        if kwargs["check"]:
+            drift = find_headcount_drift(days)
+            for day, meal, token_type, stored, expected in drift:
+                self.stdout.write(
+                    f"date={day} meal={meal} type={token_type} stored={stored} expected={expected}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} headcounts have drifted between {start} and {end}")
+            self.stdout.write(self.style.SUCCESS(f"Headcounts are consistent for {start} to {end}."))
+            return
+
+        count = rebuild_daily_headcounts(days)
+        self.stdout.write(self.style.SUCCESS(f"{count} unfrozen dates recounted."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.utils import rollover_meal_preferences
+from datetime import date
+import time
+
+
+class Command(BaseCommand):
+    help = "Carry each active student's meal preference over into a new month"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month",
+            help="Month to create as YYYY-MM (defaults to the current month)",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs.get("month"):
+            try:
+                year, month = map(int, kwargs["month"].split("-"))
+                date(year, month, 1)
+            except ValueError:
+                raise CommandError("--month must be in YYYY-MM format")
+        else:
+            today = date.today()
+            year, month = today.year, today.month
+
+        month_str = f"{year}-{str(month).zfill(2)}"
+        self.stdout.write(f"Rolling meal preferences over into {month_str}...")
+        started = time.monotonic()
+        count = rollover_meal_preferences(month_str)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"{count} meal preferences created in {elapsed:.2f}s.")
+        )
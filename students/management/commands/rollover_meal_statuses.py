@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from students.utils import rollover_meal_statuses
+from datetime import datetime, timedelta
+import time
+
+
+class Command(BaseCommand):
+    help = "Carry each active student's meal status over into the next day"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Date to create as YYYY-MM-DD (defaults to tomorrow)")
+
+    def handle(self, *args, **kwargs):
+        if kwargs.get("date"):
+            try:
+                day = datetime.strptime(kwargs["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+        else:
+            day = timezone.localdate() + timedelta(days=1)
+
+        self.stdout.write(f"Rolling meal statuses over into {day}...")
+        started = time.monotonic()
+        count = rollover_meal_statuses(day)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"{count} meal statuses created in {elapsed:.2f}s.")
+        )
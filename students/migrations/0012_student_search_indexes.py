@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+# Case-insensitive prefix search on Student.name ("name__istartswith") compiles
+# to UPPER(name) LIKE 'X%'. Only PostgreSQL can serve that from an index, and
+# it needs the text_pattern_ops operator class, so it is created with raw SQL.
+NAME_INDEX = "students_student_name_upper_like"
+
+
+def create_name_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {NAME_INDEX} '
+        f'ON students_student (UPPER("name") text_pattern_ops)'
+    )
+
+
+def drop_name_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {NAME_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0011_paymentslip"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="student",
+            name="room_number",
+            field=models.CharField(db_index=True, max_length=5),
+        ),
+        migrations.RunPython(create_name_search_index, drop_name_search_index),
+    ]
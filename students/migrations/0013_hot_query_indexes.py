@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0012_student_search_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dailymealstatus",
+            index=models.Index(fields=["date"], name="mealstatus_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dailymealstatus",
+            index=models.Index(
+                condition=models.Q(("breakfast_on", True)),
+                fields=["date"],
+                name="mealstatus_breakfast_on_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailymealstatus",
+            index=models.Index(
+                condition=models.Q(("lunch_on", True)),
+                fields=["date"],
+                name="mealstatus_lunch_on_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailymealstatus",
+            index=models.Index(
+                condition=models.Q(("dinner_on", True)),
+                fields=["date"],
+                name="mealstatus_dinner_on_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="monthlymealsummary",
+            index=models.Index(
+                fields=["month", "student"], name="summary_month_student_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymentslip",
+            index=models.Index(fields=["-uploaded_at"], name="payslip_uploaded_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="paymentslip",
+            index=models.Index(
+                fields=["month", "-uploaded_at"], name="payslip_month_uploaded_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="studentmealpreference",
+            index=models.Index(
+                fields=["month", "student"], name="mealpref_month_student_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0013_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyHeadcount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "meal",
+                    models.CharField(
+                        choices=[
+                            ("breakfast", "Breakfast"),
+                            ("lunch", "Lunch"),
+                            ("dinner", "Dinner"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "token_type",
+                    models.CharField(
+                        choices=[("main", "Main"), ("alternate", "Alternate")],
+                        max_length=10,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("frozen", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["date", "meal", "token_type"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "meal", "token_type"),
+                        name="unique_headcount_per_meal",
+                    )
+                ],
+            },
+        ),
+    ]
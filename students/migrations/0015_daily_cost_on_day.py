@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:58
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def backfill_on_day(apps, schema_editor):
+    DailyMealCost = apps.get_model("students", "DailyMealCost")
+    DailyMealStatus = apps.get_model("students", "DailyMealStatus")
+    any_meal_on = DailyMealStatus.objects.filter(
+        Q(breakfast_on=True) | Q(lunch_on=True) | Q(dinner_on=True),
+        student_id=OuterRef("student_id"),
+        date=OuterRef("date"),
+    )
+    DailyMealCost.objects.filter(Exists(any_meal_on)).update(on_day=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0014_daily_headcount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailymealcost",
+            name="on_day",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_on_day, migrations.RunPython.noop),
+    ]
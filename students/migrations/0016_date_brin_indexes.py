@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# DailyMealCost rows arrive roughly in date order, so a BRIN index on date
+# stays a few pages in size and lets range scans (month summaries,
+# archival) skip every block outside the range. DailyMealStatus already has
+# the mealstatus_date_idx btree. PostgreSQL only.
+BRIN_INDEXES = {
+    "mealcost_date_brin": "students_dailymealcost",
+}
+
+
+def create_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table in BRIN_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING brin (date)"
+        )
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in BRIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0015_daily_cost_on_day"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+def snapshot_current_menus(apps, schema_editor):
+    # The menus in place today are all that is known about past pricing,
+    # so each becomes its weekday's open-ended first version
+    WeeklyMenu = apps.get_model("students", "WeeklyMenu")
+    WeeklyMenuVersion = apps.get_model("students", "WeeklyMenuVersion")
+    fields = [
+        field.name
+        for field in WeeklyMenu._meta.concrete_fields
+        if field.name not in ("id", "day_of_week")
+    ]
+    WeeklyMenuVersion.objects.bulk_create(
+        WeeklyMenuVersion(
+            day_of_week=menu.day_of_week,
+            valid_from=None,
+            **{name: getattr(menu, name) for name in fields},
+        )
+        for menu in WeeklyMenu.objects.all()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0016_date_brin_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeeklyMenuVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("breakfast_main", models.CharField(blank=True, max_length=100)),
+                (
+                    "breakfast_cost",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=6),
+                ),
+                ("lunch_main", models.CharField(blank=True, max_length=100)),
+                (
+                    "lunch_cost",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=6),
+                ),
+                ("lunch_contains_beef", models.BooleanField(default=False)),
+                ("lunch_contains_fish", models.BooleanField(default=False)),
+                ("lunch_alternate", models.CharField(blank=True, max_length=100)),
+                (
+                    "lunch_cost_alternate",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=6),
+                ),
+                ("dinner_main", models.CharField(blank=True, max_length=100)),
+                (
+                    "dinner_cost",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=6),
+                ),
+                ("dinner_contains_beef", models.BooleanField(default=False)),
+                ("dinner_contains_fish", models.BooleanField(default=False)),
+                ("dinner_alternate", models.CharField(blank=True, max_length=100)),
+                (
+                    "dinner_cost_alternate",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=6),
+                ),
+                (
+                    "day_of_week",
+                    models.CharField(
+                        choices=[
+                            ("Monday", "Monday"),
+                            ("Tuesday", "Tuesday"),
+                            ("Wednesday", "Wednesday"),
+                            ("Thursday", "Thursday"),
+                            ("Friday", "Friday"),
+                            ("Saturday", "Saturday"),
+                            ("Sunday", "Sunday"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("valid_from", models.DateField(blank=True, null=True)),
+                ("valid_to", models.DateField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["day_of_week", "valid_from"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day_of_week", "valid_from"),
+                        name="unique_menu_version_start",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("valid_from__isnull", True)),
+                        fields=("day_of_week",),
+                        name="one_initial_menu_version_per_day",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(snapshot_current_menus, migrations.RunPython.noop),
+    ]
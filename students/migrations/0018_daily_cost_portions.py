@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0017_weekly_menu_versions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailymealcost",
+            name="portions",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
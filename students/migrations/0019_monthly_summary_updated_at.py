@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0018_daily_cost_portions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="monthlymealsummary",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -40,7 +40,7 @@ WEEKDAY_CHOICES = [
 class Student(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=40)
-    room_number = models.CharField(max_length=5)
+    room_number = models.CharField(max_length=5, db_index=True)
     default_meal_status = models.BooleanField(default=True)
     default_prefers_beef = models.BooleanField(default=True)
     default_prefers_fish = models.BooleanField(default=True)
@@ -80,13 +80,17 @@ class StudentMealPreference(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['student', 'month'], name='unique_student_month_preference')
         ]
+        indexes = [
+            # Hall-wide lookups filter by month first
+            models.Index(fields=["month", "student"], name="mealpref_month_student_idx"),
+        ]
 
     def get_month_display_name(self):
         return f"{calendar.month_name[self.month]}"
 
 
-class WeeklyMenu(models.Model):
-    day_of_week = models.CharField(max_length=10, choices=WEEKDAY_CHOICES, unique=True)
+class BaseMenu(models.Model):
+    """Dishes and prices of one day's menu, shared by the live menu and its versions."""
 
     # Breakfast
     breakfast_main = models.CharField(max_length=100, blank=True)
@@ -122,10 +126,56 @@ class WeeklyMenu(models.Model):
     )
     
 
+    class Meta:
+        abstract = True
+
+    def menu_values(self):
+        return {field.name: getattr(self, field.name) for field in BaseMenu._meta.fields}
+
+
+class WeeklyMenu(BaseMenu):
+    """The menu currently served on each weekday."""
+
+    day_of_week = models.CharField(max_length=10, choices=WEEKDAY_CHOICES, unique=True)
+
     def __str__(self):
         return self.day_of_week
 
 
+class WeeklyMenuVersion(BaseMenu):
+    """
+    A weekday's menu as it was between valid_from and valid_to (inclusive).
+    Costs for a date are priced from the version in effect on that date, so
+    later menu changes never reprice past days. valid_from is NULL for the
+    version already in place when versioning began; valid_to is NULL while
+    the version is current.
+    """
+
+    day_of_week = models.CharField(max_length=10, choices=WEEKDAY_CHOICES)
+    valid_from = models.DateField(null=True, blank=True)
+    valid_to = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["day_of_week", "valid_from"]
+        constraints = [
+            # Also the index behind the "menu in effect on date D" lookup
+            models.UniqueConstraint(
+                fields=["day_of_week", "valid_from"], name="unique_menu_version_start"
+            ),
+            models.UniqueConstraint(
+                fields=["day_of_week"],
+                condition=models.Q(valid_from__isnull=True),
+                name="one_initial_menu_version_per_day",
+            ),
+        ]
+
+    def __str__(self):
+        start = self.valid_from or "start"
+        end = self.valid_to or "now"
+        return f"{self.day_of_week} ({start} to {end})"
+
+
 class DailyMealStatus(models.Model):
     student = models.ForeignKey("Student", on_delete=models.CASCADE)
     date = models.DateField()
@@ -142,6 +192,25 @@ class DailyMealStatus(models.Model):
                 fields=["student", "date"], name="unique_meal_status_per_day"
             )
         ]
+        indexes = [
+            models.Index(fields=["date"], name="mealstatus_date_idx"),
+            # Headcounts only ever count the ON rows of a day
+            models.Index(
+                fields=["date"],
+                name="mealstatus_breakfast_on_idx",
+                condition=models.Q(breakfast_on=True),
+            ),
+            models.Index(
+                fields=["date"],
+                name="mealstatus_lunch_on_idx",
+                condition=models.Q(lunch_on=True),
+            ),
+            models.Index(
+                fields=["date"],
+                name="mealstatus_dinner_on_idx",
+                condition=models.Q(dinner_on=True),
+            ),
+        ]
         ordering = ['-date']
 
 
@@ -158,6 +227,11 @@ class DailyMealCost(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     date = models.DateField()
     total_cost = models.DecimalField(max_digits=6, decimal_places=2)
+    # Whether any meal was ON, so summary deltas know the day's old on-day state
+    on_day = models.BooleanField(default=False)
+    # Bit per (meal, token_type) this day adds to DailyHeadcount, so headcount
+    # deltas know what it counted before; null on rows older than the field
+    portions = models.PositiveSmallIntegerField(null=True, blank=True)
     
     class Meta:
         constraints = [
@@ -168,17 +242,57 @@ class DailyMealCost(models.Model):
         return f"{self.student.name} - {self.date} - {self.total_cost} Taka"
 
 
+class DailyHeadcount(models.Model):
+    """
+    Kitchen numbers per date, meal and portion. Moved by deltas whenever a
+    student's daily cost is recomputed, and frozen once the date's 8 PM
+    change cutoff has passed.
+    """
+
+    MEAL_CHOICES = [
+        ("breakfast", "Breakfast"),
+        ("lunch", "Lunch"),
+        ("dinner", "Dinner"),
+    ]
+    TOKEN_TYPE_CHOICES = [
+        ("main", "Main"),
+        ("alternate", "Alternate"),
+    ]
+
+    date = models.DateField()
+    meal = models.CharField(max_length=10, choices=MEAL_CHOICES)
+    token_type = models.CharField(max_length=10, choices=TOKEN_TYPE_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    frozen = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "meal", "token_type"], name="unique_headcount_per_meal"
+            )
+        ]
+        ordering = ["date", "meal", "token_type"]
+
+    def __str__(self):
+        return f"{self.date} - {self.meal} ({self.token_type}): {self.count}"
+
+
 class MonthlyMealSummary(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     month = models.CharField(max_length=7)  # Format: YYYY-MM
     total_cost = models.DecimalField(max_digits=8, decimal_places=2)
     total_on_days = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['student', 'month'], name='unique_monthly_summary')
         ]
+        indexes = [
+            models.Index(fields=["month", "student"], name="summary_month_student_idx"),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.month} - Total: {self.total_cost} Taka"
@@ -205,19 +319,72 @@ class Complaint(models.Model):
         return f"{self.name} - {self.room_number} ({'Fixed' if self.is_fixed else 'Pending'})"
 
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from datetime import date
 
 
-from .utils import save_daily_cost
+from .utils import (
+    end_menu_versions,
+    invalidate_meal_history,
+    invalidate_menu_history,
+    invalidate_student_dashboards,
+    invalidate_weekly_menu_cache,
+    mark_daily_cost_dirty,
+    record_menu_version,
+    refresh_headcounts_for_preference,
+)
 
 @receiver(post_save, sender=DailyMealStatus)
 def update_daily_cost(sender, instance, **kwargs):
     """
-    Automatically calculate and save cost when meal status is updated.
+    Mark the day's cost as dirty when meal status is updated. The cost is
+    recomputed in one batch after the transaction commits.
+    """
+    mark_daily_cost_dirty(instance.student_id, instance.date)
+
+
+@receiver(post_save, sender=StudentMealPreference)
+def update_headcounts_for_preference(sender, instance, **kwargs):
+    """
+    Portion splits depend on preferences, so re-count the open days. A
+    correction to a closed month also drops that month's cached history,
+    and the student's dashboard shows the latest preference.
     """
-    save_daily_cost(instance.student, instance.date)
+    refresh_headcounts_for_preference(instance.student_id, instance.month)
+    year, month = map(int, instance.month.split("-"))
+    invalidate_meal_history([(instance.student_id, date(year, month, 1))])
+    invalidate_student_dashboards([instance.student_id])
+
+
+@receiver(post_save, sender=WeeklyMenu)
+@receiver(post_delete, sender=WeeklyMenu)
+def refresh_weekly_menu_cache(sender, instance, **kwargs):
+    """
+    Invalidate the cached weekly menu whenever a day is saved or removed,
+    whether from menu approval, proposal review or the admin, and record
+    the change as a menu version taking effect today.
+    """
+    invalidate_weekly_menu_cache()
+    if kwargs.get("raw"):
+        return
+    if kwargs["signal"] is post_delete:
+        end_menu_versions(instance.day_of_week)
+    else:
+        record_menu_version(instance)
+
+
+@receiver(post_save, sender=WeeklyMenuVersion)
+@receiver(post_delete, sender=WeeklyMenuVersion)
+def refresh_menu_versions(sender, instance, **kwargs):
+    """
+    Versions normally only start today or later. A hand edit that reaches
+    into the past reprices closed days, so their cached history is dropped.
+    """
+    invalidate_weekly_menu_cache()
+    if instance.valid_from is None or instance.valid_from < timezone.localdate():
+        invalidate_menu_history()
 
 
 class WeeklyMenuReview(models.Model):
@@ -279,6 +446,10 @@ class PaymentSlip(models.Model):
     class Meta:
         unique_together = ("student", "month")  
         ordering = ["-uploaded_at"]
+        indexes = [
+            models.Index(fields=["-uploaded_at"], name="payslip_uploaded_idx"),
+            models.Index(fields=["month", "-uploaded_at"], name="payslip_month_uploaded_idx"),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.month} - {self.amount} Taka - {'Verified' if self.is_verified else 'Pending'}"
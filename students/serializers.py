@@ -9,6 +9,36 @@ class DailyMealStatusSerializer(serializers.ModelSerializer):
         fields = ["date", "breakfast_on", "lunch_on", "dinner_on"]
 
 
+class MealStatusBatchItemSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    breakfast_on = serializers.BooleanField()
+    lunch_on = serializers.BooleanField()
+    dinner_on = serializers.BooleanField()
+
+
+class MealStatusBatchSerializer(serializers.Serializer):
+    # Two months of toggles is the most a client can sensibly send at once
+    MAX_DAYS = 62
+
+    statuses = MealStatusBatchItemSerializer(
+        many=True, allow_empty=False, max_length=MAX_DAYS
+    )
+
+    def validate_statuses(self, value):
+        dates = [item["date"] for item in value]
+        if len(set(dates)) != len(dates):
+            raise serializers.ValidationError("Each date may only appear once.")
+
+        first_editable = self.context["first_editable"]
+        locked = sorted(day for day in dates if day < first_editable)
+        if locked:
+            raise serializers.ValidationError(
+                f"Meal status can only be changed from {first_editable} onwards "
+                f"(locked: {', '.join(day.isoformat() for day in locked)})."
+            )
+        return value
+
+
 class DailyMealCostSerializer(serializers.ModelSerializer):
     class Meta:
         model = DailyMealCost
@@ -0,0 +1,133 @@
+"""
+Read-side data for a student's own meal information.
+
+api_views and the chatbot both call these functions directly instead of
+going through DRF views. Sections come back as plain serialized data in
+the same shapes the API returns, or None when there is nothing to show.
+"""
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import (
+    Complaint,
+    DailyMealCost,
+    DailyMealStatus,
+    MonthlyMealSummary,
+    Student,
+    StudentDetails,
+    StudentMealPreference,
+)
+from .serializers import (
+    ComplaintSerializer,
+    DailyMealCostSerializer,
+    DailyMealStatusSerializer,
+    MonthlyMealSummarySerializer,
+    StudentDetailsSerializer,
+    StudentMealPreferenceSerializer,
+    StudentSerializer,
+    WeeklyMenuSerializer,
+)
+from .utils import get_menu_for_date
+
+OVERVIEW_SECTIONS = ("menu", "status", "cost", "summary", "profile")
+
+TODAY_NOTICES = ["No new notices today. Enjoy your meal!"]
+
+
+def _section_prefetches(sections, day):
+    """{to_attr: Prefetch} for the student rows the sections read."""
+    prefetches = {}
+    if "status" in sections:
+        prefetches["day_statuses"] = Prefetch(
+            "dailymealstatus_set",
+            queryset=DailyMealStatus.objects.filter(date=day),
+            to_attr="day_statuses",
+        )
+    if "cost" in sections:
+        prefetches["day_costs"] = Prefetch(
+            "dailymealcost_set",
+            queryset=DailyMealCost.objects.filter(date=day),
+            to_attr="day_costs",
+        )
+    if "summary" in sections:
+        prefetches["latest_summaries"] = Prefetch(
+            "monthlymealsummary_set",
+            queryset=MonthlyMealSummary.objects.order_by("-month")[:1],
+            to_attr="latest_summaries",
+        )
+    if "profile" in sections:
+        prefetches["latest_preferences"] = Prefetch(
+            "studentmealpreference_set",
+            queryset=StudentMealPreference.objects.order_by("-month")[:1],
+            to_attr="latest_preferences",
+        )
+    return prefetches
+
+
+def load_student(user, sections=OVERVIEW_SECTIONS, day=None):
+    """
+    The user's Student, or None, with everything ``sections`` read for
+    ``day`` loaded alongside: one query plus one per prefetched section.
+    """
+    students = Student.objects.filter(user=user)
+    if "profile" in sections:
+        students = students.select_related("studentdetails")
+    if day is not None:
+        students = students.prefetch_related(*_section_prefetches(sections, day).values())
+    return students.first()
+
+
+def _first_data(serializer_class, rows):
+    return serializer_class(rows[0]).data if rows else None
+
+
+def menu_data(day):
+    menu = get_menu_for_date(day)
+    return WeeklyMenuSerializer(menu).data if menu else None
+
+
+def profile_data(student):
+    try:
+        details = StudentDetailsSerializer(student.studentdetails).data
+    except StudentDetails.DoesNotExist:
+        details = {}
+    return {
+        "student": StudentSerializer(student).data,
+        "details": details,
+        "meal_preference": _first_data(StudentMealPreferenceSerializer, student.latest_preferences)
+        or {},
+    }
+
+
+def overview_data(student, sections=OVERVIEW_SECTIONS, day=None):
+    """
+    {section: data} for ``student`` on ``day``. Rows that load_student did
+    not already prefetch are fetched here in one batch, so the cost is the
+    same whether or not the caller loaded the student for these sections.
+    """
+    missing = [
+        prefetch
+        for to_attr, prefetch in _section_prefetches(sections, day).items()
+        if not hasattr(student, to_attr)
+    ]
+    if missing:
+        prefetch_related_objects([student], *missing)
+
+    data = {}
+    if "menu" in sections:
+        data["menu"] = menu_data(day)
+    if "status" in sections:
+        data["status"] = _first_data(DailyMealStatusSerializer, student.day_statuses)
+    if "cost" in sections:
+        data["cost"] = _first_data(DailyMealCostSerializer, student.day_costs)
+    if "summary" in sections:
+        data["summary"] = _first_data(MonthlyMealSummarySerializer, student.latest_summaries)
+    if "profile" in sections:
+        data["profile"] = profile_data(student)
+    return data
+
+
+def complaints_data(student):
+    """The student's complaints, newest first."""
+    complaints = Complaint.objects.filter(student=student).order_by("-created_at")
+    return ComplaintSerializer(complaints, many=True).data
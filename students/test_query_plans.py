@@ -0,0 +1,102 @@
+"""
+Query-plan regression tests for the hot lookups.
+
+These run EXPLAIN against PostgreSQL and assert the planner can answer each
+query from its supporting index. Sequential scans are disabled for the test
+transaction so the result does not depend on how many rows are seeded.
+Other databases skip the module.
+"""
+
+import pytest
+from datetime import date, timedelta
+from django.db import connection
+
+from accounts.models import CustomUser
+from managers.models import MealToken
+from .models import (
+    DailyMealStatus,
+    MonthlyMealSummary,
+    PaymentSlip,
+    Student,
+    StudentMealPreference,
+)
+
+pytestmark = pytest.mark.django_db
+
+TODAY = date(2025, 3, 3)
+
+
+@pytest.fixture
+def postgres_plans():
+    if connection.vendor != "postgresql":
+        pytest.skip("Query plan checks need PostgreSQL")
+
+    students = []
+    for i in range(20):
+        user = CustomUser.objects.create_user(username=f"plan{i}", password="x", role="student")
+        students.append(Student.objects.create(user=user, name=f"Plan {i}", room_number=f"{100 + i}"))
+
+    for student in students:
+        for offset in range(5):
+            DailyMealStatus.objects.create(
+                student=student,
+                date=TODAY - timedelta(days=offset),
+                lunch_on=offset % 2 == 0,
+            )
+        MealToken.objects.create(student=student, date=TODAY, meal_type="lunch", token_type="main")
+        MonthlyMealSummary.objects.create(
+            student=student, month="2025-03", total_cost=0, total_on_days=0
+        )
+        StudentMealPreference.objects.create(student=student, month="2025-03")
+        PaymentSlip.objects.create(student=student, month="2025-03", amount=0)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+        cursor.execute("SET LOCAL enable_seqscan = off")
+
+
+def assert_uses_index(queryset, *index_names):
+    plan = queryset.explain()
+    assert "Seq Scan" not in plan, plan
+    assert any(name in plan for name in index_names), plan
+
+
+def test_lunch_headcount_uses_partial_index(postgres_plans):
+    assert_uses_index(
+        DailyMealStatus.objects.filter(date=TODAY, lunch_on=True),
+        "mealstatus_lunch_on_idx",
+    )
+
+
+def test_daily_status_lookup_uses_date_index(postgres_plans):
+    assert_uses_index(
+        DailyMealStatus.objects.filter(date=TODAY),
+        "mealstatus_date_idx",
+    )
+
+
+def test_token_summary_uses_composite_index(postgres_plans):
+    assert_uses_index(
+        MealToken.objects.filter(date=TODAY, meal_type="lunch", token_type="main"),
+        "token_date_meal_type_idx",
+    )
+
+
+def test_monthly_summary_by_month_uses_index(postgres_plans):
+    assert_uses_index(
+        MonthlyMealSummary.objects.filter(month="2025-03"),
+        "summary_month_student_idx",
+    )
+
+
+def test_preferences_by_month_uses_index(postgres_plans):
+    assert_uses_index(
+        StudentMealPreference.objects.filter(month="2025-03"),
+        "mealpref_month_student_idx",
+    )
+
+
+def test_payment_slips_by_month_use_ordered_index(postgres_plans):
+    plan = PaymentSlip.objects.filter(month="2025-03").order_by("-uploaded_at").explain()
+    assert "payslip_month_uploaded_idx" in plan, plan
+    assert "Sort" not in plan, plan
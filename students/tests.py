@@ -2,9 +2,29 @@ from django.test import TestCase
 
 import pytest
 from django.urls import reverse
-from django.utils.timezone import localtime, now
-from datetime import timedelta
-from .models import Student, DailyMealStatus
+from django.utils.timezone import localdate, localtime, now
+from datetime import date, timedelta
+from decimal import Decimal
+from .models import (
+    DailyMealCost,
+    DailyMealStatus,
+    MonthlyMealSummary,
+    Student,
+    StudentMealPreference,
+    WeeklyMenu,
+)
+from .utils import (
+    PreferenceResolver,
+    backfill_daily_costs,
+    find_daily_cost_mismatches,
+    find_monthly_summary_drift,
+    generate_monthly_summary_for_all,
+    get_daily_headcount,
+    get_menu_for_date,
+    headcount_snapshot,
+    rollover_meal_preferences,
+    rollover_meal_statuses,
+)
 from accounts.models import CustomUser
 
 # Create your tests here.
@@ -27,3 +47,778 @@ def test_update_meal_status(monkeypatch, client):
     meal_status = DailyMealStatus.objects.get(student=student, date=tomorrow)
     assert response.status_code == 200
     assert meal_status.status in [True, False]
+
+
+def _make_student(username, **kwargs):
+    user = CustomUser.objects.create_user(
+        username=username, password="testtest456", role="student"
+    )
+    return Student.objects.create(user=user, name=username, room_number="101", **kwargs)
+
+
+def _menu_fields(**kwargs):
+    fields = {
+        "breakfast_cost": Decimal("20.00"),
+        "lunch_cost": Decimal("60.00"),
+        "lunch_cost_alternate": Decimal("50.00"),
+        "lunch_contains_beef": True,
+        "dinner_cost": Decimal("55.00"),
+        "dinner_cost_alternate": Decimal("40.00"),
+        "dinner_contains_fish": True,
+    }
+    fields.update(kwargs)
+    return fields
+
+
+def _make_menu(day, **kwargs):
+    return WeeklyMenu.objects.create(day_of_week=day, **_menu_fields(**kwargs))
+
+
+@pytest.mark.django_db
+def test_monthly_summary_engine_uses_constant_queries(django_assert_max_num_queries):
+    for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]:
+        _make_menu(day)
+
+    beef_eater = _make_student("beef")
+    no_beef = _make_student("nobeef", default_prefers_beef=False)
+    fish_off = _make_student("fishoff")
+    StudentMealPreference.objects.create(student=fish_off, month="2025-03", prefers_fish=False)
+    _make_student("idle")
+
+    for student in [beef_eater, no_beef, fish_off]:
+        for day in (1, 2):
+            DailyMealStatus.objects.create(
+                student=student, date=date(2025, 3, day), breakfast_on=day == 1
+            )
+    DailyMealStatus.objects.create(
+        student=beef_eater,
+        date=date(2025, 3, 3),
+        breakfast_on=False,
+        lunch_on=False,
+        dinner_on=False,
+    )
+
+    with django_assert_max_num_queries(8):
+        written = generate_monthly_summary_for_all(2025, 3)
+
+    assert written == 4
+    summaries = {s.student.name: s for s in MonthlyMealSummary.objects.filter(month="2025-03")}
+    assert summaries["beef"].total_cost == Decimal("250.00")
+    assert summaries["beef"].total_on_days == 2
+    assert summaries["nobeef"].total_cost == Decimal("230.00")
+    assert summaries["fishoff"].total_cost == Decimal("220.00")
+    assert summaries["idle"].total_cost == Decimal("0.00")
+    assert summaries["idle"].total_on_days == 0
+
+    # Re-running updates in place instead of duplicating rows
+    generate_monthly_summary_for_all(2025, 3)
+    assert MonthlyMealSummary.objects.filter(month="2025-03").count() == 4
+
+
+@pytest.mark.django_db
+def test_status_writes_defer_cost_recompute_until_commit(django_capture_on_commit_callbacks):
+    _make_menu("Monday")
+    student = _make_student("deferred")
+    monday = date(2025, 3, 3)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.create(student=student, date=monday)
+        assert not DailyMealCost.objects.filter(student=student).exists()
+        status.breakfast_on = False
+        status.save()
+
+    cost = DailyMealCost.objects.get(student=student, date=monday)
+    assert cost.total_cost == Decimal("115.00")
+    assert find_daily_cost_mismatches(monday, monday) == []
+
+    DailyMealCost.objects.filter(pk=cost.pk).update(total_cost=Decimal("1.00"))
+    assert find_daily_cost_mismatches(monday, monday) == [
+        (student.id, monday, Decimal("1.00"), Decimal("115.00"))
+    ]
+    backfill_daily_costs(monday, monday)
+    assert find_daily_cost_mismatches(monday, monday) == []
+
+
+@pytest.mark.django_db
+def test_meal_status_batch_api_upserts_range_and_costs(client):
+    _make_menu("Monday")
+    student = _make_student("batcher")
+    client.login(username="batcher", password="testtest456")
+    monday = date(2100, 3, 1)
+    tuesday = date(2100, 3, 2)
+    DailyMealStatus.objects.create(student=student, date=monday)
+
+    response = client.post(
+        "/api/meal-status/batch/",
+        {
+            "statuses": [
+                {"date": "2100-03-01", "breakfast_on": False, "lunch_on": True, "dinner_on": False},
+                {"date": "2100-03-02", "breakfast_on": True, "lunch_on": True, "dinner_on": True},
+            ]
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 2
+    monday_status = DailyMealStatus.objects.get(student=student, date=monday)
+    assert (monday_status.breakfast_on, monday_status.lunch_on, monday_status.dinner_on) == (False, True, False)
+    assert DailyMealCost.objects.get(student=student, date=monday).total_cost == Decimal("60.00")
+    # No menu on Tuesday, so the day is priced at zero
+    assert DailyMealCost.objects.get(student=student, date=tuesday).total_cost == Decimal("0.00")
+
+    response = client.post(
+        "/api/meal-status/batch/",
+        {"statuses": [{"date": "2000-01-01", "breakfast_on": True, "lunch_on": True, "dinner_on": True}]},
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert not DailyMealStatus.objects.filter(student=student, date=date(2000, 1, 1)).exists()
+
+
+@pytest.mark.django_db
+def test_weekly_menu_lookups_are_cached_until_menu_changes(django_assert_num_queries):
+    menu = _make_menu("Monday", lunch_main="Rice")
+    monday = date(2025, 3, 3)
+
+    assert get_menu_for_date(monday).lunch_main == "Rice"
+    with django_assert_num_queries(0):
+        assert get_menu_for_date(monday).lunch_main == "Rice"
+        assert get_menu_for_date(monday + timedelta(days=1)) is None
+
+    # A change takes effect from the first editable day, so earlier days
+    # keep the menu they had
+    menu.lunch_main = "Khichuri"
+    menu.save()
+    next_monday = localdate() + timedelta(days=14 - localdate().weekday())
+    assert get_menu_for_date(monday).lunch_main == "Rice"
+    assert get_menu_for_date(next_monday).lunch_main == "Khichuri"
+
+
+@pytest.mark.django_db
+def test_menu_changes_never_reprice_past_days(django_capture_on_commit_callbacks):
+    from .models import WeeklyMenuVersion
+    from .utils import (
+        end_menu_versions,
+        first_editable_meal_date,
+        record_menu_version,
+    )
+
+    today = localdate()
+    first_editable = first_editable_meal_date(localtime())
+    last_week, next_week = today - timedelta(days=7), today + timedelta(days=7)
+    menu = _make_menu(today.strftime("%A"))
+    student = _make_student("versioned")
+    with django_capture_on_commit_callbacks(execute=True):
+        for day in (last_week, today, next_week):
+            DailyMealStatus.objects.create(student=student, date=day)
+    assert DailyMealCost.objects.get(date=last_week).total_cost == Decimal("135.00")
+
+    def stored_cost(day):
+        return DailyMealCost.objects.get(date=day).total_cost
+
+    menu.breakfast_cost = Decimal("30.00")
+    menu.save()
+    # Today's meals may already be served; next week is repriced at once
+    assert (stored_cost(today), stored_cost(next_week)) == (Decimal("135.00"), Decimal("145.00"))
+    # Schedule a further change and then replace it with another one
+    record_menu_version(menu, effective_from=next_week)
+    menu.breakfast_cost = Decimal("40.00")
+    record_menu_version(menu, effective_from=next_week)
+    assert stored_cost(next_week) == Decimal("155.00")
+    assert find_monthly_summary_drift(next_week.year, next_week.month) == []
+
+    assert [(v.valid_from, v.valid_to, v.breakfast_cost) for v in WeeklyMenuVersion.objects.all()] == [
+        (None, first_editable - timedelta(days=1), Decimal("20.00")),
+        (first_editable, next_week - timedelta(days=1), Decimal("30.00")),
+        (next_week, None, Decimal("40.00")),
+    ]
+    assert get_menu_for_date(last_week).breakfast_cost == Decimal("20.00")
+    assert get_menu_for_date(today).breakfast_cost == Decimal("20.00")
+
+    # Recomputing the past uses the menu of the day, not today's
+    backfill_daily_costs(last_week, last_week)
+    assert DailyMealCost.objects.get(date=last_week).total_cost == Decimal("135.00")
+    with pytest.raises(ValueError):
+        record_menu_version(menu, effective_from=last_week)
+
+    end_menu_versions(menu.day_of_week)
+    assert get_menu_for_date(next_week) is None and stored_cost(next_week) == Decimal("0.00")
+    assert get_menu_for_date(last_week).breakfast_cost == Decimal("20.00")
+
+
+@pytest.mark.django_db
+def test_preference_resolver_batches_and_memoizes(django_assert_num_queries):
+    monthly = _make_student("monthly")
+    default_only = _make_student("defaults", default_prefers_beef=False)
+    StudentMealPreference.objects.create(
+        student=monthly, month="2025-03", prefers_beef=True, prefers_fish=False
+    )
+    resolver = PreferenceResolver()
+
+    with django_assert_num_queries(1):
+        prefs = resolver.resolve([monthly, default_only], "2025-03")
+        assert resolver.get(monthly, "2025-03") == (True, False)
+
+    assert prefs == {monthly.id: (True, False), default_only.id: (False, True)}
+
+
+@pytest.mark.django_db
+def test_meal_token_qr_endpoint_serves_cached_image_with_etag(client):
+    from managers.models import MealToken
+
+    owner = _make_student("qrowner")
+    token = MealToken.objects.create(
+        student=owner, date=date(2025, 3, 3), meal_type="lunch", token_type="main"
+    )
+    client.login(username="qrowner", password="testtest456")
+    url = reverse("students:meal_token_qr", args=[token.barcode])
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/svg+xml"
+    assert b"<svg" in response.content
+    etag = response["ETag"]
+
+    revalidated = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert revalidated.status_code == 304
+
+    png = client.get(url, {"format": "png"})
+    assert png.content.startswith(b"\x89PNG")
+    assert png["ETag"] != etag
+
+    _make_student("intruder")
+    client.login(username="intruder", password="testtest456")
+    assert client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_headcount_snapshot_is_one_query_and_refreshes_on_status_change(
+    client, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    from django.utils import timezone
+
+    today = timezone.localdate()
+    CustomUser.objects.create_user(username="mgr", password="x", role="manager")
+    on = _make_student("allon")
+    off = _make_student("lunchoff")
+    _make_student("nostatus")
+    DailyMealStatus.objects.create(student=on, date=today)
+    DailyMealStatus.objects.create(student=off, date=today, lunch_on=False)
+    # Other days must not leak into today's figures
+    DailyMealStatus.objects.create(student=on, date=today - timedelta(days=1))
+
+    with django_assert_num_queries(1):
+        snapshot = headcount_snapshot(today)
+    assert snapshot == {
+        "total_students": 3,
+        "total_staff": 1,
+        "breakfast_on": 2,
+        "lunch_on": 1,
+        "dinner_on": 2,
+    }
+    with django_assert_num_queries(0):
+        headcount_snapshot(today)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DailyMealStatus.objects.filter(student=off, date=today).update(lunch_on=True)
+        DailyMealStatus.objects.get(student=off, date=today).save()
+    assert headcount_snapshot(today)["lunch_on"] == 2
+
+    CustomUser.objects.create_user(
+        username="boss", password="testtest456", role="admin"
+    )
+    client.login(username="boss", password="testtest456")
+    response = client.get(reverse("accounts:admin_dashboard_headcount"))
+    assert response.status_code == 200
+    assert response.json() == {"date": today.isoformat(), **headcount_snapshot(today)}
+
+
+@pytest.mark.django_db
+def test_daily_headcount_tracks_changes_until_cutoff_freezes_it(
+    client, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    from datetime import datetime
+    from django.utils import timezone
+
+    day = timezone.localdate() + timedelta(days=3)
+    _make_menu(day.strftime("%A"))
+    regular = _make_student("regular")
+    no_beef = _make_student("nobeefhc", default_prefers_beef=False)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DailyMealStatus.objects.create(student=regular, date=day)
+        DailyMealStatus.objects.create(student=no_beef, date=day, breakfast_on=False)
+
+    with django_assert_num_queries(1):
+        headcount = get_daily_headcount(day)
+    assert not headcount["frozen"]
+    assert headcount["meals"]["breakfast"] == {"main": 1, "alternate": 0, "total": 1}
+    assert headcount["meals"]["lunch"] == {"main": 1, "alternate": 1, "total": 2}
+    assert headcount["meals"]["dinner"] == {"main": 2, "alternate": 0, "total": 2}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        StudentMealPreference.objects.create(
+            student=regular, month=day.strftime("%Y-%m"), prefers_fish=False
+        )
+    assert get_daily_headcount(day)["meals"]["dinner"] == {"main": 1, "alternate": 1, "total": 2}
+
+    # After 8 PM the evening before, the numbers are final
+    after_cutoff = timezone.make_aware(
+        datetime.combine(day - timedelta(days=1), datetime.min.time()).replace(hour=21)
+    )
+    assert get_daily_headcount(day, current_dt=after_cutoff)["frozen"]
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.get(student=no_beef, date=day)
+        status.lunch_on = False
+        status.save()
+    assert get_daily_headcount(day)["meals"]["lunch"]["total"] == 2
+
+    CustomUser.objects.create_user(username="kitchen", password="testtest456", role="manager")
+    client.login(username="kitchen", password="testtest456")
+    response = client.get(reverse("api_daily_headcount"), {"date": day.isoformat()})
+    assert response.status_code == 200
+    assert response.json()["meals"]["lunch"] == {"main": 1, "alternate": 1, "total": 2}
+
+    page = client.get(reverse("managers:kitchen_headcount"), {"date": day.isoformat()})
+    assert page.status_code == 200
+    assert page.context["headcount"]["frozen"]
+
+
+@pytest.mark.django_db
+def test_rollover_carries_statuses_forward_and_is_idempotent():
+    monday, tuesday = date(2025, 3, 3), date(2025, 3, 4)
+    _make_menu("Tuesday")
+    carried = _make_student("carried")
+    DailyMealStatus.objects.create(student=carried, date=monday, breakfast_on=False)
+    fresh = _make_student("fresh", default_meal_status=False)
+    edited = _make_student("edited")
+    DailyMealStatus.objects.create(student=edited, date=tuesday, lunch_on=False)
+    gone = _make_student("gone")
+    gone.user.is_active = False
+    gone.user.save()
+
+    assert rollover_meal_statuses(tuesday) == 2
+    assert rollover_meal_statuses(tuesday) == 0
+
+    rows = {
+        s.student_id: (s.breakfast_on, s.lunch_on, s.dinner_on)
+        for s in DailyMealStatus.objects.filter(date=tuesday)
+    }
+    assert rows == {
+        carried.id: (False, True, True),
+        fresh.id: (False, False, False),
+        edited.id: (True, False, True),
+    }
+    assert DailyMealCost.objects.get(student=carried, date=tuesday).total_cost == Decimal("115.00")
+    assert DailyMealCost.objects.get(student=fresh, date=tuesday).total_cost == Decimal("0.00")
+
+
+@pytest.mark.django_db
+def test_meal_status_page_is_read_only_on_get(client):
+    student = _make_student("reader")
+    client.login(username="reader", password="testtest456")
+
+    response = client.get(reverse("students:my_meal_status"))
+    assert response.status_code == 200
+    assert not response.context["tomorrow_status_exists"]
+    assert not DailyMealStatus.objects.filter(student=student).exists()
+
+    client.get(reverse("students:update_tomorrow_status", args=["lunch"]))
+    assert not DailyMealStatus.objects.filter(student=student).exists()
+
+
+@pytest.mark.django_db
+def test_preference_rollover_carries_forward_and_reprices_month():
+    _make_menu("Monday")
+    monday = date(2025, 4, 7)
+    carried = _make_student("carriedpref")
+    StudentMealPreference.objects.create(student=carried, month="2025-03", prefers_beef=False)
+    DailyMealStatus.objects.create(student=carried, date=monday)
+    defaults = _make_student("defaultpref", default_prefers_fish=False)
+    kept = _make_student("keptpref")
+    StudentMealPreference.objects.create(student=kept, month="2025-04", prefers_fish=False)
+    # Status saved before the rollover is priced with the default preference
+    backfill_daily_costs(monday, monday)
+    assert DailyMealCost.objects.get(student=carried, date=monday).total_cost == Decimal("135.00")
+
+    assert rollover_meal_preferences("2025-04") == 2
+    assert rollover_meal_preferences("2025-04") == 0
+
+    prefs = {
+        p.student_id: (p.prefers_beef, p.prefers_fish)
+        for p in StudentMealPreference.objects.filter(month="2025-04")
+    }
+    assert prefs == {
+        carried.id: (False, True),
+        defaults.id: (True, False),
+        kept.id: (True, False),
+    }
+    assert DailyMealCost.objects.get(student=carried, date=monday).total_cost == Decimal("125.00")
+
+
+@pytest.mark.django_db
+def test_meal_preference_page_is_a_pure_read(client):
+    student = _make_student("prefreader", default_prefers_beef=False)
+    client.login(username="prefreader", password="testtest456")
+
+    response = client.get(reverse("students:my_meal_preference"))
+    assert response.status_code == 200
+    assert response.context["current_pref"].prefers_beef is False
+    assert response.context["next_pref"].prefers_beef is False
+    assert not StudentMealPreference.objects.filter(student=student).exists()
+
+
+@pytest.mark.django_db
+def test_meal_history_caches_closed_months_and_overviews_the_year(
+    client, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    for day in ["Monday", "Tuesday"]:
+        _make_menu(day)
+    student = _make_student("historian")
+    with django_capture_on_commit_callbacks(execute=True):
+        DailyMealStatus.objects.create(student=student, date=date(2025, 3, 3))
+        DailyMealStatus.objects.create(student=student, date=date(2025, 3, 4), lunch_on=False)
+        DailyMealStatus.objects.create(student=student, date=date(2025, 4, 7), dinner_on=False)
+    client.login(username="historian", password="testtest456")
+    url = reverse("students:meal_history")
+
+    response = client.get(url, {"month": "2025-03"})
+    assert response.context["total_month_cost"] == Decimal("210.00")
+    assert [row["daily_cost"] for row in response.context["statuses"]] == [
+        Decimal("135.00"),
+        Decimal("75.00"),
+    ]
+    etag = response["ETag"]
+    assert "Last-Modified" in response
+
+    # Session and user lookups only; the history itself comes from the cache
+    with django_assert_max_num_queries(2):
+        cached = client.get(url, {"month": "2025-03"}, HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+
+    # An admin correction to the closed month drops the cached copy
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.get(student=student, date=date(2025, 3, 4))
+        status.lunch_on = True
+        status.save()
+    refreshed = client.get(url, {"month": "2025-03"}, HTTP_IF_NONE_MATCH=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.context["total_month_cost"] == Decimal("270.00")
+
+    # Session, user, student and the sidebar profile around one grouped query
+    with django_assert_max_num_queries(5):
+        overview = client.get(url, {"year": "2025"})
+    months = overview.context["months"]
+    assert len(months) == 12
+    assert (months[2]["days"], months[2]["lunches"], months[2]["total_cost"]) == (
+        2,
+        2,
+        Decimal("270.00"),
+    )
+    assert (months[3]["dinners"], months[3]["total_cost"]) == (0, Decimal("80.00"))
+
+    # Years outside what date() accepts fall back to the month view
+    for year in ["0", "99999", "abc"]:
+        response = client.get(url, {"year": year})
+        assert response.status_code == 200 and "statuses" in response.context
+    assert overview.context["total_year_cost"] == Decimal("350.00")
+
+
+@pytest.mark.django_db
+def test_cost_kernel_prices_grids_and_rows_alike():
+    import numpy as np
+    from .cost_kernel import MenuTable, from_paisa, price_meals
+
+    # Monday: beef lunch, fish dinner; Tuesday: no menu
+    table = MenuTable({0: WeeklyMenu(**{**_menu_fields(), "day_of_week": "Monday"}), 1: None})
+    meals_on = np.array(
+        [
+            [[True, True, True], [True, True, True]],
+            [[False, True, True], [True, False, False]],
+        ]
+    )
+    weekdays = np.array([0, 1])
+    prefers_beef = np.array([[True], [False]])
+    prefers_fish = np.array([[False], [True]])
+
+    grid = price_meals(meals_on, weekdays, prefers_beef, prefers_fish, table)
+    assert grid.tolist() == [[13500 - 1500, 0], [10500, 0]]
+    rows = price_meals(
+        meals_on.reshape(-1, 3),
+        np.tile(weekdays, 2),
+        prefers_beef.repeat(2),
+        prefers_fish.repeat(2),
+        table,
+    )
+    assert rows.tolist() == grid.ravel().tolist()
+    assert from_paisa(grid.sum()) == Decimal("225.00")
+
+
+
+@pytest.mark.django_db
+def test_monthly_summary_follows_status_changes_by_delta(django_capture_on_commit_callbacks):
+    _make_menu("Monday")
+    student = _make_student("delta")
+    monday, next_monday = date(2025, 3, 3), date(2025, 3, 10)
+
+    # First change of the month creates the row from a full computation
+    with django_capture_on_commit_callbacks(execute=True):
+        DailyMealStatus.objects.create(student=student, date=monday)
+    summary = MonthlyMealSummary.objects.get(student=student, month="2025-03")
+    assert (summary.total_cost, summary.total_on_days) == (Decimal("135.00"), 1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DailyMealStatus.objects.create(student=student, date=next_monday, lunch_on=False, dinner_on=False)
+        DailyMealStatus.objects.filter(student=student, date=monday).update(breakfast_on=False)
+        DailyMealStatus.objects.get(student=student, date=monday).save()
+    summary.refresh_from_db()
+    assert (summary.total_cost, summary.total_on_days) == (Decimal("135.00"), 2)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.get(student=student, date=next_monday)
+        status.breakfast_on = False
+        status.save()
+    summary.refresh_from_db()
+    assert (summary.total_cost, summary.total_on_days) == (Decimal("115.00"), 1)
+    assert find_monthly_summary_drift(2025, 3) == []
+
+    # Drift from outside the delta path is reported and repaired by a full run
+    MonthlyMealSummary.objects.filter(pk=summary.pk).update(total_on_days=9)
+    assert find_monthly_summary_drift(2025, 3) == [
+        (student.id, (Decimal("115.00"), 9), (Decimal("115.00"), 1))
+    ]
+    generate_monthly_summary_for_all(2025, 3)
+    assert find_monthly_summary_drift(2025, 3) == []
+
+
+@pytest.mark.django_db
+def test_summary_deltas_update_a_hall_in_one_statement(django_capture_on_commit_callbacks):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from .utils import recompute_daily_costs
+
+    _make_menu("Monday")
+    students = [_make_student(f"diner{i}") for i in range(5)]
+    with django_capture_on_commit_callbacks(execute=True):
+        for student in students:
+            DailyMealStatus.objects.create(student=student, date=date(2025, 3, 3))
+    DailyMealStatus.objects.filter(date=date(2025, 3, 3)).update(lunch_on=False)
+
+    with CaptureQueriesContext(connection) as queries:
+        recompute_daily_costs((student.id, date(2025, 3, 3)) for student in students)
+    summary_updates = [
+        q["sql"] for q in queries if q["sql"].startswith('UPDATE "students_monthlymealsummary"')
+    ]
+    assert len(summary_updates) == 1
+    assert set(MonthlyMealSummary.objects.values_list("total_cost", "total_on_days")) == {
+        (Decimal("75.00"), 1)
+    }
+    assert find_monthly_summary_drift(2025, 3) == []
+
+
+@pytest.mark.django_db
+def test_archive_moves_closed_months_to_fixtures_and_purges_tokens(settings, tmp_path):
+    from django.core.management import call_command
+    from managers.models import MealToken
+
+    settings.MEAL_ARCHIVE_ROOT = tmp_path
+    _make_menu("Monday")
+    student = _make_student("archived")
+    old_monday, recent = date(2024, 1, 1), date.today() - timedelta(days=1)
+    DailyMealStatus.objects.create(student=student, date=old_monday)
+    DailyMealStatus.objects.create(student=student, date=recent)
+    backfill_daily_costs(old_monday, old_monday)
+    MealToken.objects.create(student=student, date=old_monday, meal_type="lunch", token_type="main")
+    MealToken.objects.create(student=student, date=recent, meal_type="lunch", token_type="main")
+
+    call_command("archive_meal_records", keep_months=3)
+
+    assert list(DailyMealStatus.objects.values_list("date", flat=True)) == [recent]
+    assert not DailyMealCost.objects.filter(date=old_monday).exists()
+    assert list(MealToken.objects.values_list("date", flat=True)) == [recent]
+    summary = MonthlyMealSummary.objects.get(student=student, month="2024-01")
+    assert (summary.total_cost, summary.total_on_days) == (Decimal("135.00"), 1)
+
+    # Rerunning, backfilling or regenerating an archived month keeps its bills
+    call_command("archive_meal_records", month="2024-01")
+    backfill_daily_costs(old_monday, old_monday)
+    with pytest.raises(ValueError):
+        generate_monthly_summary_for_all(2024, 1)
+    summary.refresh_from_db()
+    assert (summary.total_cost, summary.total_on_days) == (Decimal("135.00"), 1)
+
+    # The archive restores with loaddata
+    fixtures = sorted(str(path) for path in (tmp_path / "2024-01").iterdir())
+    assert [path.rsplit("/", 1)[-1] for path in fixtures] == [
+        "managers.mealtoken.jsonl.gz",
+        "students.dailymealcost.jsonl.gz",
+        "students.dailymealstatus.jsonl.gz",
+    ]
+    call_command("loaddata", *fixtures, verbosity=0)
+    assert DailyMealStatus.objects.filter(date=old_monday).exists()
+    assert DailyMealCost.objects.get(date=old_monday).total_cost == Decimal("135.00")
+
+
+@pytest.mark.django_db
+def test_meal_history_shows_archived_months_from_their_bill(client, settings, tmp_path):
+    from django.core.management import call_command
+
+    settings.MEAL_ARCHIVE_ROOT = tmp_path
+    _make_menu("Monday")
+    student = _make_student("archivist")
+    old_monday = date(2024, 1, 1)
+    DailyMealStatus.objects.create(student=student, date=old_monday)
+    backfill_daily_costs(old_monday, old_monday)
+    call_command("archive_meal_records", month="2024-01")
+    assert not DailyMealStatus.objects.filter(date=old_monday).exists()
+
+    client.login(username="archivist", password="testtest456")
+    url = reverse("students:meal_history")
+    response = client.get(url, {"month": "2024-01"})
+    assert response.context["archived"] and response.context["on_days"] == 1
+    assert response.context["total_month_cost"] == Decimal("135.00")
+    # The cached copy keeps the bill too
+    assert client.get(url, {"month": "2024-01"}).context["total_month_cost"] == Decimal("135.00")
+
+    january = client.get(url, {"year": "2024"}).context["months"][0]
+    assert (january["days"], january["lunches"], january["total_cost"]) == (
+        1,
+        None,
+        Decimal("135.00"),
+    )
+
+
+@pytest.mark.django_db
+def test_api_polls_revalidate_with_etags(client, django_capture_on_commit_callbacks):
+    today = date.today()
+    _make_menu(today.strftime("%A"), lunch_main="Rice")
+    student = _make_student("poller")
+    client.login(username="poller", password="testtest456")
+    status = DailyMealStatus.objects.create(student=student, date=today)
+
+    first = client.get(reverse("api_today_meal_status"))
+    assert first.status_code == 200 and first["ETag"] and first["Last-Modified"]
+    assert "no-cache" in first["Cache-Control"] and "private" in first["Cache-Control"]
+    again = client.get(reverse("api_today_meal_status"), HTTP_IF_NONE_MATCH=first["ETag"])
+    assert again.status_code == 304 and not again.content
+
+    status.lunch_on = False
+    status.save()
+    changed = client.get(reverse("api_today_meal_status"), HTTP_IF_NONE_MATCH=first["ETag"])
+    assert changed.status_code == 200 and changed.json()["lunch_on"] is False
+
+    menu = client.get(reverse("api_today_menu"))
+    assert menu.json()["lunch_main"] == "Rice" and "max-age=300" in menu["Cache-Control"]
+    assert client.get(reverse("api_today_menu"), HTTP_IF_NONE_MATCH=menu["ETag"]).status_code == 304
+
+    MonthlyMealSummary.objects.create(
+        student=student, month=today.strftime("%Y-%m"), total_cost=0, total_on_days=0
+    )
+    summary = client.get(reverse("api_monthly_summary"))
+    assert summary["ETag"] and summary["Last-Modified"]
+    assert client.get(reverse("api_monthly_summary"), HTTP_IF_NONE_MATCH=summary["ETag"]).status_code == 304
+
+    # A delta that moves the totals moves the validator too
+    with django_capture_on_commit_callbacks(execute=True):
+        status.lunch_on = True
+        status.save()
+    moved = client.get(reverse("api_monthly_summary"), HTTP_IF_NONE_MATCH=summary["ETag"])
+    assert moved.status_code == 200 and moved.json()["total_on_days"] == 1
+
+
+@pytest.mark.django_db
+def test_meal_range_api_pages_and_caches_closed_months(client, django_capture_on_commit_callbacks):
+    end = localdate().replace(day=1) - timedelta(days=1)
+    start = end - timedelta(days=69)
+    student = _make_student("calendar")
+    client.login(username="calendar", password="testtest456")
+    with django_capture_on_commit_callbacks(execute=True):
+        for offset in range(70):
+            DailyMealStatus.objects.create(student=student, date=start + timedelta(days=offset))
+
+    url = reverse("api_meal_status_range")
+    query = {"start": start.isoformat(), "end": end.isoformat()}
+    first = client.get(url, query)
+    assert first.status_code == 200 and len(first.json()["results"]) == 62
+    assert first["ETag"] and "max-age=60" in first["Cache-Control"]
+    rest = client.get(first.json()["next"])
+    assert [row["date"] for row in rest.json()["results"]][-1] == end.isoformat()
+    assert client.get(url, query, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    # A correction to a closed month moves the validator
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.get(student=student, date=end)
+        status.lunch_on = False
+        status.save()
+    assert client.get(url, query, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+    assert client.get(url, {"start": end.isoformat(), "end": start.isoformat()}).status_code == 400
+    assert client.get(reverse("api_meal_cost_range"), {"start": "2024-01-01"}).status_code == 400
+    open_range = {"start": localdate().isoformat(), "end": localdate().isoformat()}
+    assert "ETag" not in client.get(reverse("api_meal_cost_range"), open_range)
+
+
+@pytest.mark.django_db
+def test_student_dashboard_in_one_round_trip(client, django_capture_on_commit_callbacks):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    today = date.today()
+    _make_menu(today.strftime("%A"), lunch_main="Rice")
+    student = _make_student("dash")
+    client.login(username="dash", password="testtest456")
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.create(student=student, date=today)
+    get_menu_for_date(today)
+
+    url = reverse("api_student_dashboard")
+    with CaptureQueriesContext(connection) as baseline:
+        client.get(reverse("api_today_notices"))
+    with CaptureQueriesContext(connection) as built:
+        first = client.get(url)
+    data = first.json()
+    assert set(data) == {"menu", "status", "cost", "summary", "profile"}
+    assert data["menu"]["lunch_main"] == "Rice" and data["status"]["lunch_on"] is True
+    assert data["profile"]["student"]["name"] == student.name
+    assert len(built) - len(baseline) <= 5
+
+    with CaptureQueriesContext(connection) as cached:
+        assert client.get(url).json() == data
+    assert len(cached) == len(baseline)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        status.lunch_on = False
+        status.save()
+    selected = client.get(url, {"fields": "status.lunch_on,menu"}).json()
+    assert selected["status"] == {"lunch_on": False} and set(selected) == {"status", "menu"}
+    assert client.get(url).json()["status"]["lunch_on"] is False
+    assert client.get(url, {"fields": "wallet"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_headcounts_move_by_deltas_and_repair_recounts(django_capture_on_commit_callbacks):
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+    from .models import DailyHeadcount
+
+    day = localdate() + timedelta(days=3)
+    _make_menu(day.strftime("%A"))
+    students = [_make_student(f"delta{i}") for i in range(3)]
+    with django_capture_on_commit_callbacks(execute=True):
+        for student in students:
+            DailyMealStatus.objects.create(student=student, date=day)
+    assert get_daily_headcount(day)["meals"]["lunch"]["total"] == 3
+
+    # Skew a stored count: a toggle only moves it by one, it does not recount
+    DailyHeadcount.objects.filter(date=day, meal="lunch", token_type="main").update(count=10)
+    with django_capture_on_commit_callbacks(execute=True):
+        status = DailyMealStatus.objects.get(student=students[0], date=day)
+        status.lunch_on = False
+        status.save()
+    assert get_daily_headcount(day)["meals"]["lunch"]["total"] == 9
+
+    with pytest.raises(CommandError):
+        call_command("repair_daily_headcounts", start=day.isoformat(), check=True)
+    call_command("repair_daily_headcounts", start=day.isoformat(), end=day.isoformat())
+    assert get_daily_headcount(day)["meals"]["lunch"]["total"] == 2
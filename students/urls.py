@@ -28,5 +28,6 @@ urlpatterns = [
     path("reviews/", views.reviews_list, name="reviews_list"),
     path("profile/", views.profile_view, name="profile"),
     path("meal-token/", views.meal_token_view, name="meal_token"),
+    path("meal-token/<str:barcode>/qr/", views.meal_token_qr, name="meal_token_qr"),
     path("payment/upload/", views.upload_payment_slip, name="upload_payment_slip"),
 ]
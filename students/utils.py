@@ -1,125 +1,1426 @@
-from .models import DailyMealStatus, WeeklyMenu, StudentMealPreference, MonthlyMealSummary, Student
+from .models import DailyMealStatus, WeeklyMenu, WeeklyMenuVersion, StudentMealPreference, MonthlyMealSummary, Student, WEEKDAY_CHOICES
+from .cost_kernel import MenuTable, from_paisa, price_meals
 
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import date, timedelta,datetime
 from calendar import monthrange
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import Q
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, FilteredRelation, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Greatest, TruncMonth
+from django.utils import timezone
+import hashlib
+import numpy as np
+import threading
+import uuid
+
+SUMMARY_BATCH_SIZE = 1000
+COST_BATCH_SIZE = 1000
+
+# Changes for tomorrow close at 8:00 PM today
+MEAL_STATUS_CUTOFF_HOUR = 20
+
+_dirty_costs = threading.local()
+
+# Shared stamp that tells every worker process when the weekly menu changed
+MENU_CACHE_VERSION_KEY = "weekly_menu_version"
+
+# (version, {weekday_index: WeeklyMenu or None}) held per process
+_menu_cache = (None, None)
+
+# (version, MenuTimeline) of every menu version, held per process
+_menu_timeline = (None, None)
+
+# Bumped only when a menu version covering past days is edited by hand;
+# ordinary menu changes take effect today and leave history alone
+MENU_HISTORY_VERSION_KEY = "menu_history_version"
+
+# Closed months never change unless an admin corrects them, which drops
+# the entry. Menu changes only apply from today on, so they keep it.
+MEAL_HISTORY_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Browsers cannot be told about a correction, so closed months get a short
+# max-age and revalidate against the ETag after it
+CLOSED_MONTH_MAX_AGE = 60
+
+# Dashboards poll the headcount; a short TTL bounds staleness of the
+# student and staff totals, which have no invalidation hook
+HEADCOUNT_CACHE_TIMEOUT = 60
+
+# Student dashboards are dropped whenever a cost recompute touches the
+# student; the TTL covers profile edits, which have no hook
+DASHBOARD_CACHE_TIMEOUT = 30
+
+MEALS = ["breakfast", "lunch", "dinner"]
+
+# Bit order of DailyMealCost.portions
+HEADCOUNT_SLOTS = [(meal, token_type) for meal in MEALS for token_type in ("main", "alternate")]
+
+
+class PreferenceResolver:
+    """
+    Resolve each student's effective meal preference for a month: their
+    StudentMealPreference row if one exists, otherwise their default_prefers_*
+    flags. Results are memoized on the instance, so one resolver per request
+    never asks the database twice for the same student and month.
+    """
+
+    def __init__(self):
+        self._resolved = {}
+
+    def resolve(self, students, month):
+        """
+        Return {student_id: (prefers_beef, prefers_fish)} for the given
+        Student objects and YYYY-MM month using at most one query.
+        """
+        students = list(students)
+        missing = [s for s in students if (s.id, month) not in self._resolved]
+        if missing:
+            monthly = {
+                student_id: (prefers_beef, prefers_fish)
+                for student_id, prefers_beef, prefers_fish in StudentMealPreference.objects.filter(
+                    month=month, student_id__in=[s.id for s in missing]
+                ).values_list("student_id", "prefers_beef", "prefers_fish")
+            }
+            for student in missing:
+                self._resolved[(student.id, month)] = monthly.get(
+                    student.id,
+                    (student.default_prefers_beef, student.default_prefers_fish),
+                )
+        return {s.id: self._resolved[(s.id, month)] for s in students}
+
+    def get(self, student, month):
+        return self.resolve([student], month)[student.id]
+
+
+def resolve_preferences(students, month):
+    """One-off lookup: {student_id: (prefers_beef, prefers_fish)}."""
+    return PreferenceResolver().resolve(students, month)
+
+
+def get_preference_resolver(request):
+    """Return the PreferenceResolver memoized on this request."""
+    resolver = getattr(request, "_preference_resolver", None)
+    if resolver is None:
+        resolver = request._preference_resolver = PreferenceResolver()
+    return resolver
+
+
+def compute_daily_cost(menu, breakfast_on, lunch_on, dinner_on, prefers_beef, prefers_fish):
+    """
+    Cost rule for a single day, for callers that already hold the values.
+    Anything pricing many days should build arrays for price_status_rows.
+    """
+    paisa = price_meals(
+        [breakfast_on, lunch_on, dinner_on], 0, prefers_beef, prefers_fish, MenuTable({0: menu})
+    )
+    return from_paisa(paisa)
+
+
+def token_type_for(meal_type, menu, prefers_beef, prefers_fish):
+    """
+    Students who skip beef or fish get the alternate dish whenever the
+    meal's main dish contains it. Breakfast has no alternate.
+    """
+    if menu is None or meal_type not in ("lunch", "dinner"):
+        return "main"
+    if getattr(menu, f"{meal_type}_contains_beef") and not prefers_beef:
+        return "alternate"
+    if getattr(menu, f"{meal_type}_contains_fish") and not prefers_fish:
+        return "alternate"
+    return "main"
+
+
+def portion_bits(menu, prefs, flags):
+    """
+    Bitmask over HEADCOUNT_SLOTS of the portions one student takes on a
+    day, from (breakfast_on, lunch_on, dinner_on) ``flags``.
+    """
+    bits = 0
+    for meal, is_on in zip(MEALS, flags):
+        if is_on:
+            bits |= 1 << HEADCOUNT_SLOTS.index((meal, token_type_for(meal, menu, *prefs)))
+    return bits
 
-def _get_meal_cost(contains_beef, contains_fish, prefers_beef, prefers_fish, cost, cost_alternate):
-    if contains_beef and not prefers_beef:
-        return cost_alternate
-    if contains_fish and not prefers_fish:
-        return cost_alternate
-    return cost
 
 def calculate_daily_cost(student, current_date):
+    menu = get_menu_for_date(current_date)
+    if menu is None:
+        return Decimal("0.00")
+
     try:
         status = DailyMealStatus.objects.get(student=student, date=current_date)
-        menu = WeeklyMenu.objects.get(
-            day_of_week=current_date.strftime("%A")
-        ) 
+    except DailyMealStatus.DoesNotExist:
+        return Decimal("0.00")
 
-        # Get student's preference for that month
-        month_str = current_date.strftime("%Y-%m")
-        preference = StudentMealPreference.objects.filter(student=student, month=month_str).first()
-        prefers_beef = preference.prefers_beef if preference else student.default_prefers_beef
-        prefers_fish = preference.prefers_fish if preference else student.default_prefers_fish
+    # Get student's preference for that month
+    prefers_beef, prefers_fish = resolve_preferences(
+        [student], current_date.strftime("%Y-%m")
+    )[student.id]
 
-    except (DailyMealStatus.DoesNotExist, WeeklyMenu.DoesNotExist):
-        return Decimal("0.00")
+    return compute_daily_cost(
+        menu,
+        status.breakfast_on,
+        status.lunch_on,
+        status.dinner_on,
+        prefers_beef,
+        prefers_fish,
+    )
+
+
+def month_bounds(year, month):
+    """Return (first_day, last_day) of the given month."""
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def _cache_stamp(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
 
-    cost = Decimal("0.00")
 
-    # Breakfast
-    if status.breakfast_on:
-        cost += menu.breakfast_cost  
+def _current_menu_version():
+    return _cache_stamp(MENU_CACHE_VERSION_KEY)
 
-    # Lunch
-    if status.lunch_on:
-        cost += _get_meal_cost(
-            menu.lunch_contains_beef,
-            menu.lunch_contains_fish,
-            prefers_beef,
-            prefers_fish,
-            menu.lunch_cost,
-            menu.lunch_cost_alternate
+
+def menu_validator(day):
+    """ETag value for the menu served on ``day``; changes with every menu edit."""
+    return f"menu-{_current_menu_version()}-{day.isoformat()}"
+
+
+def get_menus_by_weekday():
+    """
+    Map weekday index (Monday=0) to its WeeklyMenu row, or None when no
+    menu is set for that day.
+
+    The seven rows are loaded once per process and reused until the shared
+    version stamp changes, so lookups on hot paths cost no queries. Callers
+    must treat the returned menus as read-only.
+    """
+    global _menu_cache
+
+    version = _current_menu_version()
+    cached_version, menus = _menu_cache
+    if menus is None or cached_version != version:
+        rows = {m.day_of_week: m for m in WeeklyMenu.objects.all()}
+        menus = {
+            index: rows.get(day) for index, (day, _) in enumerate(WEEKDAY_CHOICES)
+        }
+        _menu_cache = (version, menus)
+    return menus
+
+
+WEEKDAY_INDEX = {day: index for index, (day, _) in enumerate(WEEKDAY_CHOICES)}
+
+
+class MenuTimeline:
+    """
+    Every WeeklyMenuVersion in memory, answering "which menu was in effect
+    on day D" without a query. ``table`` holds one kernel row per version
+    after row 0, the empty menu that days without one are priced with.
+    """
+
+    def __init__(self, versions):
+        self.menus = [None, *versions]
+        self.table = MenuTable(dict(enumerate(self.menus)))
+        self._starts = defaultdict(list)
+        self._spans = defaultdict(list)
+        for row, version in sorted(
+            enumerate(versions, start=1), key=lambda item: item[1].valid_from or date.min
+        ):
+            weekday = WEEKDAY_INDEX[version.day_of_week]
+            self._starts[weekday].append(version.valid_from or date.min)
+            self._spans[weekday].append((version.valid_to or date.max, row))
+        self._rows = {}
+
+    def row_for(self, day):
+        row = self._rows.get(day)
+        if row is None:
+            weekday = day.weekday()
+            position = bisect_right(self._starts[weekday], day) - 1
+            row = 0
+            if position >= 0:
+                valid_to, candidate = self._spans[weekday][position]
+                if day <= valid_to:
+                    row = candidate
+            self._rows[day] = row
+        return row
+
+    def menu_for(self, day):
+        return self.menus[self.row_for(day)]
+
+
+def get_menu_timeline():
+    """
+    The MenuTimeline of every menu version, loaded once per process and
+    reused until the shared menu version stamp changes.
+    """
+    global _menu_timeline
+
+    version = _current_menu_version()
+    cached_version, timeline = _menu_timeline
+    if timeline is None or cached_version != version:
+        timeline = MenuTimeline(list(WeeklyMenuVersion.objects.all()))
+        _menu_timeline = (version, timeline)
+    return timeline
+
+
+def price_status_rows(days, meals_on, preferences):
+    """
+    Price many status rows in one kernel call. ``days`` holds each row's
+    date, ``meals_on`` its (breakfast_on, lunch_on, dinner_on) and
+    ``preferences`` its (prefers_beef, prefers_fish). Each day is priced
+    with the menu version in effect on it. Returns an int64 array of
+    paisa, one entry per row.
+    """
+    if not days:
+        return np.zeros(0, dtype=np.int64)
+    timeline = get_menu_timeline()
+    menu_rows = np.fromiter(
+        (timeline.row_for(day) for day in days), dtype=np.intp, count=len(days)
+    )
+    meals_on = np.array(meals_on, dtype=bool).reshape(-1, 3)
+    preferences = np.array(preferences, dtype=bool).reshape(-1, 2)
+    return price_meals(
+        meals_on, menu_rows, preferences[:, 0], preferences[:, 1], timeline.table
+    )
+
+
+def get_menu_for_date(day):
+    """The menu version in effect on ``day``, or None when none was set."""
+    return get_menu_timeline().menu_for(day)
+
+
+def reprice_menu_days(day_of_week, first_day):
+    """
+    Recompute stored costs, summaries and headcounts of every status on
+    ``day_of_week`` from ``first_day`` on, after that weekday's menu changed.
+    """
+    # Django's week_day runs from 1 = Sunday; WEEKDAY_INDEX from 0 = Monday
+    week_day = (WEEKDAY_INDEX[day_of_week] + 1) % 7 + 1
+    keys = (
+        DailyMealStatus.objects.filter(date__gte=first_day, date__week_day=week_day)
+        .order_by()
+        .values_list("student_id", "date")
+    )
+    return recompute_daily_costs(keys)
+
+
+def record_menu_version(menu, effective_from=None):
+    """
+    Snapshot a WeeklyMenu as the version in effect from ``effective_from``
+    (the first editable meal date by default, so meals that may already be
+    served keep their price). The version before it is closed the day
+    before, and versions scheduled on or after that date are replaced. The
+    first version of a weekday has no start, so it prices the days before
+    versioning too. Stored rows of the weekday from ``effective_from`` on
+    are repriced in the same transaction. Raises ValueError for a start
+    date in the past, since days already priced must keep their menu.
+    """
+    today = timezone.localdate()
+    effective_from = effective_from or first_editable_meal_date(timezone.localtime())
+    if effective_from < today:
+        raise ValueError("A menu change cannot take effect in the past.")
+
+    with transaction.atomic():
+        versions = WeeklyMenuVersion.objects.select_for_update().filter(
+            day_of_week=menu.day_of_week
         )
+        if not versions.exists():
+            version = WeeklyMenuVersion.objects.create(
+                day_of_week=menu.day_of_week, valid_from=None, **menu.menu_values()
+            )
+        else:
+            versions.filter(valid_from__gte=effective_from).delete()
+            versions.filter(Q(valid_to__isnull=True) | Q(valid_to__gte=effective_from)).update(
+                valid_to=effective_from - timedelta(days=1)
+            )
+            version = WeeklyMenuVersion.objects.create(
+                day_of_week=menu.day_of_week, valid_from=effective_from, **menu.menu_values()
+            )
+        # Creating the version dropped this process's timeline, so the
+        # recompute already prices with it
+        reprice_menu_days(menu.day_of_week, effective_from)
+    return version
 
-    # Dinner
-    if status.dinner_on:
-        cost += _get_meal_cost(
-            menu.dinner_contains_beef,
-            menu.dinner_contains_fish,
-            prefers_beef,
-            prefers_fish,
-            menu.dinner_cost,
-            menu.dinner_cost_alternate
+
+def end_menu_versions(day_of_week, last_day=None):
+    """
+    Stop serving a weekday's menu after ``last_day`` (the day before the
+    first editable meal date by default), dropping versions that had not
+    started yet and repricing the stored rows after it.
+    """
+    last_day = last_day or first_editable_meal_date(timezone.localtime()) - timedelta(days=1)
+    with transaction.atomic():
+        versions = WeeklyMenuVersion.objects.select_for_update().filter(day_of_week=day_of_week)
+        versions.filter(valid_from__gt=last_day).delete()
+        versions.filter(Q(valid_to__isnull=True) | Q(valid_to__gt=last_day)).update(
+            valid_to=last_day
         )
+        invalidate_weekly_menu_cache()
+        reprice_menu_days(day_of_week, last_day + timedelta(days=1))
 
-    return cost
 
+def invalidate_menu_history():
+    """Publish a new history stamp so every cached closed month is rebuilt."""
+    transaction.on_commit(
+        lambda: cache.set(MENU_HISTORY_VERSION_KEY, uuid.uuid4().hex, None)
+    )
 
-def calculate_monthly_cost(student, year, month):
-    days_in_month = monthrange(year, month)[1]  # Total days in month
-    total_cost = Decimal("0.00")
 
-    for day in range(1, days_in_month + 1):
-        current_date = date(year, month, day)
-        total_cost += calculate_daily_cost(student, current_date)
+def get_weekly_menu_list():
+    """All configured menus ordered Monday to Sunday."""
+    return [menu for menu in get_menus_by_weekday().values() if menu is not None]
+
 
-    return total_cost
+def invalidate_weekly_menu_cache():
+    """
+    Drop this process's menu copy now and publish a new version stamp once
+    the current transaction commits, so other workers reload committed data.
+    """
+    global _menu_cache, _menu_timeline
 
+    _menu_cache = (None, None)
+    _menu_timeline = (None, None)
+    transaction.on_commit(
+        lambda: cache.set(MENU_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    )
 
-def save_monthly_summary(student, year, month):
-    total_cost = calculate_monthly_cost(student, year, month)
 
-    start_date = date(year, month, 1)
-    end_date = date(year, month, monthrange(year, month)[1])
-    on_days = (
+def meal_history_rows(student, year, month, prefers_beef, prefers_fish):
+    """
+    Priced day rows for a student's month from one status query and a
+    single kernel call over the in-memory menu table. Returns
+    (rows, total_cost).
+    """
+    statuses = list(
         DailyMealStatus.objects.filter(
-            student=student, date__range=(start_date, end_date)
-        ).filter(
-            Q(breakfast_on=True)
-            | Q(lunch_on=True)
-            | Q(dinner_on=True)
-            | Q(dinner_on=True)
-        ).count()
+            student=student, date__range=month_bounds(year, month)
+        )
+        .order_by("date")
+        .values_list("date", "breakfast_on", "lunch_on", "dinner_on")
+    )
+    costs = price_status_rows(
+        [row[0] for row in statuses],
+        [row[1:] for row in statuses],
+        [(prefers_beef, prefers_fish)] * len(statuses),
+    )
+
+    rows = []
+    for (day, breakfast_on, lunch_on, dinner_on), paisa in zip(statuses, costs):
+        rows.append(
+            {
+                "date": day,
+                "weekday": day.strftime("%A"),
+                "breakfast_on": breakfast_on,
+                "lunch_on": lunch_on,
+                "dinner_on": dinner_on,
+                "total_on": breakfast_on + lunch_on + dinner_on,
+                "daily_cost": from_paisa(paisa),
+            }
+        )
+    return rows, from_paisa(costs.sum())
+
+
+def meal_history_etag(data):
+    """Validator for cached history data; changes whenever any row does."""
+    return hashlib.sha1(repr(data).encode("utf-8")).hexdigest()
+
+
+def meal_history_cache_key(user_id, year, month):
+    return f"meal_history:{_cache_stamp(MENU_HISTORY_VERSION_KEY)}:{user_id}:{year}-{month:02d}"
+
+
+def _dashboard_generation_key(user_id):
+    return f"student_dashboard_generation:{user_id}"
+
+
+def student_dashboard_cache_key(user_id, selection):
+    """
+    Cache key for one user's dashboard payload with the given section
+    selection (a canonical string, see api_views.student_dashboard).
+    """
+    generation = _cache_stamp(_dashboard_generation_key(user_id))
+    return f"student_dashboard:{generation}:{user_id}:{selection}"
+
+
+def invalidate_student_dashboards(student_ids):
+    """Drop the cached dashboards of the given students."""
+    if not student_ids:
+        return
+    user_ids = Student.objects.filter(pk__in=student_ids).values_list("user_id", flat=True)
+    cache.delete_many([_dashboard_generation_key(user_id) for user_id in user_ids])
+
+
+def is_closed_range(end, today=None):
+    """Whether every day up to ``end`` lies in a month that is already over."""
+    today = today or timezone.localdate()
+    return end < today.replace(day=1)
+
+
+def _meal_history_generation(student_id):
+    return _cache_stamp(f"meal_history_generation:{student_id}")
+
+
+def meal_range_cache_key(kind, student_id, start, end, cursor=""):
+    """
+    Cache key for one page of a closed date range of a student's statuses
+    or costs. It moves whenever a closed month of the student is corrected.
+    """
+    return (
+        f"meal_range:{kind}:{_cache_stamp(MENU_HISTORY_VERSION_KEY)}:"
+        f"{_meal_history_generation(student_id)}:{student_id}:{start}:{end}:{cursor}"
+    )
+
+
+def invalidate_meal_history(keys, today=None):
+    """
+    Drop cached history for the closed months touched by (student_id, date)
+    keys. Open months are never cached, so ordinary edits cost nothing here.
+    """
+    today = today or timezone.localdate()
+    closed = {
+        (student_id, day.year, day.month)
+        for student_id, day in keys
+        if month_bounds(day.year, day.month)[1] < today
+    }
+    if not closed:
+        return
+    # Range pages span months, so they are dropped per student
+    cache.delete_many(
+        [f"meal_history_generation:{student_id}" for student_id in {key[0] for key in closed}]
+    )
+    user_ids = dict(
+        Student.objects.filter(id__in={key[0] for key in closed}).values_list("id", "user_id")
+    )
+    cache.delete_many(
+        [
+            meal_history_cache_key(user_ids[student_id], year, month)
+            for student_id, year, month in closed
+            if student_id in user_ids
+        ]
+    )
+
+
+def archived_month_totals(student, months):
+    """
+    {(year, month): (total_cost, total_on_days)} from the MonthlyMealSummary
+    bills of the given (year, month) pairs that have been archived. Their
+    daily rows are gone, so the bill is all that is left to show.
+    """
+    archived = {(year, month) for year, month in months if is_month_archived(year, month)}
+    if not archived:
+        return {}
+    rows = MonthlyMealSummary.objects.filter(
+        student=student, month__in=[f"{year}-{month:02d}" for year, month in archived]
+    ).values_list("month", "total_cost", "total_on_days")
+    totals = {key: (Decimal("0.00"), 0) for key in archived}
+    for month, total_cost, total_on_days in rows:
+        year, month_number = map(int, month.split("-"))
+        totals[(year, month_number)] = (total_cost, total_on_days)
+    return totals
+
+
+def year_meal_overview(student, year):
+    """
+    Twelve monthly rows for a student's year from one grouped query: meal
+    counts from the statuses and cost from the stored DailyMealCost rows.
+    Archived months come from their MonthlyMealSummary bill instead, with
+    the per-meal counts left as None.
+    """
+    from .models import DailyMealCost
+
+    stored_cost = DailyMealCost.objects.filter(
+        student=OuterRef("student"), date=OuterRef("date")
+    ).values("total_cost")[:1]
+    totals = {
+        row["month"].month: row
+        for row in DailyMealStatus.objects.filter(student=student, date__year=year)
+        .annotate(month=TruncMonth("date"))
+        .order_by()
+        .values("month")
+        .annotate(
+            days=Count("id"),
+            breakfasts=Count("id", filter=Q(breakfast_on=True)),
+            lunches=Count("id", filter=Q(lunch_on=True)),
+            dinners=Count("id", filter=Q(dinner_on=True)),
+            total_cost=Sum(Subquery(stored_cost)),
+        )
+    }
+
+    archived = archived_month_totals(student, [(year, month) for month in range(1, 13)])
+
+    months = []
+    for month in range(1, 13):
+        if (year, month) in archived:
+            total_cost, total_on_days = archived[(year, month)]
+            months.append(
+                {
+                    "month": date(year, month, 1),
+                    "days": total_on_days,
+                    "breakfasts": None,
+                    "lunches": None,
+                    "dinners": None,
+                    "total_cost": total_cost,
+                    "archived": True,
+                }
+            )
+            continue
+        row = totals.get(month, {})
+        months.append(
+            {
+                "month": date(year, month, 1),
+                "days": row.get("days", 0),
+                "breakfasts": row.get("breakfasts", 0),
+                "lunches": row.get("lunches", 0),
+                "dinners": row.get("dinners", 0),
+                "total_cost": row.get("total_cost") or Decimal("0.00"),
+            }
+        )
+    return months
+
+
+def compute_monthly_totals(year, month, student_ids=None):
+    """
+    Compute cost and ON-day totals for every student in a month using a
+    constant number of queries (students, menus, preferences, statuses).
+
+    Returns {student_id: (total_cost, total_on_days)} for every selected
+    student, including those without any status rows for the month.
+    """
+    month_str = f"{year}-{month:02d}"
+    first_day, last_day = month_bounds(year, month)
+
+    students = Student.objects.only("id", "default_prefers_beef", "default_prefers_fish")
+    statuses = DailyMealStatus.objects.filter(date__range=(first_day, last_day))
+    if student_ids is not None:
+        students = students.filter(id__in=student_ids)
+        statuses = statuses.filter(student_id__in=student_ids)
+
+    effective_prefs = resolve_preferences(students, month_str)
+
+    rows = [
+        row
+        for row in statuses.order_by()
+        .values_list("student_id", "date", "breakfast_on", "lunch_on", "dinner_on")
+        .iterator(chunk_size=SUMMARY_BATCH_SIZE)
+        if row[0] in effective_prefs
+    ]
+    costs = price_status_rows(
+        [row[1] for row in rows],
+        [row[2:] for row in rows],
+        [effective_prefs[row[0]] for row in rows],
     )
 
-    # Save or update summary
+    # Sum per student by position so the whole month stays in the kernel
+    student_ids = list(effective_prefs)
+    position = {student_id: i for i, student_id in enumerate(student_ids)}
+    owners = np.fromiter((position[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+    total_costs = np.zeros(len(student_ids), dtype=np.int64)
+    np.add.at(total_costs, owners, costs)
+    any_on = np.array([row[2] or row[3] or row[4] for row in rows], dtype=bool)
+    on_days = np.bincount(owners[any_on], minlength=len(student_ids))
+
+    return {
+        student_id: (from_paisa(total_costs[i]), int(on_days[i]))
+        for i, student_id in enumerate(student_ids)
+    }
+
+
+def calculate_monthly_cost(student, year, month):
+    totals = compute_monthly_totals(year, month, student_ids=[student.id])
+    return totals.get(student.id, (Decimal("0.00"), 0))[0]
+
+
+def is_month_archived(year, month):
+    """
+    Whether the month's statuses have been archived (see students.archive).
+    Summaries are recomputed before any fixture is written, so from then on
+    the live rows can no longer reproduce them.
+    """
+    from .archive import archive_path
+
+    return archive_path(year, month, "students.DailyMealStatus").exists()
+
+
+def ensure_month_not_archived(year, month):
+    """
+    Raise ValueError for a month whose statuses were archived. Its live
+    rows are gone, so a recompute would overwrite the bills with zeros.
+    """
+    if is_month_archived(year, month):
+        raise ValueError(f"{year}-{month:02d} is archived; its summaries are final.")
+
+
+def bulk_save_monthly_summaries(year, month, student_ids=None):
+    """
+    Upsert MonthlyMealSummary rows for the month in batched INSERT ... ON
+    CONFLICT statements. Returns the number of rows written. Raises
+    ValueError for an archived month.
+    """
+    ensure_month_not_archived(year, month)
+    month_str = f"{year}-{month:02d}"
+    totals = compute_monthly_totals(year, month, student_ids=student_ids)
+
+    summaries = [
+        MonthlyMealSummary(
+            student_id=student_id,
+            month=month_str,
+            total_cost=total_cost,
+            total_on_days=total_on_days,
+        )
+        for student_id, (total_cost, total_on_days) in totals.items()
+    ]
+
     with transaction.atomic():
-        summary, _ = MonthlyMealSummary.objects.update_or_create(
-            student=student,
-            month=f"{year}-{str(month).zfill(2)}",
-            defaults={"total_cost": total_cost, "total_on_days": on_days},
+        MonthlyMealSummary.objects.bulk_create(
+            summaries,
+            batch_size=SUMMARY_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["student", "month"],
+            update_fields=["total_cost", "total_on_days", "updated_at"],
         )
 
-    return summary
+    return len(summaries)
+
+
+def save_monthly_summary(student, year, month):
+    bulk_save_monthly_summaries(year, month, student_ids=[student.id])
+    return MonthlyMealSummary.objects.get(
+        student=student, month=f"{year}-{month:02d}"
+    )
 
 
 def generate_monthly_summary_for_all(year, month):
-    students = Student.objects.all()
-    for student in students:
-        save_monthly_summary(student, year, month)
+    return bulk_save_monthly_summaries(year, month)
 
 
-def save_daily_cost(student, current_date):
+def find_monthly_summary_drift(year, month):
     """
-    Calculates and saves the student's total meal cost for the given date.
-    Updates the existing record or creates a new one.
+    Compare stored MonthlyMealSummary rows with a full recompute. Returns
+    a list of (student_id, stored, expected), each a (total_cost,
+    total_on_days) pair; stored is None when the row is missing. Students
+    with nothing to bill and no row are not reported. Raises ValueError for
+    an archived month, which has no live rows to compare against.
+    """
+    ensure_month_not_archived(year, month)
+    expected = compute_monthly_totals(year, month)
+    stored = {
+        student_id: (total_cost, total_on_days)
+        for student_id, total_cost, total_on_days in MonthlyMealSummary.objects.filter(
+            month=f"{year}-{month:02d}"
+        ).values_list("student_id", "total_cost", "total_on_days")
+    }
+
+    drift = []
+    for student_id in sorted(expected.keys() | stored.keys()):
+        expected_totals = expected.get(student_id, (Decimal("0.00"), 0))
+        stored_totals = stored.get(student_id)
+        if stored_totals is None and expected_totals == (Decimal("0.00"), 0):
+            continue
+        if stored_totals != expected_totals:
+            drift.append((student_id, stored_totals, expected_totals))
+    return drift
+
+
+def _preferences_for_rows(rows):
+    """
+    Resolve preferences for every (student_id, date, ...) row at once.
+    Returns {(student_id, "YYYY-MM"): (prefers_beef, prefers_fish)}.
+    """
+    students = list(
+        Student.objects.filter(id__in={row[0] for row in rows}).only(
+            "id", "default_prefers_beef", "default_prefers_fish"
+        )
+    )
+    resolver = PreferenceResolver()
+    preferences = {}
+    for month in {row[1].strftime("%Y-%m") for row in rows}:
+        for student_id, prefs in resolver.resolve(students, month).items():
+            preferences[(student_id, month)] = prefs
+    return preferences
+
+
+def _build_daily_costs(rows):
+    """
+    Turn (student_id, date, breakfast_on, lunch_on, dinner_on) rows into
+    unsaved DailyMealCost objects, loading preferences once and pricing
+    every row in one kernel call.
+    """
+    from .models import DailyMealCost
+
+    rows = list(rows)
+    preferences = _preferences_for_rows(rows)
+    rows = [row for row in rows if (row[0], row[1].strftime("%Y-%m")) in preferences]
+    row_prefs = [preferences[(row[0], row[1].strftime("%Y-%m"))] for row in rows]
+    costs = price_status_rows([row[1] for row in rows], [row[2:] for row in rows], row_prefs)
+    timeline = get_menu_timeline()
+    return [
+        DailyMealCost(
+            student_id=row[0],
+            date=row[1],
+            total_cost=from_paisa(paisa),
+            on_day=bool(row[2] or row[3] or row[4]),
+            portions=portion_bits(timeline.menu_for(row[1]), prefs, row[2:]),
+        )
+        for row, prefs, paisa in zip(rows, row_prefs, costs)
+    ]
+
+
+def _upsert_daily_costs(costs):
+    from .models import DailyMealCost
+
+    DailyMealCost.objects.bulk_create(
+        costs,
+        batch_size=COST_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["student", "date"],
+        update_fields=["total_cost", "on_day", "portions"],
+    )
+    return len(costs)
+
+
+def _status_rows(queryset):
+    return queryset.order_by().values_list(
+        "student_id", "date", "breakfast_on", "lunch_on", "dinner_on"
+    )
+
+
+def _lock_cost_keys(keys):
+    """
+    Take a transaction-level advisory lock per (student_id, date) key, in
+    a fixed order so concurrent callers cannot deadlock. The old cost row
+    may not exist yet, so a row lock would let two flushes both apply the
+    key's delta from zero. PostgreSQL only; other databases serialise
+    writers anyway.
+    """
+    if connection.vendor != "postgresql" or not keys:
+        return
+    ordered = sorted((student_id, day.toordinal()) for student_id, day in keys)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(k.student_id, k.day) FROM ("
+            "SELECT unnest(%s::int[]) AS student_id, unnest(%s::int[]) AS day "
+            "ORDER BY 1, 2) k",
+            [[key[0] for key in ordered], [key[1] for key in ordered]],
+        )
+
+
+def recompute_daily_costs(keys):
+    """
+    Recompute DailyMealCost for the given (student_id, date) keys in a
+    constant number of queries. Keys without a status row are priced at
+    zero, matching calculate_daily_cost.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+
+    from .models import DailyMealCost
+
+    with transaction.atomic():
+        # Row locks cannot cover keys without a cost row yet, so concurrent
+        # flushes of the same key are serialised on the key itself. Statuses
+        # are read under the lock, so the later flush prices the newer data.
+        _lock_cost_keys(keys)
+        statuses = DailyMealStatus.objects.filter(
+            student_id__in={student_id for student_id, _ in keys},
+            date__in={day for _, day in keys},
+        )
+        rows = [row for row in _status_rows(statuses) if (row[0], row[1]) in keys]
+        found = {(row[0], row[1]) for row in rows}
+        rows += [
+            (student_id, day, False, False, False)
+            for student_id, day in keys - found
+        ]
+        costs = _build_daily_costs(rows)
+
+        existing = (
+            DailyMealCost.objects.select_for_update()
+            .filter(
+                student_id__in={student_id for student_id, _ in keys},
+                date__in={day for _, day in keys},
+            )
+            .values_list("student_id", "date", "total_cost", "on_day", "portions")
+        )
+        previous, previous_portions = {}, {}
+        for student_id, day, total_cost, on_day, portions in existing:
+            if (student_id, day) in keys:
+                previous[(student_id, day)] = (total_cost, on_day)
+                previous_portions[(student_id, day)] = portions
+        written = _upsert_daily_costs(costs)
+        apply_monthly_summary_deltas(previous, costs)
+        apply_headcount_deltas(previous_portions, costs)
+    invalidate_student_dashboards({student_id for student_id, _ in keys})
+    return written
+
+
+def apply_monthly_summary_deltas(previous, costs):
+    """
+    Move MonthlyMealSummary by the difference between old and new daily
+    costs. ``previous`` maps (student_id, date) to the old (total_cost,
+    on_day) and ``costs`` holds the new DailyMealCost objects.
+
+    Existing month rows move by atomic F() updates, one per (month, change)
+    group of students. A student-month without a row is computed in full
+    once instead, since a delta would leave out the month's other days.
+    Drift is caught by generate_monthly_summary --check.
+    """
+    deltas = defaultdict(lambda: [Decimal("0.00"), 0])
+    for cost in costs:
+        old_cost, old_on_day = previous.get(
+            (cost.student_id, cost.date), (Decimal("0.00"), False)
+        )
+        delta = deltas[(cost.student_id, cost.date.strftime("%Y-%m"))]
+        delta[0] += cost.total_cost - old_cost
+        delta[1] += int(cost.on_day) - int(old_on_day)
+    if not deltas:
+        return
+
+    existing = set(
+        MonthlyMealSummary.objects.filter(
+            student_id__in={student_id for student_id, _ in deltas},
+            month__in={month for _, month in deltas},
+        ).values_list("student_id", "month")
+    )
+
+    missing = defaultdict(list)
+    grouped = defaultdict(list)
+    for (student_id, month), (cost_delta, day_delta) in deltas.items():
+        if (student_id, month) not in existing:
+            missing[month].append(student_id)
+        elif cost_delta or day_delta:
+            grouped[(month, cost_delta, day_delta)].append(student_id)
+
+    # One UPDATE per month and step, so repricing a hall is a handful of
+    # statements rather than one per student
+    for (month, cost_delta, day_delta), student_ids in grouped.items():
+        MonthlyMealSummary.objects.filter(student_id__in=student_ids, month=month).update(
+            total_cost=F("total_cost") + cost_delta,
+            total_on_days=F("total_on_days") + day_delta,
+            updated_at=timezone.now(),
+        )
+
+    for month, student_ids in missing.items():
+        year, month_number = map(int, month.split("-"))
+        if is_month_archived(year, month_number):
+            # Only a late edit reaches an archived month; its bills are final
+            continue
+        bulk_save_monthly_summaries(year, month_number, student_ids=student_ids)
+
+
+def apply_headcount_deltas(previous, costs):
+    """
+    Move DailyHeadcount by the portions each recomputed (student, date)
+    gained or lost. ``previous`` maps (student_id, date) to the old portion
+    bits; a key missing from it counted nothing yet.
+
+    Frozen dates are left alone. A date nobody has counted yet, or one
+    touched by a cost row older than portion tracking (None), is counted
+    in full once instead. Drift is caught by repair_daily_headcounts --check.
+    """
+    from .models import DailyHeadcount
+
+    days = {cost.date for cost in costs}
+    if not days:
+        return
+    counted = dict(
+        DailyHeadcount.objects.filter(date__in=days)
+        .values_list("date", "frozen")
+        .distinct()
+    )
+    recount = {day for day in days if day not in counted}
+    recount |= {
+        cost.date
+        for cost in costs
+        if (cost.student_id, cost.date) in previous
+        and previous[(cost.student_id, cost.date)] is None
+    }
+    recount -= {day for day, frozen in counted.items() if frozen}
+
+    deltas = defaultdict(int)
+    for cost in costs:
+        if cost.date in recount or counted.get(cost.date):
+            continue
+        old = previous.get((cost.student_id, cost.date)) or 0
+        for bit, (meal, token_type) in enumerate(HEADCOUNT_SLOTS):
+            change = (cost.portions >> bit & 1) - (old >> bit & 1)
+            if change:
+                deltas[(cost.date, meal, token_type)] += change
+
+    # One UPDATE per slot and step size, whatever the number of dates
+    grouped = defaultdict(list)
+    for (day, meal, token_type), change in deltas.items():
+        if change:
+            grouped[(meal, token_type, change)].append(day)
+    for (meal, token_type, change), dates in grouped.items():
+        DailyHeadcount.objects.filter(
+            date__in=dates, meal=meal, token_type=token_type, frozen=False
+        ).update(count=Greatest(F("count") + change, Value(0)), updated_at=timezone.now())
+
+    if recount:
+        rebuild_daily_headcounts(recount)
+
+
+def mark_daily_cost_dirty(student_id, day):
+    """
+    Record that a student's cost for a day needs recomputing. Dirty keys are
+    collected per thread and flushed in one batch once the surrounding
+    transaction commits, so a request that writes many statuses pays for a
+    single recompute instead of one per save.
+    """
+    keys = getattr(_dirty_costs, "keys", None)
+    if keys is None:
+        keys = _dirty_costs.keys = set()
+    keys.add((student_id, day))
+    transaction.on_commit(flush_dirty_daily_costs)
+
+
+def flush_dirty_daily_costs():
+    """Recompute every pending dirty key. Safe to call repeatedly."""
+    keys = getattr(_dirty_costs, "keys", None)
+    if not keys:
+        return 0
+    _dirty_costs.keys = set()
+    count = recompute_daily_costs(keys)
+    days = {day for _, day in keys}
+    invalidate_headcount_snapshot(days)
+    invalidate_meal_history(keys)
+    return count
+
+
+def backfill_daily_costs(start_date, end_date, student_ids=None):
+    """
+    Recompute and upsert DailyMealCost for every status in the range, then
+    rebuild the summaries of every month it touches.
+    """
+    statuses = DailyMealStatus.objects.filter(date__range=(start_date, end_date))
+    if student_ids is not None:
+        statuses = statuses.filter(student_id__in=student_ids)
+
+    with transaction.atomic():
+        written = _upsert_daily_costs(_build_daily_costs(_status_rows(statuses)))
+        # A backfill rewrites costs wholesale, so recompute the months fully.
+        # Archived months have no live rows and keep their final summaries.
+        month = date(start_date.year, start_date.month, 1)
+        while month <= end_date:
+            if not is_month_archived(month.year, month.month):
+                bulk_save_monthly_summaries(month.year, month.month, student_ids=student_ids)
+            month = (month + timedelta(days=32)).replace(day=1)
+    return written
+
+
+def find_daily_cost_mismatches(start_date, end_date, student_ids=None):
+    """
+    Compare stored DailyMealCost rows with freshly computed values.
+    Returns a list of (student_id, date, stored_cost, expected_cost);
+    stored_cost is None when the cost row is missing.
     """
     from .models import DailyMealCost
 
-    total_cost = calculate_daily_cost(student, current_date)
+    statuses = DailyMealStatus.objects.filter(date__range=(start_date, end_date))
+    stored_costs = DailyMealCost.objects.filter(date__range=(start_date, end_date))
+    if student_ids is not None:
+        statuses = statuses.filter(student_id__in=student_ids)
+        stored_costs = stored_costs.filter(student_id__in=student_ids)
+
+    expected = {
+        (cost.student_id, cost.date): cost.total_cost
+        for cost in _build_daily_costs(_status_rows(statuses))
+    }
+    stored = {
+        (student_id, day): total_cost
+        for student_id, day, total_cost in stored_costs.values_list(
+            "student_id", "date", "total_cost"
+        )
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys(), key=lambda k: (k[1], k[0])):
+        expected_cost = expected.get(key, Decimal("0.00"))
+        stored_cost = stored.get(key)
+        if stored_cost != expected_cost:
+            mismatches.append((key[0], key[1], stored_cost, expected_cost))
+    return mismatches
+
+
+def first_editable_meal_date(current_dt):
+    """
+    Earliest date whose meal status can still be changed: tomorrow before
+    the 8:00 PM cutoff, the day after tomorrow once it has passed.
+    """
+    tomorrow = current_dt.date() + timedelta(days=1)
+    cutoff_dt = current_dt.replace(
+        hour=MEAL_STATUS_CUTOFF_HOUR, minute=0, second=0, microsecond=0
+    )
+    if current_dt >= cutoff_dt:
+        return tomorrow + timedelta(days=1)
+    return tomorrow
+
+
+def bulk_upsert_meal_statuses(student, statuses):
+    """
+    Write a student's meal statuses for many days at once.
+
+    ``statuses`` maps each date to a (breakfast_on, lunch_on, dinner_on)
+    tuple. All rows are upserted in one INSERT ... ON CONFLICT statement and
+    the matching DailyMealCost rows are recomputed in a single pass.
+    Returns the number of days written.
+    """
+    if not statuses:
+        return 0
+
+    rows = [
+        DailyMealStatus(
+            student=student,
+            date=day,
+            breakfast_on=breakfast_on,
+            lunch_on=lunch_on,
+            dinner_on=dinner_on,
+        )
+        for day, (breakfast_on, lunch_on, dinner_on) in sorted(statuses.items())
+    ]
+
+    with transaction.atomic():
+        DailyMealStatus.objects.bulk_create(
+            rows,
+            batch_size=COST_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["student", "date"],
+            update_fields=["breakfast_on", "lunch_on", "dinner_on", "updated_at"],
+        )
+        recompute_daily_costs((student.id, day) for day in statuses)
+        days = set(statuses)
+        transaction.on_commit(lambda: invalidate_headcount_snapshot(days))
+
+    return len(rows)
+
+
+def carried_over_flags(previous_flags, default_meal_status):
+    """
+    (breakfast_on, lunch_on, dinner_on) for a day nobody has set yet: the
+    previous day's choices, or the student's default when there are none.
+    """
+    if previous_flags is not None:
+        return tuple(previous_flags)
+    return (default_meal_status,) * 3
+
+
+def rollover_meal_statuses(day):
+    """
+    Create ``day``'s DailyMealStatus for every active student who has none,
+    carrying over the previous day's choices. Rows are inserted with one
+    bulk_create that ignores conflicts, so the rollover can run on a
+    schedule alongside live edits. Costs and headcounts for the new rows
+    are computed in bulk. Returns the number of rows created.
+    """
+    students = Student.objects.filter(user__is_active=True).exclude(
+        dailymealstatus__date=day
+    )
+    previous = {
+        student_id: flags
+        for student_id, *flags in DailyMealStatus.objects.filter(
+            date=day - timedelta(days=1)
+        )
+        .order_by()
+        .values_list("student_id", "breakfast_on", "lunch_on", "dinner_on")
+    }
+
+    rows = []
+    for student_id, default_meal_status in students.values_list("id", "default_meal_status"):
+        breakfast_on, lunch_on, dinner_on = carried_over_flags(
+            previous.get(student_id), default_meal_status
+        )
+        rows.append(
+            DailyMealStatus(
+                student_id=student_id,
+                date=day,
+                breakfast_on=breakfast_on,
+                lunch_on=lunch_on,
+                dinner_on=dinner_on,
+            )
+        )
+    if not rows:
+        return 0
+
+    with transaction.atomic():
+        DailyMealStatus.objects.bulk_create(
+            rows, batch_size=COST_BATCH_SIZE, ignore_conflicts=True
+        )
+        recompute_daily_costs((row.student_id, day) for row in rows)
+        transaction.on_commit(lambda: invalidate_headcount_snapshot([day]))
+
+    return len(rows)
+
+
+def previous_month_str(month):
+    """The YYYY-MM month before ``month``."""
+    year, month_number = map(int, month.split("-"))
+    return (date(year, month_number, 1) - timedelta(days=1)).strftime("%Y-%m")
 
-    DailyMealCost.objects.update_or_create(
+
+def carried_over_preference(student, month, previous=None):
+    """
+    Unsaved StudentMealPreference for a month nobody has set yet: the
+    previous month's choices, or the student's defaults when there are none.
+    """
+    return StudentMealPreference(
         student=student,
-        date=current_date,
-        defaults={"total_cost": total_cost},
+        month=month,
+        prefers_beef=previous.prefers_beef if previous else student.default_prefers_beef,
+        prefers_fish=previous.prefers_fish if previous else student.default_prefers_fish,
+    )
+
+
+def rollover_meal_preferences(month):
+    """
+    Create ``month``'s StudentMealPreference for every active student who
+    has none, carrying over the previous month's row or the student's
+    defaults, with one bulk insert that ignores conflicts.
+
+    Costs and headcounts already computed for the month priced those
+    students with their defaults, so they are recomputed in bulk for the
+    new rows. Returns the number of rows created.
+    """
+    students = list(
+        Student.objects.filter(user__is_active=True)
+        .exclude(studentmealpreference__month=month)
+        .only("id", "default_prefers_beef", "default_prefers_fish")
+    )
+    if not students:
+        return 0
+
+    previous = {
+        pref.student_id: pref
+        for pref in StudentMealPreference.objects.filter(
+            month=previous_month_str(month), student__in=students
+        )
+    }
+    rows = [
+        carried_over_preference(student, month, previous.get(student.id))
+        for student in students
+    ]
+
+    year, month_number = map(int, month.split("-"))
+    with transaction.atomic():
+        StudentMealPreference.objects.bulk_create(
+            rows, batch_size=COST_BATCH_SIZE, ignore_conflicts=True
+        )
+        keys = set(
+            DailyMealStatus.objects.filter(
+                date__range=month_bounds(year, month_number),
+                student__in=students,
+            )
+            .order_by()
+            .values_list("student_id", "date")
+        )
+        recompute_daily_costs(keys)
+
+    return len(rows)
+
+
+def _headcount_cache_key(day):
+    return f"headcount:{day.isoformat()}"
+
+
+def compute_headcount(day):
+    """
+    Return every admin dashboard figure for ``day`` from one query: users
+    are LEFT JOINed to their student row and to that student's status for
+    the day only, and each figure is a filtered COUNT over the result.
+    """
+    from accounts.models import CustomUser
+
+    return CustomUser.objects.annotate(
+        day_status=FilteredRelation(
+            "student__dailymealstatus",
+            condition=Q(student__dailymealstatus__date=day),
+        )
+    ).aggregate(
+        total_students=Count("student"),
+        total_staff=Count("id", filter=Q(role="manager")),
+        breakfast_on=Count("day_status", filter=Q(day_status__breakfast_on=True)),
+        lunch_on=Count("day_status", filter=Q(day_status__lunch_on=True)),
+        dinner_on=Count("day_status", filter=Q(day_status__dinner_on=True)),
     )
 
-    return total_cost
+
+def headcount_snapshot(day=None):
+    """Cached compute_headcount for ``day`` (today by default)."""
+    day = day or timezone.localdate()
+    key = _headcount_cache_key(day)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = compute_headcount(day)
+        cache.set(key, snapshot, HEADCOUNT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_headcount_snapshot(days):
+    """Drop cached snapshots for days whose meal statuses changed."""
+    cache.delete_many([_headcount_cache_key(day) for day in days])
+
+
+def _build_daily_headcounts(days, rows):
+    """
+    Count ON meals per (date, meal, token_type) from status rows. Every
+    combination gets a row, so days nobody eats on still read as zero.
+    """
+    from .models import DailyHeadcount
+
+    counts = {
+        (day, meal, token_type): 0
+        for day in days
+        for meal in MEALS
+        for token_type in ("main", "alternate")
+    }
+    preferences = _preferences_for_rows(rows)
+    timeline = get_menu_timeline()
+
+    for student_id, day, breakfast_on, lunch_on, dinner_on in rows:
+        prefs = preferences.get((student_id, day.strftime("%Y-%m")))
+        if prefs is None:
+            continue
+        menu = timeline.menu_for(day)
+        for meal, is_on in zip(MEALS, (breakfast_on, lunch_on, dinner_on)):
+            if is_on:
+                counts[(day, meal, token_type_for(meal, menu, *prefs))] += 1
+
+    return [
+        DailyHeadcount(date=day, meal=meal, token_type=token_type, count=count)
+        for (day, meal, token_type), count in counts.items()
+    ]
+
+
+def rebuild_daily_headcounts(days, include_frozen=False):
+    """
+    Recount DailyHeadcount for the given dates from their meal statuses in
+    a constant number of queries. Used to count a date for the first time
+    and to repair drift; ordinary changes go through apply_headcount_deltas.
+    Frozen dates are left alone unless ``include_frozen`` is set. Returns
+    the number of dates rebuilt.
+    """
+    from .models import DailyHeadcount
+
+    days = set(days)
+    if not include_frozen:
+        days -= set(
+            DailyHeadcount.objects.filter(date__in=days, frozen=True).values_list(
+                "date", flat=True
+            )
+        )
+    if not days:
+        return 0
+
+    rows = list(_status_rows(DailyMealStatus.objects.filter(date__in=days)))
+    DailyHeadcount.objects.bulk_create(
+        _build_daily_headcounts(days, rows),
+        batch_size=COST_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["date", "meal", "token_type"],
+        update_fields=["count", "updated_at"],
+    )
+    return len(days)
+
+
+def find_headcount_drift(days):
+    """
+    Compare stored DailyHeadcount rows with a full recount. Returns a list
+    of (date, meal, token_type, stored, expected); stored is None when the
+    row is missing. Frozen dates are final and never reported.
+    """
+    from .models import DailyHeadcount
+
+    stored = {
+        (day, meal, token_type): (count, frozen)
+        for day, meal, token_type, count, frozen in DailyHeadcount.objects.filter(
+            date__in=days
+        ).values_list("date", "meal", "token_type", "count", "frozen")
+    }
+    frozen_days = {key[0] for key, (_, frozen) in stored.items() if frozen}
+    days = set(days) - frozen_days
+    rows = list(_status_rows(DailyMealStatus.objects.filter(date__in=days)))
+    drift = []
+    for headcount in _build_daily_headcounts(days, rows):
+        key = (headcount.date, headcount.meal, headcount.token_type)
+        count = stored[key][0] if key in stored else None
+        if count != headcount.count:
+            drift.append((*key, count, headcount.count))
+    return sorted(drift)
+
+
+def freeze_daily_headcounts(day):
+    """
+    Take the final count for ``day`` and stop maintaining it. A day never
+    counted so far is counted first. Already frozen days are kept as they
+    are. Returns True if the day was frozen now.
+    """
+    from .models import DailyHeadcount
+
+    with transaction.atomic():
+        if DailyHeadcount.objects.filter(date=day, frozen=True).exists():
+            return False
+        if not DailyHeadcount.objects.filter(date=day).exists():
+            rebuild_daily_headcounts([day], include_frozen=True)
+        DailyHeadcount.objects.filter(date=day).update(frozen=True)
+    return True
+
+
+def refresh_headcounts_for_preference(student_id, month):
+    """
+    Recompute the student's still-editable days of the month once the
+    current transaction commits, since a preference change can move
+    portions between main and alternate and change their price.
+    """
+    year, month_number = map(int, month.split("-"))
+    first_day, last_day = month_bounds(year, month_number)
+    start = max(first_day, first_editable_meal_date(timezone.localtime()))
+    if start > last_day:
+        return
+    days = DailyMealStatus.objects.filter(
+        student_id=student_id, date__range=(start, last_day)
+    ).values_list("date", flat=True)
+    for day in days:
+        mark_daily_cost_dirty(student_id, day)
+
+
+def get_daily_headcount(day, current_dt=None):
+    """
+    Read the kitchen numbers for ``day`` from DailyHeadcount. A day whose
+    cutoff has passed is frozen on first read, so the figures stay fixed
+    even if no scheduled freeze ran.
+
+    Returns {"date", "frozen", "meals": {meal: {"main", "alternate", "total"}}}.
+    """
+    from .models import DailyHeadcount
+
+    def load():
+        return list(
+            DailyHeadcount.objects.filter(date=day).values_list(
+                "meal", "token_type", "count", "frozen"
+            )
+        )
+
+    current_dt = current_dt or timezone.localtime()
+    rows = load()
+    frozen = bool(rows) and all(row[3] for row in rows)
+    if day < first_editable_meal_date(current_dt) and not frozen:
+        freeze_daily_headcounts(day)
+        rows = load()
+        frozen = True
+    elif not rows:
+        rebuild_daily_headcounts([day])
+        rows = load()
+
+    meals = {meal: {"main": 0, "alternate": 0, "total": 0} for meal in MEALS}
+    for meal, token_type, count, _ in rows:
+        meals[meal][token_type] = count
+        meals[meal]["total"] += count
+    return {"date": day, "frozen": frozen, "meals": meals}
 
 
 # def get_previous_month(current_month):
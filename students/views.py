@@ -1,16 +1,20 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
+from django.http import HttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Avg, Count
 from django.utils.timezone import now, localtime, make_aware
 from django.utils.dateformat import DateFormat
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
-from datetime import date, timedelta, time, datetime
+from datetime import MAXYEAR, MINYEAR, date, timedelta, time, datetime
 from calendar import monthrange
 
 from accounts.decorators import student_required
-from managers.models import MealToken
+from managers.models import QR_CACHE_TIMEOUT, QR_CONTENT_TYPES, MealToken
 
 from .models import (
     DailyMealCost,
@@ -19,13 +23,29 @@ from .models import (
     PaymentSlip, 
     Student,
     StudentMealPreference,
-    WeeklyMenu, 
     Complaint,
     WeeklyMenuReview
 )
 
 from .forms import PaymentSlipForm, StudentMealPreferenceForm, WeeklyMenuReviewForm
-from .utils import calculate_monthly_cost
+from .utils import (
+    CLOSED_MONTH_MAX_AGE,
+    MEAL_HISTORY_CACHE_TIMEOUT,
+    archived_month_totals,
+    bulk_upsert_meal_statuses,
+    calculate_monthly_cost,
+    carried_over_flags,
+    carried_over_preference,
+    first_editable_meal_date,
+    get_preference_resolver,
+    get_weekly_menu_list,
+    meal_history_cache_key,
+    meal_history_etag,
+    meal_history_rows,
+    month_bounds,
+    previous_month_str,
+    year_meal_overview,
+)
 
 from calendar import monthrange
 
@@ -46,65 +66,78 @@ def monthly_summary(request):
     return render(request, "students/monthly_summary.html", context)
 
 
+def _status_flags(status):
+    if status is None:
+        return None
+    return (status.breakfast_on, status.lunch_on, status.dinner_on)
+
+
+def _tomorrow_defaults(student, today_status):
+    """Tomorrow starts from today's choices, as the nightly rollover does."""
+    breakfast_on, lunch_on, dinner_on = carried_over_flags(
+        _status_flags(today_status), student.default_meal_status
+    )
+    return {"breakfast_on": breakfast_on, "lunch_on": lunch_on, "dinner_on": dinner_on}
+
+
 @login_required
 def my_daily_meal_status(request):
     current_dt = localtime(now())
     today = current_dt.date()
     tomorrow = today + timedelta(days=1)
-    current_year = today.year
-    current_month = today.month
 
     student = Student.objects.get(user=request.user)
 
-    # Get or create today's status
-    today_status, _ = DailyMealStatus.objects.get_or_create(
-        student=student,
-        date=today,
-        defaults={
-            "breakfast_on": False,
-            "lunch_on": False,
-            "dinner_on": False,
-        },
-    )
-
-    # Tomorrow defaults are copied from today's current values
-    tomorrow_defaults = {
-        "breakfast_on": today_status.breakfast_on,
-        "lunch_on": today_status.lunch_on,
-        "dinner_on": today_status.dinner_on,
+    # Rows are created by the nightly rollover or by an explicit change;
+    # viewing the page never writes.
+    existing = {
+        status.date: status
+        for status in DailyMealStatus.objects.filter(
+            student=student, date__in=[today, tomorrow]
+        )
     }
-
-    tomorrow_status, created = DailyMealStatus.objects.get_or_create(
-        student=student,
-        date=tomorrow,
-        defaults=tomorrow_defaults,
-    )
+    today_status = existing.get(today)
+    tomorrow_status = existing.get(tomorrow)
 
     if request.method == "POST":
+        if tomorrow_status is None:
+            tomorrow_status, _ = DailyMealStatus.objects.get_or_create(
+                student=student,
+                date=tomorrow,
+                defaults=_tomorrow_defaults(student, today_status),
+            )
         tomorrow_status.breakfast_on = bool(request.POST.get("breakfast_on"))
         tomorrow_status.lunch_on = bool(request.POST.get("lunch_on"))
         tomorrow_status.dinner_on = bool(request.POST.get("dinner_on"))
         tomorrow_status.save()
         return redirect("students:my_meal_status")
 
-    # Get current month's meal statuses
-    first_day = date(current_year, current_month, 1)
-    last_day = date(
-        current_year, current_month, monthrange(current_year, current_month)[1]
-    )
-    statuses = DailyMealStatus.objects.filter(
-        student=student, date__range=(first_day, last_day)
-    ).order_by("-date")
+    tomorrow_status_exists = tomorrow_status is not None
+    if today_status is None:
+        # No row means no meals were booked for today
+        today_status = DailyMealStatus(
+            student=student,
+            date=today,
+            breakfast_on=False,
+            lunch_on=False,
+            dinner_on=False,
+        )
+    if tomorrow_status is None:
+        tomorrow_status = DailyMealStatus(
+            student=student,
+            date=tomorrow,
+            **_tomorrow_defaults(student, existing.get(today)),
+        )
 
+    # The month calendar loads its days from the range APIs
     context = {
         "page_title": "Daily Meal Status",
         "today": today,
         "tomorrow": tomorrow,
         "today_status": today_status,
         "tomorrow_status": tomorrow_status,
-        "tomorrow_status_exists": bool(tomorrow_status),
+        "tomorrow_status_exists": tomorrow_status_exists,
         "today_date": today,
-        "statuses": statuses,
     }
 
     return render(request, "students/my_meal_status.html", context)
@@ -112,6 +145,9 @@ def my_daily_meal_status(request):
 
 @login_required
 def update_tomorrow_meal_status(request, meal_type):
+    if request.method != "POST":
+        return redirect("students:my_meal_status")
+
     student = Student.objects.get(user=request.user)
     current_dt = localtime(now())
 
@@ -126,28 +162,14 @@ def update_tomorrow_meal_status(request, meal_type):
     today = current_dt.date()
     tomorrow = today + timedelta(days=1)
 
-    # Get today's status to inherit defaults
-    today_status, _ = DailyMealStatus.objects.get_or_create(
-        student=student,
-        date=today,
-        defaults={
-            "breakfast_on": False,
-            "lunch_on": False,
-            "dinner_on": False,
-        },
-    )
-
-    # Tomorrow inherits today's current values
-    tomorrow_defaults = {
-        "breakfast_on": today_status.breakfast_on,
-        "lunch_on": today_status.lunch_on,
-        "dinner_on": today_status.dinner_on,
-    }
-
+    # Tomorrow inherits today's current values if it was not rolled over yet
     meal_status, _ = DailyMealStatus.objects.get_or_create(
         student=student,
         date=tomorrow,
-        defaults=tomorrow_defaults,
+        defaults=_tomorrow_defaults(
+            student,
+            DailyMealStatus.objects.filter(student=student, date=today).first(),
+        ),
     )
 
     # Toggle the selected meal
@@ -171,37 +193,6 @@ def get_month_str(dt):
     return dt.strftime("%Y-%m")
 
 
-def get_or_create_meal_pref(student, month_str):
-    pref=StudentMealPreference.objects.filter(student=student, month=month_str).first()
-
-    if pref:
-        return pref
-    
-    # if not pref found then use prev month
-    year, month = map(int, month_str.split("-"))
-    prev_month = date(year, month, 1) - timedelta(days=1)
-    prev_month_str = get_month_str(prev_month)
-    
-    
-    prev_pref = StudentMealPreference.objects.filter(student=student, month=prev_month_str).first()
-    
-    if prev_pref:
-        return StudentMealPreference.objects.create(
-            student=student,
-            month = month_str,
-            prefers_beef = prev_pref.prefers_beef,
-            prefers_fish = prev_pref.prefers_fish,
-        )
-
-    # Fallback to student's default meal preference
-    return StudentMealPreference.objects.create(
-        student=student,
-        month=month_str,
-        prefers_beef = student.default_prefers_beef,
-        prefers_fish = student.default_prefers_fish,
-    )
-
-
 @login_required
 def my_meal_preference(request):
     student = Student.objects.get(user=request.user)
@@ -217,8 +208,22 @@ def my_meal_preference(request):
 
     cutoff_passed = today>=next_month_date
 
-    current_pref = get_or_create_meal_pref(student, current_month_str)
-    next_pref = get_or_create_meal_pref(student, next_month_str)
+    # Rows are created by the month-start rollover or when the student saves
+    # a preference; months without one show what the rollover would carry.
+    prev_month_str = previous_month_str(current_month_str)
+    prefs = {
+        pref.month: pref
+        for pref in StudentMealPreference.objects.filter(
+            student=student,
+            month__in=[prev_month_str, current_month_str, next_month_str],
+        )
+    }
+    current_pref = prefs.get(current_month_str) or carried_over_preference(
+        student, current_month_str, prefs.get(prev_month_str)
+    )
+    next_pref = prefs.get(next_month_str) or carried_over_preference(
+        student, next_month_str, current_pref
+    )
 
     context = {
         "page_title": "My Meal Preference",
@@ -265,26 +270,19 @@ def update_multiple_days_meal_status(request):
     statuses_dict = {s.date: s for s in statuses_qs}
 
     if request.method == "POST":
-        # Loop over all future days
+        first_editable = first_editable_meal_date(current_dt)
+        submitted = {}
         for day in month_dates:
-            if day < tomorrow:
-                continue
-            if day == tomorrow and current_dt >= tomorrow_cutoff:
+            if day < first_editable:
                 continue
 
-            # Get or create DailyMealStatus
-            status, _ = DailyMealStatus.objects.get_or_create(
-                student=student,
-                date=day,
-                defaults={"breakfast_on": False, "lunch_on": False, "dinner_on": False},
+            # Read all meal statuses from the submitted checkboxes
+            submitted[day] = tuple(
+                f"{meal_type}_{day.strftime('%Y-%m-%d')}" in request.POST
+                for meal_type in ["breakfast", "lunch", "dinner"]
             )
 
-            # Update all meal statuses based on submitted checkboxes
-            for meal_type in ["breakfast", "lunch", "dinner"]:
-                checkbox_name = f"{meal_type}_{day.strftime('%Y-%m-%d')}"
-                setattr(status, f"{meal_type}_on", checkbox_name in request.POST)
-
-            status.save()
+        bulk_upsert_meal_statuses(student, submitted)
 
         messages.success(request, "Meal status updated successfully for future days!")
         return redirect("students:update_multiple_days_meal_status")
@@ -385,129 +383,100 @@ def _get_month_display(year, month):
     return datetime(year, month, 1).strftime("%B %Y")
 
 
-def _get_preferences(student_obj, year, month):
-    pref = StudentMealPreference.objects.filter(
-        student=student_obj, month=f"{year}-{month:02d}"
-    ).first()
-    return (
-        pref.prefers_beef if pref else student_obj.default_prefers_beef,
-        pref.prefers_fish if pref else student_obj.default_prefers_fish,
-    )
-
+def _get_preferences(request, student_obj, year, month):
+    return get_preference_resolver(request).get(student_obj, f"{year}-{month:02d}")
 
-def _get_menu_for_weekday(weekday):
-    return WeeklyMenu.objects.filter(day_of_week=weekday).first()
 
-
-def _compute_daily_cost(menu, status_obj, prefers_beef, prefers_fish):
-    if not menu:
-        return 0
-
-    def _meal_cost(on, contains_beef, contains_fish, base_cost, alt_cost):
-        if not on:
-            return 0
-        if contains_beef and not prefers_beef:
-            return alt_cost
-        if contains_fish and not prefers_fish:
-            return alt_cost
-        return base_cost
-
-    cost = 0
-    # Breakfast has no alternate cost logic, just add if on
-    cost += _meal_cost(
-        status_obj.breakfast_on,
-        False,
-        False,
-        getattr(menu, "breakfast_cost", 0),
-        0,
-    )
-
-    cost += _meal_cost(
-        status_obj.lunch_on,
-        getattr(menu, "lunch_contains_beef", False),
-        getattr(menu, "lunch_contains_fish", False),
-        getattr(menu, "lunch_cost", 0),
-        getattr(menu, "lunch_cost_alternate", 0),
-    )
-
-    cost += _meal_cost(
-        status_obj.dinner_on,
-        getattr(menu, "dinner_contains_beef", False),
-        getattr(menu, "dinner_contains_fish", False),
-        getattr(menu, "dinner_cost", 0),
-        getattr(menu, "dinner_cost_alternate", 0),
-    )
-
-    return cost
+def _year_overview(request, year):
+    months = year_meal_overview(request.user.student, year)
+    context = {
+        "page_title": "Yearly Meal History",
+        "year": year,
+        "months": months,
+        "total_year_cost": sum(row["total_cost"] for row in months),
+    }
+    return render(request, "students/meal_history_year.html", context)
 
 
 @login_required
 def meal_history(request):
-    student = request.user.student
+    if request.GET.get("year"):
+        try:
+            year = int(request.GET["year"])
+            if not MINYEAR <= year <= MAXYEAR:
+                raise ValueError(year)
+        except ValueError:
+            messages.error(request, "Invalid year.")
+        else:
+            return _year_overview(request, year)
 
     selected_month = request.GET.get("month")
     year, month = _parse_selected_month(selected_month)
     month_name = _get_month_display(year, month)
 
-    prefers_beef, prefers_fish = _get_preferences(student, year, month)
-
-    statuses_qs = DailyMealStatus.objects.filter(
-        student=student, date__year=year, date__month=month
-    ).order_by("date")
-
-    updated_statuses = []
-    total_month_cost = 0
-
-    for status in statuses_qs:
-        weekday = status.date.strftime("%A")
-        menu = _get_menu_for_weekday(weekday)
-        daily_cost = _compute_daily_cost(menu, status, prefers_beef, prefers_fish)
-        total_month_cost += daily_cost
-
-        total_on = (
-            (1 if status.breakfast_on else 0)
-            + (1 if status.lunch_on else 0)
-            + (1 if status.dinner_on else 0)
-        )
-
-        updated_statuses.append(
-            {
-                "date": status.date,
-                "weekday": weekday,
-                "breakfast_on": status.breakfast_on,
-                "lunch_on": status.lunch_on,
-                "dinner_on": status.dinner_on,
-                "total_on": total_on,
-                "daily_cost": daily_cost,
-            }
+    # A month that is fully over only changes through admin corrections,
+    # which drop the cached copy, so it is served with validators.
+    closed = month_bounds(year, month)[1] < timezone.localdate()
+    cache_key = meal_history_cache_key(request.user.id, year, month)
+    data = cache.get(cache_key) if closed else None
+
+    if data is None:
+        student = request.user.student
+        prefers_beef, prefers_fish = _get_preferences(request, student, year, month)
+        archived = archived_month_totals(student, [(year, month)]).get((year, month))
+        if archived:
+            # The daily rows are gone; the month's bill still stands
+            statuses = []
+            total_month_cost, on_days = archived
+        else:
+            statuses, total_month_cost = meal_history_rows(
+                student, year, month, prefers_beef, prefers_fish
+            )
+            on_days = None
+        data = {
+            "statuses": statuses,
+            "prefers_beef": prefers_beef,
+            "prefers_fish": prefers_fish,
+            "total_month_cost": total_month_cost,
+            "archived": bool(archived),
+            "on_days": on_days,
+        }
+        if closed:
+            data["etag"] = f'"{meal_history_etag(data)}"'
+            data["last_modified"] = int(timezone.now().timestamp())
+            cache.set(cache_key, data, MEAL_HISTORY_CACHE_TIMEOUT)
+
+    if closed:
+        response = get_conditional_response(
+            request, etag=data["etag"], last_modified=data["last_modified"]
         )
+        if response is not None:
+            return response
 
     context = {
         "page_title": "Monthly Meal History",
-        "statuses": updated_statuses,
-        "prefers_beef": prefers_beef,
-        "prefers_fish": prefers_fish,
+        "statuses": data["statuses"],
+        "prefers_beef": data["prefers_beef"],
+        "prefers_fish": data["prefers_fish"],
         "current_month": month_name,
         "selected_month": f"{year}-{month:02d}",
-        "total_month_cost": total_month_cost,
+        "total_month_cost": data["total_month_cost"],
+        "archived": data["archived"],
+        "on_days": data["on_days"],
+        "year": year,
     }
+    response = render(request, "students/meal_history.html", context)
 
-    return render(request, "students/meal_history.html", context)
+    if closed:
+        response["ETag"] = data["etag"]
+        response["Last-Modified"] = http_date(data["last_modified"])
+        patch_cache_control(response, private=True, max_age=CLOSED_MONTH_MAX_AGE)
+    return response
 
 
 @login_required
 def weekly_menu_view(request):
-    days_order = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    weekly_menu = list(WeeklyMenu.objects.all())
-    weekly_menu.sort(key=lambda x: days_order.index(x.day_of_week))
+    weekly_menu = get_weekly_menu_list()
 
     return render(
         request,
@@ -675,7 +644,6 @@ def meal_token_view(request):
         token_data.append(
             {
                 "meal": token.meal_type,
-                "qr": token.generate_qr(),
                 "barcode": token.barcode,
                 "expired": is_expired,
             }
@@ -686,3 +654,29 @@ def meal_token_view(request):
         "students/meal_token.html",
         {"token_data": token_data, "page_title": "My Meal Tokens"},
     )
+
+
+@login_required
+@student_required
+def meal_token_qr(request, barcode):
+    """
+    Serve a token's QR image (?format=svg, the default, or png) with an
+    ETag so browsers revalidate instead of downloading it again.
+    """
+    fmt = request.GET.get("format", "svg")
+    if fmt not in QR_CONTENT_TYPES:
+        fmt = "svg"
+
+    token = get_object_or_404(
+        MealToken.objects.select_related("student"),
+        barcode=barcode,
+        student__user=request.user,
+    )
+
+    etag = f'"{token.qr_etag(fmt)}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(token.render_qr(fmt), content_type=QR_CONTENT_TYPES[fmt])
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, max_age=QR_CACHE_TIMEOUT)
+    return response